@@ -0,0 +1,37 @@
+"""create memory_summary table, memory_message.folded_at
+
+Revision ID: 3c1f9a7d2b64
+Revises: 77b170f6f549
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9a7d2b64'
+down_revision: Union[str, None] = '77b170f6f549'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'memory_summary',
+        sa.Column('user_id', sa.String(255), primary_key=True),
+        sa.Column('summary', sa.Text, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime, nullable=False, server_default=sa.func.now(), onupdate=sa.func.now())
+    )
+    # set when the message is folded into the summary, nullable without default so Postgres adds it without a rewrite
+    op.add_column('memory_message', sa.Column('folded_at', sa.DateTime, nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('memory_message', 'folded_at')
+    op.drop_table('memory_summary')
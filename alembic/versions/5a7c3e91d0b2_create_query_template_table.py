@@ -0,0 +1,35 @@
+"""create query_template table
+
+Revision ID: 5a7c3e91d0b2
+Revises: 8e2d4b6a9f13
+Create Date: 2026-10-18 11:20:41.183265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7c3e91d0b2'
+down_revision: Union[str, None] = '8e2d4b6a9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'query_template',
+        sa.Column('normalized_query', sa.String(500), primary_key=True),
+        sa.Column('sql_template', sa.Text, nullable=False),
+        sa.Column('hits', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('last_used_at', sa.DateTime, nullable=False, server_default=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('query_template')
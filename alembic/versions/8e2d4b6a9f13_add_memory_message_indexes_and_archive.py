@@ -0,0 +1,58 @@
+"""add memory_message indexes and archive table
+
+Revision ID: 8e2d4b6a9f13
+Revises: 3c1f9a7d2b64
+Create Date: 2026-10-18 10:03:27.540917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2d4b6a9f13'
+down_revision: Union[str, None] = '3c1f9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built without locking writes on Postgres, CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_memory_message_user_id_created_at',
+            'memory_message',
+            ['user_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True,
+        )
+        # messages not folded into the summary yet (get_unfolded), folded rows leave the index
+        op.create_index(
+            'ix_memory_message_user_id_unfolded',
+            'memory_message',
+            ['user_id', 'id'],
+            postgresql_where=sa.text('folded_at IS NULL'),
+            sqlite_where=sa.text('folded_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+    op.create_table(
+        'memory_message_archive',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.String(255), nullable=False),
+        sa.Column('role', sa.String(50), nullable=False),
+        sa.Column('message', sa.Text, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.Column('updated_at', sa.DateTime, nullable=False),
+        sa.Column('archived_at', sa.DateTime, nullable=False, server_default=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('memory_message_archive')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_memory_message_user_id_unfolded', table_name='memory_message', postgresql_concurrently=True)
+        op.drop_index('ix_memory_message_user_id_created_at', table_name='memory_message', postgresql_concurrently=True)
@@ -0,0 +1,52 @@
+"""create transaction_rollup table
+
+Revision ID: b4e8f2a61c07
+Revises: 5a7c3e91d0b2
+Create Date: 2026-10-18 12:41:09.305517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f2a61c07'
+down_revision: Union[str, None] = '5a7c3e91d0b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# first day of the month of transaction.date, as the application's month_start compiles it
+MONTH_START = {
+    'postgresql': "CAST(date_trunc('month', date) AS DATE)",
+    'sqlite': "date(date, 'start of month')",
+    'mysql': "CAST(DATE_FORMAT(date, '%Y-%m-01') AS DATE)",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'transaction_rollup',
+        sa.Column('user_id', sa.String(255), nullable=False),
+        sa.Column('month', sa.Date, nullable=False),
+        sa.Column('category', sa.String(100), nullable=False, server_default=''),
+        sa.Column('type', sa.String(10), nullable=False, server_default=''),
+        sa.Column('total', sa.Float, nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer, nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('user_id', 'month', 'category', 'type')
+    )
+    # the aggregates are read from the rollup as soon as the table exists, fill it from the existing transactions
+    month = MONTH_START.get(op.get_context().dialect.name, MONTH_START['postgresql'])
+    op.execute(
+        'INSERT INTO transaction_rollup (user_id, month, category, type, total, count) '
+        f"SELECT user_id, {month}, coalesce(category, ''), coalesce(type, ''), sum(amount), count(id) "
+        'FROM "transaction" '
+        f"GROUP BY user_id, {month}, coalesce(category, ''), coalesce(type, '')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_rollup')
@@ -0,0 +1,39 @@
+"""add memory_message.client_id
+
+Revision ID: c7d1e5a3b920
+Revises: e1c9d7305f4a
+Create Date: 2026-10-18 18:05:31.472916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d1e5a3b920'
+down_revision: Union[str, None] = 'e1c9d7305f4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # generated by the write buffer, NULL for the rows written before
+    op.add_column('memory_message', sa.Column('client_id', sa.String(32), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_memory_message_client_id',
+            'memory_message',
+            ['client_id'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_memory_message_client_id', table_name='memory_message', postgresql_concurrently=True)
+    op.drop_column('memory_message', 'client_id')
@@ -0,0 +1,60 @@
+"""add transaction indexes
+
+Revision ID: e1c9d7305f4a
+Revises: b4e8f2a61c07
+Create Date: 2026-10-18 13:27:55.618402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c9d7305f4a'
+down_revision: Union[str, None] = 'b4e8f2a61c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    if is_postgresql:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # built without locking writes on Postgres, CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transaction_user_id_date',
+            'transaction',
+            ['user_id', 'date'],
+            postgresql_concurrently=True,
+        )
+        # categories are matched with lower(category) IN (...), stored values keep the user's casing
+        op.create_index(
+            'ix_transaction_user_id_lower_category_date',
+            'transaction',
+            ['user_id', sa.text('lower(category)'), 'date'],
+            postgresql_concurrently=True,
+        )
+        if is_postgresql:
+            # description ILIKE '%kopi%' (query_transaction search)
+            op.create_index(
+                'ix_transaction_description_trgm',
+                'transaction',
+                ['description'],
+                postgresql_using='gin',
+                postgresql_ops={'description': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        if op.get_bind().dialect.name == 'postgresql':
+            op.drop_index('ix_transaction_description_trgm', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_transaction_user_id_lower_category_date', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_transaction_user_id_date', table_name='transaction', postgresql_concurrently=True)
@@ -0,0 +1,113 @@
+"""
+Round trips and latency of the transaction write path, ORM unit of work against INSERT/UPDATE/DELETE ... RETURNING:
+
+	python -m benchmarks.transaction_writes [--url postgresql://...] [--rows 10] [--iterations 50]
+
+--url defaults to DATABASE_URL. With sqlite:// the tables are created in memory, those latencies have no network
+in them and the round trips are the number to compare. Against Postgres the tables must exist (alembic upgrade head),
+the rows are written for a throwaway user id and removed at the end.
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
+from src.database.connection import create_database_engine
+from src.repositories.transaction_repository import TransactionRepository
+
+
+class RoundTripCounter:
+	"""Statements sent and commits of an engine, each one is a round trip to the database"""
+
+	def __init__(self, engine):
+		self.count = 0
+		event.listen(engine, "before_cursor_execute", self.increment)
+		event.listen(engine, "commit", self.increment)
+
+	def increment(self, *args):
+		self.count += 1
+
+
+def receipt(user_id: str, rows: int, day: datetime) -> list[CreateTransactionSchema]:
+	return [
+		CreateTransactionSchema(user_id=user_id, date=day, amount=1000 * (line + 1), description=f"line {line}", category=f"Category {line % 3}", type="expense")
+		for line in range(rows)
+	]
+
+
+def measure(counter: RoundTripCounter, results: dict, operation: str, func, *args):
+	before = counter.count
+	started = time.perf_counter()
+	result = func(*args)
+	# the tools read the returned rows, a lazy load after the commit is part of the cost
+	for transaction in result if isinstance(result, list) else [result]:
+		transaction.type
+	results[operation]["latency"].append(time.perf_counter() - started)
+	results[operation]["round_trips"].append(counter.count - before)
+	return result
+
+
+def run(session_factory, counter: RoundTripCounter, returning: bool, rows: int, iterations: int) -> dict:
+	user_id = f"benchmark-{uuid.uuid4().hex[:12]}"
+	results = {operation: {"latency": [], "round_trips": []} for operation in ("create", "update", "delete")}
+	session = session_factory()
+	try:
+		repository = TransactionRepository(session, returning=returning)
+		for iteration in range(iterations):
+			day = datetime(2026, 1, 1) + timedelta(days=iteration)
+			created = measure(counter, results, "create", repository.create, receipt(user_id, rows, day))
+			first, last = created[0].id, created[-1].id
+			update = UpdateTransactionSchema(id=first, user_id=user_id, date=day + timedelta(days=40), amount=4321, description="corrected", category="Food", type="expense")
+			measure(counter, results, "update", repository.update, update)
+			measure(counter, results, "delete", repository.delete, last, user_id)
+	finally:
+		session.rollback()
+		session.execute(delete(TransactionModel).where(TransactionModel.user_id == user_id))
+		session.execute(delete(TransactionRollupModel).where(TransactionRollupModel.user_id == user_id))
+		session.commit()
+		session.close()
+	return results
+
+
+def report(label: str, results: dict):
+	for operation, measured in results.items():
+		latency = sorted(measured["latency"])
+		p95 = latency[min(len(latency) - 1, int(len(latency) * 0.95))]
+		print(
+			f"{label:<10} {operation:<7} round trips {statistics.mean(measured['round_trips']):>5.1f}"
+			f"  median {statistics.median(latency) * 1000:>7.3f} ms  p95 {p95 * 1000:>7.3f} ms"
+		)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--url", default=os.getenv("DATABASE_URL"))
+	parser.add_argument("--rows", type=int, default=10, help="lines of each created receipt")
+	parser.add_argument("--iterations", type=int, default=50)
+	args = parser.parse_args()
+
+	if args.url.startswith("sqlite"):
+		engine = create_database_engine(args.url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+		TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	else:
+		engine = create_database_engine(args.url)
+	counter = RoundTripCounter(engine)
+	session_factory = sessionmaker(bind=engine, autoflush=False)
+	print(f"{engine.dialect.name}, receipts of {args.rows} rows, {args.iterations} iterations")
+	for label, returning in (("orm", False), ("returning", True)):
+		report(label, run(session_factory, counter, returning, args.rows, args.iterations))
+	engine.dispose()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,64 @@
+ACTION_MARKER = "Action:"
+
+
+class ActionStreamParser:
+	"""
+	Incrementally scan streamed LLM output for the `Action: {...}` object or `Action: [{...}, {...}]` list.
+	Feed the text deltas as they arrive, `feed` returns True as soon as the JSON value after the marker is balanced,
+	so the caller can stop the generation and dispatch the tool without waiting for the rest of the completion.
+	"""
+
+	def __init__(self):
+		self.buffer = ""
+		self.start = -1  # index of the opening bracket of the action value
+		self.end = -1  # index after the closing bracket of the action value
+		self.position = 0  # next index to scan
+		self.depth = 0
+		self.quote: str | None = None
+		self.escaped = False
+
+	def is_complete(self) -> bool:
+		return self.end != -1
+
+	def feed(self, chunk: str) -> bool:
+		if self.is_complete():
+			return True
+		self.buffer += chunk
+
+		if self.start == -1:
+			marker = self.buffer.find(ACTION_MARKER)
+			if marker == -1:
+				return False
+			opening = [index for index in (self.buffer.find("{", marker), self.buffer.find("[", marker)) if index != -1]
+			if not opening:
+				return False
+			self.start = min(opening)
+			self.position = self.start
+
+		while self.position < len(self.buffer):
+			char = self.buffer[self.position]
+			self.position += 1
+			if self.quote is not None:
+				if self.escaped:
+					self.escaped = False
+				elif char == "\\":
+					self.escaped = True
+				elif char == self.quote:
+					self.quote = None
+				continue
+			if char in ('"', "'"):
+				self.quote = char
+			elif char in ("{", "["):
+				self.depth += 1
+			elif char in ("}", "]"):
+				self.depth -= 1
+				if self.depth == 0:
+					self.end = self.position
+					return True
+		return False
+
+	def response(self) -> str:
+		"""Text received so far, cut right after the action value when it is complete."""
+		if self.is_complete():
+			return self.buffer[: self.end]
+		return self.buffer
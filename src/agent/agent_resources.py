@@ -0,0 +1,71 @@
+import asyncio
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.database.async_connection import get_async_sessionmaker
+from src.repositories.async_memory_message_repository import AsyncMemoryMessageRepository
+from src.repositories.async_memory_summary_repository import AsyncMemorySummaryRepository
+from src.repositories.async_transaction_repository import AsyncTransactionRepository
+
+T = TypeVar("T")
+
+
+class AgentResources:
+	"""
+	Per-request resources borrowed by the shared tools during one agent run.
+	All repositories of a run share one AsyncSession, calls are serialized with a lock because parallel tool calls
+	of the same step would otherwise use the session concurrently.
+	"""
+
+	def __init__(self, session):
+		self.session = session
+		self.transaction_repository = AsyncTransactionRepository(session)
+		self.memory_repository = AsyncMemoryMessageRepository(session)
+		self.memory_summary_repository = AsyncMemorySummaryRepository(session)
+		self.lock = asyncio.Lock()
+
+	async def run_in_session(self, func: Callable[..., T], *args) -> T:
+		async with self.lock:
+			return await call(func, *args)
+
+	async def close(self):
+		await self.session.close()
+
+
+def get_agent_resources():
+	return AgentResources(get_async_sessionmaker()())
+
+
+current_resources: ContextVar[AgentResources | None] = ContextVar("agent_resources", default=None)
+
+
+def get_current_resources() -> AgentResources | None:
+	return current_resources.get()
+
+
+@contextmanager
+def use_resources(resources: AgentResources):
+	token = current_resources.set(resources)
+	try:
+		yield resources
+	finally:
+		current_resources.reset(token)
+
+
+async def call(func: Callable[..., T], *args) -> T:
+	# async repositories are awaited on the event loop, blocking ones (given explicitly, e.g. in tests) run in the threadpool
+	if inspect.iscoroutinefunction(func):
+		return await func(*args)
+	return await run_in_threadpool(func, *args)
+
+
+async def run_in_session(func: Callable[..., T], *args) -> T:
+	"""Run a repository call without blocking the event loop, serialized with the other calls of the current run"""
+	resources = get_current_resources()
+	if resources is not None:
+		return await resources.run_in_session(func, *args)
+	return await call(func, *args)
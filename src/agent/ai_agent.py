@@ -1,16 +1,23 @@
+import asyncio
+import logging
+from contextlib import aclosing, asynccontextmanager
+from typing import Callable, Optional
+
 from fastapi import Depends
-from jinja2 import Template
-from sqlalchemy import null
-import yaml
 
+from src.agent.action_parser import ActionStreamParser
+from src.agent.agent_resources import AgentResources, get_agent_resources, get_current_resources, use_resources
+from src.agent.context_window import ContextBudgetExceeded, ContextWindow
+from src.agent.fast_path import FastPathHandler
 from src.agent.memory_management import MemoryManagement
-from src.agent.tools.category_tools import GetListCategoryTool
-from src.agent.tools.common_tools import GetDateTool, ImageExtractInformationTool
-from src.agent.tools.greet import GreetTool
-from src.agent.tools.transaction_tools import CreateTransactionTool, DeleteTransactionTool, FindTransactionTool, UpdateTransactionTool
+from src.agent.prompt_registry import get_prompt_registry
+from src.agent.result_encoder import encode_result
+from src.agent.tool_cache import ToolResultCache, get_tool_result_cache
+from src.agent.tool_registry import ToolRegistry, get_tool_registry
+from src.core.config.environtment import FAST_PATH_ENABLED, LLM_STREAMING
 from src.core.models.message_model import MessageModel
 from src.services.llm_service import LLMService, get_llm_service
-from src.services.utils import extract_json_from_string
+from src.services.utils import extract_json_from_string, extract_json_list_from_string
 
 ## TODO: Add memory management to the agent
 ## 1. Insert memory to the database
@@ -19,98 +26,195 @@ from src.services.utils import extract_json_from_string
 ## 4. Inject memory into the prompt
 
 
-def get_agent(llm_service: LLMService = Depends(get_llm_service)):
-	agent = Agent(llm_service)
+def get_agent(llm_service: LLMService = Depends(get_llm_service), tool_registry: ToolRegistry = Depends(get_tool_registry)):
+	agent = Agent(llm_service, tool_registry)
 	return agent
 
 
 class Agent:
-	def __init__(self, llm_service: LLMService = Depends(get_llm_service)) -> None:
+	"""
+	Lightweight per-request context. The tools come from the shared registry and the per-request resources
+	(DB session and repositories) are opened for the run and closed when it ends.
+	"""
+
+	def __init__(
+		self,
+		llm_service: LLMService = Depends(get_llm_service),
+		tool_registry: Optional[ToolRegistry] = None,
+		resources_factory: Callable[[], AgentResources] = get_agent_resources,
+		tool_cache: Optional[ToolResultCache] = None,
+	) -> None:
 		self.llm_service = llm_service
-		self.memory = MemoryManagement(llm_service)
-		self.user_memory = null
+		self.tools = tool_registry if tool_registry is not None else get_tool_registry()
+		self.resources_factory = resources_factory
+		self.tool_cache = tool_cache if tool_cache is not None else get_tool_result_cache()
+		self.memory = MemoryManagement(llm_service, resources_factory=resources_factory)
+		self.user_memory: str | None = None
 		self.user_id = ""
-		self.tools = []
 		self.messages = []
-		self.max_memory = 10
 		self.max_iterations = 0
 		self.max_retry_on_error = 3
-		self.initialize_tools()
-		self.model_selected = self.llm_service.get_random_model()
-
-	def initialize_tools(self):
-		self.add_tool(ImageExtractInformationTool())
-		self.add_tool(GetDateTool())
-		self.add_tool(GetListCategoryTool())
-		self.add_tool(CreateTransactionTool())
-		self.add_tool(FindTransactionTool())
-		self.add_tool(UpdateTransactionTool())
-		self.add_tool(DeleteTransactionTool())
+		self.streaming = LLM_STREAMING
+		self.fast_path = FastPathHandler() if FAST_PATH_ENABLED else None
+		self.context_window = ContextWindow()
+		self.prompt_tokens: list[int] = []  # estimated prompt size of each iteration, for tuning the context budget
 
 	def initialize_prompt(self):
-		tools_description = "\n".join([f"{tool.name()}: {tool.description()} Args: {tool.get_args_schema()} Output: {tool.output_schema()}" for tool in self.tools])
-
-		template = yaml.safe_load(open("src/agent/prompt/system_prompt.yaml", "r"))
-		self.prompt = Template(template["system_prompt"]["v4"]).render(tools_description=tools_description, user_memory=self.user_memory)
+		compiled_prompt = get_prompt_registry().get(self.tools)
+		self.prompt = compiled_prompt.render(user_memory=self.user_memory)
 		self.messages.append({"role": "system", "content": self.prompt})
 
-	def add_tool(self, tool):
-		self.tools.append(tool)
+	@asynccontextmanager
+	async def request_scope(self):
+		"""Open the per-request resources for the run, nested scopes reuse the resources of the outermost one"""
+		if get_current_resources() is not None:
+			yield
+			return
+		resources = self.resources_factory()
+		try:
+			with use_resources(resources):
+				yield
+		finally:
+			await resources.close()
 
-	def add_memory(self, role, content):
-		self.memory.add_memory(self.user_id, role, content)
+	async def add_memory(self, role, content):
+		await self.memory.add_memory(self.user_id, role, content)
 
 	def add_message(self, role: str, content: str):
 		print(f"{role} : {content}")
 		self.messages.append({"role": role, "content": content})
 
-	def process_message(self, message: MessageModel):
-		self.user_id = message.user_id
-		self.user_memory = self.memory.summarize_memory(self.user_id, self.max_memory)
-		self.initialize_prompt()
-		self.memory.add_memory(self.user_id, "user", message.message_content)
-		response = self.run(message.to_context())
-		self.memory.add_memory(self.user_id, "assistant", response or '')
-		return response or ""
-
-	def submit_query(self, input: str, role: str = "user"):
+	async def process_message(self, message: MessageModel):
+		async with self.request_scope():
+			self.user_id = message.user_id
+			reply = await self.try_fast_path(message)
+			if reply is None:
+				self.user_memory = await self.memory.get_summary(self.user_id)
+				self.initialize_prompt()
+				await self.memory.add_memory(self.user_id, "user", message.message_content)
+				reply = await self.run(message.to_context()) or ""
+				await self.memory.add_memory(self.user_id, "assistant", reply)
+		# the summary is updated after the run once a batch of messages was added, the next message reads it without waiting for the LLM
+		if self.memory.summary_due(self.user_id):
+			self.memory.schedule_summary(self.user_id)
+		return reply
+
+	async def try_fast_path(self, message: MessageModel) -> str | None:
+		"""Record simple transactions like "kopi 18rb" without calling the LLM, None when the message needs the agent"""
+		if self.fast_path is None:
+			return None
+		create_tool = self.tools.get("create_transaction")
+		reply = await self.fast_path.handle(message, create_tool)
+		if reply is None:
+			return None
+		# the fast path calls the tool directly, drop the cached results of the transactions it changed
+		self.tool_cache.invalidate(self.user_id, create_tool.invalidates())
+		await self.memory.add_memory(self.user_id, "user", message.message_content)
+		await self.memory.add_memory(self.user_id, "assistant", reply)
+		return reply
+
+	def prompt_messages(self) -> list[dict]:
+		"""Messages sent for this iteration, fitted to the context token budget"""
+		messages = self.context_window.fit(self.messages)
+		self.prompt_tokens.append(self.context_window.count(messages))
+		logging.info(f"Agent prompt iteration {len(self.prompt_tokens)}: ~{self.prompt_tokens[-1]} tokens in {len(messages)}/{len(self.messages)} messages")
+		return messages
+
+	async def submit_query(self, input: str, role: str = "user"):
 		self.add_message(role=role, content=input)
-		response = self.llm_service.query_execute(self.messages, stop=["<STOP>"], model=self.model_selected)
+		messages = self.prompt_messages()
+		if self.streaming:
+			return await self.submit_query_stream(messages)
+		response = await self.llm_service.query_execute(messages, stop=["<STOP>"])
 		return response or ""
 
-	def run(self, input, max_iterations: int = 10):
+	async def submit_query_stream(self, messages: list[dict]):
+		"""Stream the completion and stop the generation as soon as the Action JSON is closed"""
+		parser = ActionStreamParser()
+		async with aclosing(self.llm_service.query_stream(messages, stop=["<STOP>"])) as chunks:
+			async for chunk in chunks:
+				if parser.feed(chunk):
+					break
+		return parser.response()
+
+	async def run(self, input, max_iterations: int = 10):
+		async with self.request_scope():
+			return await self.run_steps(input, max_iterations)
+
+	async def run_steps(self, input, max_iterations: int = 10):
 		response = ""
 		try:
 			self.max_iterations = max_iterations
 			query = input
 			while self.max_iterations > 0:
-				response = self.submit_query(query)
+				response = await self.submit_query(query)
 				self.add_message("assistant", response)
 				self.max_iterations -= 1
 				if "Action:" in response:
-					action_name, action_args = self.extract_action_from_response(response)
-					if action_name == "final_answer":
-						return action_args["answer"]
-					for tool in self.tools:
-						if tool.name().lower() == action_name.lower():
-							result = tool.run(action_args)
-							query = f"Observation: {result}"
-							break
+					actions = self.extract_actions_from_response(response)
+					for action_name, action_args in actions:
+						if action_name == "final_answer":
+							return action_args["answer"]
+					query = await self.execute_actions(actions)
 				else:
 					query = "Observation: You not provide the Action on your answer. Provide the Action in your answer to continue the process. If you want to finish the process, provide the final_answer action with the answer."
+		except ContextBudgetExceeded as e:
+			logging.warning(f"Agent stopped before the provider context limit: {e}")
+			return "Maaf, permintaan ini terlalu panjang untuk diproses sekaligus. Silakan kirim permintaan yang lebih singkat atau lebih spesifik."
 		except Exception as e:
 			if self.max_retry_on_error > 0:
 				response = f"""
 			   	Observation: System Error {e}, please try again"""
 				self.max_retry_on_error -= 1
-				return self.run(response, max_iterations=self.max_iterations)
+				return await self.run_steps(response, max_iterations=self.max_iterations)
 			else:
 				response = """
 			   	Observation: System Error, direct generate the final answer informed the user that the system is error and apologize for the error."""
-				return self.run(response, max_iterations=1)
+				return await self.run_steps(response, max_iterations=1)
+
+	async def execute_action(self, action_name: str, action_args):
+		tool = self.tools.get(action_name)
+		if tool is None:
+			return f"Tool {action_name} is not available, use only the provided tools"
+		return await self.tool_cache.run(tool, action_args, self.user_id)
+
+	async def execute_actions(self, actions: list[tuple[str, dict]]) -> str:
+		"""
+		Execute all actions of one step and return the observations in one turn.
+		Calls to different tools run concurrently, repeated calls to the same tool keep their order.
+		"""
+		results: list = [None] * len(actions)
+		groups: dict[str, list[int]] = {}
+		for index, (action_name, _) in enumerate(actions):
+			groups.setdefault(action_name.lower(), []).append(index)
+
+		async def run_group(indexes: list[int]):
+			for index in indexes:
+				action_name, action_args = actions[index]
+				try:
+					results[index] = encode_result(await self.execute_action(action_name, action_args))
+				except Exception as e:
+					results[index] = f"Error: {e}"
+
+		await asyncio.gather(*(run_group(indexes) for indexes in groups.values()))
+
+		if len(actions) == 1:
+			return f"Observation: {results[0]}"
+		observations = "\n".join([f"[{index + 1}] {actions[index][0]}: {result}" for index, result in enumerate(results)])
+		return f"Observation:\n{observations}"
+
+	def extract_actions_from_response(self, response) -> list[tuple[str, dict]]:
+		"""Extract the actions of one step, the Action can be a single object or a list of independent objects"""
+		action = response[response.find("Action:") + len("Action:") :].lstrip()
+		if action.startswith("["):
+			return [self.extract_action_from_dict(json_dict) for json_dict in extract_json_list_from_string(action)]
+		return [self.extract_action_from_response(response)]
 
 	def extract_action_from_response(self, response):
 		json_dict = extract_json_from_string(response)
+		return self.extract_action_from_dict(json_dict)
+
+	def extract_action_from_dict(self, json_dict: dict):
 		action_name = json_dict["name"]
 		action_args = json_dict["args"] if json_dict["args"] != "" else {}
 		return action_name, action_args
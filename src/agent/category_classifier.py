@@ -0,0 +1,122 @@
+import re
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+
+from src.agent.agent_resources import run_in_session
+from src.agent.tools.category_tools import CATEGORIES, CATEGORY_KEYWORDS
+from src.core.config.environtment import CATEGORY_HISTORY_LIMIT, CATEGORY_MIN_CONFIDENCE
+
+# weight of the user's own history against the keyword rules, and of a correction against a normal transaction
+USER_WEIGHT = 2.0
+CORRECTION_WEIGHT = 3
+EXACT_MATCH_CONFIDENCE = 0.95
+CANONICAL_CATEGORIES = {category.lower(): category for category in CATEGORIES}
+
+
+@lru_cache(maxsize=1)
+def get_category_classifier():
+	return CategoryClassifier()
+
+
+def tokenize(description: str) -> list[str]:
+	"""Words and two-word phrases of the description, the same shape as the CATEGORY_KEYWORDS entries"""
+	words = re.findall(r"[a-z0-9']+", description.lower())
+	return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def normalize_description(description: str) -> str:
+	return " ".join(re.findall(r"[a-z0-9']+", description.lower()))
+
+
+class UserCategoryModel:
+	"""Categories learned from one user's transactions"""
+
+	def __init__(self):
+		# latest category of each exact description, so a correction wins over older transactions
+		self.descriptions: dict[str, str] = {}
+		self.tokens: defaultdict[str, Counter] = defaultdict(Counter)
+
+	def learn(self, description: str, category: str, weight: int = 1):
+		self.descriptions[normalize_description(description)] = category
+		for token in set(tokenize(description)):
+			self.tokens[token][category] += weight
+
+
+class CategoryClassifier:
+	"""
+	Maps a transaction description to one of CATEGORIES without the LLM.
+	Bootstrapped from the keyword rules and updated with each user's own transactions, the history of a user
+	is loaded once per process and kept up to date by the transaction tools.
+	"""
+
+	def __init__(self, keywords: dict[str, list[str]] = CATEGORY_KEYWORDS, min_confidence: float = CATEGORY_MIN_CONFIDENCE, history_limit: int = CATEGORY_HISTORY_LIMIT, max_users: int = 10_000):
+		self.rules: defaultdict[str, Counter] = defaultdict(Counter)
+		for category, words in keywords.items():
+			for word in words:
+				self.rules[word][category] += 1
+		self.min_confidence = min_confidence
+		self.history_limit = history_limit
+		self.max_users = max_users
+		self.users: OrderedDict[str, UserCategoryModel] = OrderedDict()
+
+	def is_loaded(self, user_id: str) -> bool:
+		return user_id in self.users
+
+	async def ensure_user(self, user_id: str, repository) -> None:
+		"""Load the user's category history the first time the user is classified"""
+		if self.is_loaded(user_id):
+			self.users.move_to_end(user_id)
+			return
+		history = await run_in_session(repository.get_category_history, user_id, self.history_limit)
+		self.load(user_id, history)
+
+	def load(self, user_id: str, history: list[tuple[str, str]]):
+		"""Build the user's model from (description, category) pairs, oldest first"""
+		model = UserCategoryModel()
+		for description, category in history:
+			category = self.canonical(category)
+			if description and category:
+				model.learn(description, category)
+		self.users[user_id] = model
+		self.users.move_to_end(user_id)
+		while len(self.users) > self.max_users:
+			self.users.popitem(last=False)
+
+	def learn(self, user_id: str, description: str | None, category: str | None, weight: int = 1):
+		"""Add one transaction of the user, only when the user's history is loaded (otherwise it is part of the next load)"""
+		category = self.canonical(category)
+		if not description or category is None or not self.is_loaded(user_id):
+			return
+		self.users[user_id].learn(description, category, weight)
+
+	def canonical(self, category: str | None) -> str | None:
+		return CANONICAL_CATEGORIES.get(category.strip().lower()) if category else None
+
+	def classify(self, user_id: str, description: str) -> tuple[str, float] | None:
+		"""Best category and its confidence (0-1), None when nothing matches"""
+		model = self.users.get(user_id)
+		if model is not None:
+			category = model.descriptions.get(normalize_description(description))
+			if category is not None:
+				return category, EXACT_MATCH_CONFIDENCE
+
+		votes: Counter = Counter()
+		for token in tokenize(description):
+			for category, count in self.rules.get(token, {}).items():
+				votes[category] += count
+			learned = model.tokens.get(token) if model is not None else None
+			if learned:
+				total = sum(learned.values())
+				for category, count in learned.items():
+					votes[category] += USER_WEIGHT * count / total
+		if not votes:
+			return None
+		category, score = votes.most_common(1)[0]
+		return category, score / sum(votes.values())
+
+	def predict(self, user_id: str, description: str) -> str | None:
+		"""Category when the classifier is confident enough, None otherwise"""
+		result = self.classify(user_id, description)
+		if result is None or result[1] < self.min_confidence:
+			return None
+		return result[0]
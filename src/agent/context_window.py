@@ -0,0 +1,87 @@
+from src.core.config.environtment import CONTEXT_ELIDED_OBSERVATION_TOKENS, CONTEXT_KEEP_LAST_MESSAGES, CONTEXT_MAX_OBSERVATION_TOKENS, CONTEXT_MAX_PROMPT_TOKENS
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+	"""Approximate token count, the agent runs several open models through OpenRouter so there is no single tokenizer to use"""
+	return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_message_tokens(messages: list[dict]) -> int:
+	return sum(estimate_tokens(str(message["content"])) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def is_observation(message: dict) -> bool:
+	return message["role"] == "user" and str(message["content"]).lstrip().startswith("Observation")
+
+
+class ContextBudgetExceeded(Exception):
+	def __init__(self, tokens: int, budget: int):
+		super().__init__(f"Prompt needs {tokens} tokens, budget is {budget}")
+		self.tokens = tokens
+		self.budget = budget
+
+
+class ContextWindow:
+	"""
+	Token budget policy for the messages sent on each agent iteration.
+	The system prompt, the user task and the latest messages are kept, large observations are truncated,
+	older observations are elided and the oldest steps are dropped when the prompt is still over budget.
+	"""
+
+	def __init__(
+		self,
+		max_prompt_tokens: int = CONTEXT_MAX_PROMPT_TOKENS,
+		keep_last_messages: int = CONTEXT_KEEP_LAST_MESSAGES,
+		max_observation_tokens: int = CONTEXT_MAX_OBSERVATION_TOKENS,
+		elided_observation_tokens: int = CONTEXT_ELIDED_OBSERVATION_TOKENS,
+	):
+		self.max_prompt_tokens = max_prompt_tokens
+		self.keep_last_messages = keep_last_messages
+		self.max_observation_tokens = max_observation_tokens
+		self.elided_observation_tokens = elided_observation_tokens
+
+	def count(self, messages: list[dict]) -> int:
+		return count_message_tokens(messages)
+
+	def fit(self, messages: list[dict]) -> list[dict]:
+		"""Return the messages to send, the full history in `messages` is left untouched"""
+		head = [messages[0]] if messages and messages[0]["role"] == "system" else []
+		body = messages[len(head) :]
+		task, steps = body[:1], body[1:]
+
+		split = max(len(steps) - self.keep_last_messages, 0)
+		older = [self.shorten(message, self.elided_observation_tokens, "elided") for message in steps[:split]]
+		recent = [self.shorten(message, self.max_observation_tokens, "truncated") for message in steps[split:]]
+
+		fitted = head + task + older + recent
+		omitted = 0
+		while self.count(fitted) > self.max_prompt_tokens and older:
+			# drop the oldest step (assistant action + observation) so the roles keep alternating
+			drop = 2 if len(older) >= 2 else 1
+			older = older[drop:]
+			omitted += drop
+			fitted = head + self.note_omitted(task, omitted) + older + recent
+
+		tokens = self.count(fitted)
+		if tokens > self.max_prompt_tokens:
+			raise ContextBudgetExceeded(tokens, self.max_prompt_tokens)
+		return fitted
+
+	def shorten(self, message: dict, max_tokens: int, label: str) -> dict:
+		if not is_observation(message):
+			return message
+		content = str(message["content"])
+		tokens = estimate_tokens(content)
+		if tokens <= max_tokens:
+			return message
+		kept = content[: max_tokens * CHARS_PER_TOKEN]
+		return {"role": message["role"], "content": f"{kept} ... [{label} {tokens - max_tokens} tokens]"}
+
+	def note_omitted(self, task: list[dict], omitted: int) -> list[dict]:
+		if not task:
+			return []
+		content = f"{task[0]['content']}\n\n[{omitted} earlier messages were omitted to fit the context window]"
+		return [{"role": task[0]["role"], "content": content}]
@@ -0,0 +1,249 @@
+import calendar
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from src.core.config.environtment import DEFAULT_TIMEZONE
+
+# relative days, only expressions that point to one exact day (e.g. not "minggu lalu" / "last week")
+RELATIVE_DAYS = {
+	"hari ini": 0,
+	"sekarang": 0,
+	"barusan": 0,
+	"tadi": 0,
+	"tadi pagi": 0,
+	"tadi siang": 0,
+	"tadi sore": 0,
+	"tadi malam": 0,
+	"pagi ini": 0,
+	"siang ini": 0,
+	"sore ini": 0,
+	"malam ini": 0,
+	"today": 0,
+	"now": 0,
+	"tonight": 0,
+	"this morning": 0,
+	"this afternoon": 0,
+	"this evening": 0,
+	"kemarin": -1,
+	"kemaren": -1,
+	"kmrn": -1,
+	"semalam": -1,
+	"kemarin malam": -1,
+	"yesterday": -1,
+	"last night": -1,
+	"kemarin lusa": -2,
+	"the day before yesterday": -2,
+	"besok": 1,
+	"tomorrow": 1,
+	"lusa": 2,
+	"the day after tomorrow": 2,
+}
+WEEKDAYS = {
+	"senin": 0,
+	"selasa": 1,
+	"rabu": 2,
+	"kamis": 3,
+	"jumat": 4,
+	"sabtu": 5,
+	"ahad": 6,
+	"minggu": 6,  # only after "hari", "minggu lalu" means last week
+	"monday": 0,
+	"tuesday": 1,
+	"wednesday": 2,
+	"thursday": 3,
+	"friday": 4,
+	"saturday": 5,
+	"sunday": 6,
+}
+MONTHS = {
+	"januari": 1, "jan": 1, "january": 1,
+	"februari": 2, "feb": 2, "pebruari": 2, "february": 2,
+	"maret": 3, "mar": 3, "march": 3,
+	"april": 4, "apr": 4,
+	"mei": 5, "may": 5,
+	"juni": 6, "jun": 6, "june": 6,
+	"juli": 7, "jul": 7, "july": 7,
+	"agustus": 8, "agu": 8, "agt": 8, "aug": 8, "august": 8,
+	"september": 9, "sep": 9, "sept": 9,
+	"oktober": 10, "okt": 10, "oct": 10, "october": 10,
+	"november": 11, "nov": 11, "nop": 11,
+	"desember": 12, "des": 12, "dec": 12, "december": 12,
+}
+NUMBER_WORDS = {
+	"se": 1, "satu": 1, "a": 1, "an": 1, "one": 1,
+	"dua": 2, "two": 2,
+	"tiga": 3, "three": 3,
+	"empat": 4, "four": 4,
+	"lima": 5, "five": 5,
+	"enam": 6, "six": 6,
+	"tujuh": 7, "seven": 7,
+}
+UNITS = {
+	"hari": "days", "day": "days", "days": "days",
+	"minggu": "weeks", "pekan": "weeks", "week": "weeks", "weeks": "weeks",
+	"bulan": "months", "month": "months", "months": "months",
+	"tahun": "years", "year": "years", "years": "years",
+}
+PERIODS = {"pagi": "am", "siang": "noon", "sore": "pm", "malam": "night", "am": "am", "pm": "pm"}
+
+MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+WEEKDAY = "|".join(weekday for weekday in WEEKDAYS if weekday != "minggu")
+NUMBER = r"\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+UNIT = "|".join(UNITS)
+
+TIME_PATTERNS = [
+	re.compile(r"(?:^|\s)(?:jam|pukul|pkl|at)\s+(\d{1,2})(?:[:.](\d{2}))?(?:\s*(pagi|siang|sore|malam|am|pm))?(?=\s|$)"),
+	re.compile(r"(?:^|\s)(\d{1,2})(?::(\d{2}))?\s*(am|pm)(?=\s|$)"),
+	re.compile(r"(?:^|\s)(\d{1,2}):(\d{2})()(?=\s|$)"),
+]
+AGO_PATTERN = re.compile(rf"^({NUMBER})\s*({UNIT})(?: yang)? (?:lalu|kemarin|sebelumnya|ago)$")
+SE_AGO_PATTERN = re.compile(rf"^se({UNIT})(?: yang)? (?:lalu|kemarin|sebelumnya)$")
+LATER_PATTERN = re.compile(rf"^(?:in )?({NUMBER})\s*({UNIT}) (?:lagi|kedepan|later|from now)$|^in ({NUMBER}) ({UNIT})$")
+WEEKDAY_PATTERN = re.compile(rf"^(?:(last|next|this) )?(?:hari )?({WEEKDAY}|(?<=hari )minggu)(?: (lalu|kemarin|kemaren|kmrn|depan|ini))?$")
+ISO_PATTERN = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+NUMERIC_PATTERN = re.compile(r"^(\d{1,2})[/\-.](\d{1,2})(?:[/\-.](\d{4}|\d{2}))?$")
+DAY_MONTH_PATTERN = re.compile(rf"^(?:(?:tanggal|tgl) )?(\d{{1,2}}) ({MONTH})(?: (\d{{4}}))?$")
+MONTH_DAY_PATTERN = re.compile(rf"^({MONTH}) (\d{{1,2}})(?:st|nd|rd|th)?(?:,? (\d{{4}}))?$")
+DAY_OF_MONTH_PATTERN = re.compile(r"^(?:tanggal|tgl) (\d{1,2})(?: (?:bulan )?ini)?$")
+
+
+def normalize_expression(expression: str) -> str:
+	text = expression.strip().lower()
+	text = re.sub(r"\byg\b", "yang", text.replace("jum'at", "jumat"))
+	text = re.sub(r"[,!?]+(?=\s|$)", "", text)
+	text = re.sub(r"^(?:pada|on|tgl\.|tanggal\.) ", "", text)
+	return re.sub(r"\s+", " ", text).strip(" .")
+
+
+def add_months(day: date, months: int) -> date:
+	month_index = day.month - 1 + months
+	year, month = day.year + month_index // 12, month_index % 12 + 1
+	return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def parse_number(value: str) -> int:
+	return int(value) if value.isdigit() else NUMBER_WORDS[value]
+
+
+def shift(today: date, amount: int, unit: str) -> date:
+	if unit == "days":
+		return today + timedelta(days=amount)
+	if unit == "weeks":
+		return today + timedelta(weeks=amount)
+	if unit == "months":
+		return add_months(today, amount)
+	return add_months(today, 12 * amount)
+
+
+def build_date(year: int, month: int, day: int) -> date | None:
+	try:
+		return date(year, month, day)
+	except ValueError:
+		return None
+
+
+def to_year(value: str | None, today: date) -> int:
+	if value is None:
+		return today.year
+	return int(value) + 2000 if len(value) == 2 else int(value)
+
+
+class DateResolver:
+	"""
+	Deterministic resolver for the Indonesian and English date expressions users send, e.g. "kemarin",
+	"tadi pagi", "2 minggu lalu", "last friday", "10 juni 2025" or "hari ini jam 3 sore".
+	Without a clock the start of the day is used. Expressions it does not understand return None,
+	the caller falls back to the LLM.
+	"""
+
+	def __init__(self, timezone: str = DEFAULT_TIMEZONE):
+		self.default_timezone = timezone
+
+	def zone(self, timezone: str | None) -> ZoneInfo:
+		try:
+			return ZoneInfo(timezone or self.default_timezone)
+		except (ZoneInfoNotFoundError, ValueError):
+			return ZoneInfo(self.default_timezone)
+
+	def resolve(self, expression: str, timezone: str | None = None, now: datetime | None = None) -> datetime | None:
+		zone = self.zone(timezone)
+		now = now.astimezone(zone) if now is not None else datetime.now(zone)
+		resolved = resolve_local(normalize_expression(expression), now.date(), zone.key)
+		if resolved is None:
+			return None
+		day, clock = resolved
+		return datetime.combine(day, clock, tzinfo=zone)
+
+
+@lru_cache(maxsize=4096)
+def resolve_local(text: str, today: date, timezone: str) -> tuple[date, time] | None:
+	"""Local day and time of the expression, memoized per (expression, local day, timezone)"""
+	if not text:
+		return None
+	text, clock = extract_time(text)
+	if clock is None:
+		return None
+	if not text:
+		# only a clock, e.g. "jam 3 sore"
+		return today, clock
+	day = resolve_day(text, today)
+	return (day, clock) if day is not None else None
+
+
+def extract_time(text: str) -> tuple[str, time | None]:
+	for pattern in TIME_PATTERNS:
+		match = pattern.search(text)
+		if match is None:
+			continue
+		hour, minute, period = int(match.group(1)), int(match.group(2) or 0), PERIODS.get(match.group(3) or "")
+		if period in ("pm", "noon") and hour < 12 and not (period == "noon" and hour >= 11):
+			hour += 12
+		elif period == "night" and 6 <= hour < 12:
+			hour += 12
+		elif period in ("am", "night") and hour == 12:
+			hour = 0
+		if hour > 23 or minute > 59:
+			return text, None
+		return (text[: match.start()] + " " + text[match.end() :]).strip(), time(hour, minute)
+	return text, time(0, 0)
+
+
+def resolve_day(text: str, today: date) -> date | None:
+	if text in RELATIVE_DAYS:
+		return today + timedelta(days=RELATIVE_DAYS[text])
+
+	if match := AGO_PATTERN.match(text):
+		return shift(today, -parse_number(match.group(1)), UNITS[match.group(2)])
+	if match := SE_AGO_PATTERN.match(text):
+		return shift(today, -1, UNITS[match.group(1)])
+	if match := LATER_PATTERN.match(text):
+		number, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+		return shift(today, parse_number(number), UNITS[unit])
+
+	if match := WEEKDAY_PATTERN.match(text):
+		prefix, weekday, suffix = match.group(1), WEEKDAYS[match.group(2)], match.group(3)
+		days_back = (today.weekday() - weekday) % 7
+		if prefix == "next" or suffix == "depan":
+			return today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+		if prefix == "last" or suffix in ("lalu", "kemarin", "kemaren", "kmrn"):
+			return today - timedelta(days=days_back or 7)
+		if prefix == "this" or suffix == "ini":
+			# the day of the current week (Monday to Sunday), "jumat ini" on a Wednesday is the coming Friday
+			return today + timedelta(days=weekday - today.weekday())
+		# a bare weekday is the latest one, recorded expenses are in the past
+		return today - timedelta(days=days_back)
+
+	if match := ISO_PATTERN.match(text):
+		return build_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+	if match := NUMERIC_PATTERN.match(text):
+		# day first, the Indonesian format
+		return build_date(to_year(match.group(3), today), int(match.group(2)), int(match.group(1)))
+	if match := DAY_MONTH_PATTERN.match(text):
+		return build_date(to_year(match.group(3), today), MONTHS[match.group(2)], int(match.group(1)))
+	if match := MONTH_DAY_PATTERN.match(text):
+		return build_date(to_year(match.group(3), today), MONTHS[match.group(1)], int(match.group(2)))
+	if match := DAY_OF_MONTH_PATTERN.match(text):
+		return build_date(today.year, today.month, int(match.group(1)))
+	return None
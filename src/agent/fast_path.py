@@ -0,0 +1,222 @@
+import logging
+import re
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.agent.category_classifier import CategoryClassifier, get_category_classifier
+from src.agent.date_resolver import DateResolver
+from src.core.config.environtment import DEFAULT_TIMEZONE, FAST_PATH_MIN_CONFIDENCE
+from src.core.models.message_model import MessageModel
+from src.core.models.transaction_model import TransactionType
+
+AMOUNT_PATTERN = re.compile(r"^(?:rp\.?)?(\d{1,3}(?:[.,]\d{3})+|\d+(?:[.,]\d+)?)(rb|ribu|k|jt|juta)?$")
+AMOUNT_MULTIPLIERS = {"rb": 1_000, "ribu": 1_000, "k": 1_000, "jt": 1_000_000, "juta": 1_000_000}
+
+# longest run of words tried as a date expression, e.g. "2 minggu yang lalu"
+MAX_DATE_WORDS = 4
+# words that point to a date or intent the fast path does not handle, the message goes to the agent instead
+AMBIGUOUS_WORDS = {
+	"berapa", "apa", "kapan", "mana", "total", "laporan", "rekap", "riwayat", "cari", "lihat", "tampilkan", "cek", "hapus", "ubah", "edit", "ganti", "update",
+	"delete", "batal", "batalkan", "koreksi", "salah", "bukan", "lusa", "besok", "minggu", "bulan", "tahun", "tanggal", "tgl", "lalu", "senin", "selasa",
+	"rabu", "kamis", "jumat", "sabtu", "dan", "sama", "plus", "terus", "juga",
+}
+EXPENSE_WORDS = {"beli", "bayar", "belanja", "jajan"}
+INCOME_WORDS = {"gaji", "gajian", "bonus", "thr", "pemasukan", "terima", "diterima", "dapat", "dapet", "dividen", "income", "salary"}
+FILLER_WORDS = {"beli", "bayar", "buat", "untuk", "utk", "di", "ke", "rp"}
+MONTHS = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli", "Agustus", "September", "Oktober", "November", "Desember"]
+
+MAX_MESSAGE_LENGTH = 60
+MAX_DESCRIPTION_WORDS = 4
+
+
+class ParsedTransaction:
+	user_id: str
+	date: datetime
+	amount: float
+	description: str
+	# None until QuickTransactionParser.classify fills it
+	category: str | None
+	type: str
+	confidence: float
+
+	def __init__(self, user_id, date, amount, description, category, type, confidence):
+		self.user_id = user_id
+		self.date = date
+		self.amount = amount
+		self.description = description
+		self.category = category
+		self.type = type
+		self.confidence = confidence
+
+	def to_args(self):
+		"""Arguments for CreateTransactionTool, in the same shape the LLM sends them"""
+		return [{"user_id": self.user_id, "date": self.date.isoformat(), "amount": self.amount, "description": self.description, "category": self.category, "type": self.type}]
+
+
+class QuickTransactionParser:
+	"""
+	Deterministic parser for the dominant message shape: a short description, one amount and an optional relative date,
+	e.g. "kopi 18rb", "bensin 50.000 kemarin" or "gaji 8jt". Anything it is not sure about returns None.
+	"""
+
+	def __init__(self, timezone: str = DEFAULT_TIMEZONE, date_resolver: DateResolver | None = None, classifier: CategoryClassifier | None = None):
+		self.timezone = ZoneInfo(timezone)
+		self.date_resolver = date_resolver or DateResolver(timezone)
+		self.classifier = classifier or get_category_classifier()
+
+	def parse(self, user_id: str, text: str, now: datetime | None = None) -> ParsedTransaction | None:
+		parsed = self.parse_text(user_id, text, now)
+		return self.classify(parsed) if parsed is not None else None
+
+	def parse_text(self, user_id: str, text: str, now: datetime | None = None) -> ParsedTransaction | None:
+		"""The transaction of the message without its category, nothing is read from the user's history"""
+		text = text.strip().lower()
+		if not text or len(text) > MAX_MESSAGE_LENGTH or "?" in text:
+			return None
+
+		now = now.astimezone(self.timezone) if now is not None else datetime.now(self.timezone)
+		words, date = self.extract_date(text.replace(",-", "").split(), now)
+		if date is None or date.date() > now.date():
+			# planned transactions ("besok") are left to the agent
+			return None
+		if any(word in AMBIGUOUS_WORDS for word in words):
+			return None
+
+		amounts, words, amount_confidence = self.extract_amount(words)
+		if len(amounts) != 1:
+			return None
+
+		description_words = [word for word in words if word not in FILLER_WORDS]
+		if not description_words or len(description_words) > MAX_DESCRIPTION_WORDS:
+			return None
+		if not all(re.fullmatch(r"[a-z][a-z'\-]*", word) for word in description_words):
+			return None
+
+		is_income = any(word in INCOME_WORDS for word in words)
+		if is_income and any(word in EXPENSE_WORDS for word in words):
+			# "bayar gaji art 2jt" is an expense paid as salary, leave it to the agent
+			return None
+
+		return ParsedTransaction(
+			user_id=user_id,
+			date=date,
+			amount=amounts[0],
+			description=" ".join(description_words),
+			category=None,
+			type=TransactionType.income if is_income else TransactionType.expense,
+			confidence=amount_confidence,
+		)
+
+	def classify(self, parsed: ParsedTransaction) -> ParsedTransaction | None:
+		"""Fill the category from the classifier, None when it is not confident"""
+		parsed.category = self.classifier.predict(parsed.user_id, parsed.description)
+		return parsed if parsed.category is not None else None
+
+	def extract_date(self, words: list[str], now: datetime) -> tuple[list[str], datetime | None]:
+		"""Remove the longest run of words the date resolver understands, the start of today when there is none"""
+		for size in range(min(MAX_DATE_WORDS, len(words)), 0, -1):
+			for start in range(len(words) - size + 1):
+				span = words[start : start + size]
+				# a run of plain numbers is an amount, not a date
+				if not any(re.search(r"[a-z]", word) for word in span):
+					continue
+				date = self.date_resolver.resolve(" ".join(span), self.timezone.key, now)
+				if date is not None:
+					return words[:start] + words[start + size :], date
+		return words, now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+	def extract_amount(self, words: list[str]) -> tuple[list[float], list[str], float]:
+		"""Return the amounts found, the remaining words and how sure we are the number is an amount of money"""
+		amounts = []
+		remaining = []
+		confidence = 1.0
+		index = 0
+		while index < len(words):
+			word = words[index]
+			# "18 rb" / "rp 25.000"
+			if index + 1 < len(words) and words[index + 1] in AMOUNT_MULTIPLIERS and re.fullmatch(r"\d+(?:[.,]\d+)?", word):
+				word = word + words[index + 1]
+				index += 1
+			match = AMOUNT_PATTERN.match(word)
+			if match is None:
+				remaining.append(words[index])
+				index += 1
+				continue
+			number, suffix = match.groups()
+			amount, amount_confidence = self.parse_number(number, suffix)
+			if amount is None:
+				return [], words, 0.0
+			amounts.append(amount)
+			confidence = min(confidence, amount_confidence)
+			index += 1
+		return amounts, remaining, confidence
+
+	def parse_number(self, number: str, suffix: str | None) -> tuple[float | None, float]:
+		if suffix:
+			value = float(number.replace(",", "."))
+			if number.count(".") + number.count(",") > 1:
+				return None, 0.0
+			return self.normalize_amount(value * AMOUNT_MULTIPLIERS[suffix]), 1.0
+		if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", number):
+			# dotted/comma thousands "50.000" / "1.250.000"
+			return self.normalize_amount(float(re.sub(r"[.,]", "", number))), 1.0
+		if re.fullmatch(r"\d+", number):
+			value = float(number)
+			# "kopi 18" is more likely a typo or a quantity than Rp18
+			return self.normalize_amount(value), 1.0 if value >= 1_000 else 0.3
+		return None, 0.0
+
+	def normalize_amount(self, value: float) -> float:
+		return int(value) if value == int(value) else value
+
+
+class FastPathHandler:
+	"""Records the simple transactions found by QuickTransactionParser directly with the create_transaction tool"""
+
+	def __init__(self, parser: QuickTransactionParser | None = None, min_confidence: float = FAST_PATH_MIN_CONFIDENCE):
+		self.parser = parser or QuickTransactionParser()
+		self.min_confidence = min_confidence
+
+	def parse(self, message: MessageModel, now: datetime | None = None) -> ParsedTransaction | None:
+		"""The uncategorized transaction of a simple text message, None when the parser is not confident enough"""
+		if message.message_type != "text" or message.is_have_image():
+			return None
+		parsed = self.parser.parse_text(message.user_id, message.message_content or "", now)
+		if parsed is None or parsed.confidence < self.min_confidence:
+			return None
+		return parsed
+
+	async def handle(self, message: MessageModel, create_tool, now: datetime | None = None) -> str | None:
+		"""Return the reply for the user, or None when the message must go through the agent"""
+		if create_tool is None:
+			return None
+		parsed = self.parse(message, now)
+		if parsed is None:
+			return None
+		try:
+			repository = getattr(create_tool, "repository", None)
+			if repository is not None:
+				# the category comes from the user's own history when it is known
+				await self.parser.classifier.ensure_user(message.user_id, repository)
+			parsed = self.parser.classify(parsed)
+			if parsed is None:
+				return None
+			result = await create_tool.run(parsed.to_args())
+		except Exception as e:
+			# the agent turns tool errors into a reply, a failed fast path must not leave the user without one
+			logging.warning(f"Fast path failed, falling back to the agent: {e}")
+			return None
+		if not isinstance(result, dict):
+			return None
+		return self.reply(parsed)
+
+	def reply(self, parsed: ParsedTransaction) -> str:
+		label = "pemasukan" if parsed.type == TransactionType.income else "pengeluaran"
+		date = f"{parsed.date.day} {MONTHS[parsed.date.month - 1]} {parsed.date.year}"
+		return f"Berhasil mencatat {label} {format_rupiah(parsed.amount)} untuk {parsed.description} (kategori {parsed.category}) pada {date}."
+
+
+def format_rupiah(amount: float) -> str:
+	if amount == int(amount):
+		return "Rp" + f"{int(amount):,}".replace(",", ".")
+	return "Rp" + f"{amount:,.2f}".replace(",", "#").replace(".", ",").replace("#", ".")
@@ -1,60 +1,161 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Callable, Optional
+
+from src.agent.agent_resources import AgentResources, get_agent_resources, get_current_resources, run_in_session, use_resources
+from src.core.config.environtment import MEMORY_SUMMARY_BATCH_SIZE, MEMORY_SUMMARY_MIN_MESSAGES
 from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
-from src.repositories.memory_message_repository import get_memory_message_repository
+from src.repositories.async_memory_message_repository import AsyncMemoryMessageRepository
+from src.repositories.async_memory_summary_repository import AsyncMemorySummaryRepository
 from src.services.llm_service import LLMService
+from src.services.memory_write_buffer import MemoryWriteBuffer, get_memory_write_buffer
+
+NO_MEMORY = "No previous conversations found."
+
+# latest summary fold of each user, a new fold waits for the previous one so folds of the same user never overlap
+summary_tasks: dict[str, asyncio.Task] = {}
+# messages added per user since the last fold was scheduled, a fold is only scheduled once there are min_messages of them
+unsummarized_messages: Counter[str] = Counter()
 
 
 class MemoryManagement:
-	def __init__(self, llm_service: LLMService):
+	def __init__(
+		self,
+		llm_service: LLMService,
+		memory_repo: Optional[AsyncMemoryMessageRepository] = None,
+		summary_repo: Optional[AsyncMemorySummaryRepository] = None,
+		resources_factory: Callable[[], AgentResources] = get_agent_resources,
+		write_buffer: Optional[MemoryWriteBuffer] = None,
+	):
 		self.llm_service = llm_service
-		self.memory_repo = get_memory_message_repository()
+		self.write_buffer = write_buffer if write_buffer is not None else get_memory_write_buffer()
+		self._memory_repo = memory_repo
+		self._summary_repo = summary_repo
+		self.resources_factory = resources_factory
+		self.min_messages = MEMORY_SUMMARY_MIN_MESSAGES
+		self.batch_size = MEMORY_SUMMARY_BATCH_SIZE
+
+	@property
+	def memory_repo(self) -> AsyncMemoryMessageRepository:
+		if self._memory_repo is not None:
+			return self._memory_repo
+		return self.current_resources().memory_repository
+
+	@property
+	def summary_repo(self) -> AsyncMemorySummaryRepository:
+		if self._summary_repo is not None:
+			return self._summary_repo
+		return self.current_resources().memory_summary_repository
 
-	def add_memory(self, user_id: str, role: str, message: str):
-		"""Add a memory message to the database"""
+	def current_resources(self) -> AgentResources:
+		resources = get_current_resources()
+		if resources is None:
+			raise RuntimeError("MemoryManagement must run inside an agent run or be given a repository")
+		return resources
+
+	async def add_memory(self, user_id: str, role: str, message: str):
+		"""Queue a memory message, it is written to the database in the next batch"""
 		memory_data = CreateMemoryMessageSchema(
 			user_id=user_id,
 			role=role,
 			message=message
 		)
-		return self.memory_repo.create(memory_data)
+		row = await self.write_buffer.add(memory_data)
+		unsummarized_messages[user_id] += 1
+		return row
 
-	def get_memory_from_user(self, user_id: str, limit: int = 50) -> list:
-		"""Get memory messages for a user, sorted by latest"""
-		memory_messages = self.memory_repo.get_list(user_id, limit)
+	async def get_memory_from_user(self, user_id: str, limit: int = 50) -> list:
+		"""Get memory messages for a user, sorted by latest, including the messages not written yet"""
+		pending = self.write_buffer.pending_for(user_id)
+		memory_messages = await run_in_session(self.memory_repo.get_list, user_id, limit)
+		# a batch written while the list was read is both in the database and in the pending snapshot.
+		# Matched on the client id, the same message sent twice in a second is two rows even where timestamps have seconds
+		written = {msg.client_id for msg in memory_messages}
+		pending = [msg for msg in reversed(pending) if msg["client_id"] not in written]
 		return [
+			{
+				"role": msg["role"],
+				"message": msg["message"],
+				"created_at": msg["created_at"].isoformat()
+			}
+			for msg in pending
+		][:limit] + [
 			{
 				"role": msg.role,
 				"message": msg.message,
 				"created_at": msg.created_at.isoformat()
 			}
 			for msg in memory_messages
-		]
-
-	def summarize_memory(self, user_id: str, limit: int = 100) -> str:
-		"""Summarize memory messages for a user"""
-		memories = self.get_memory_from_user(user_id, limit)
-		
-		if not memories:
-			return "No previous conversations found."
-		
-		# Format memories for summarization
-		memory_text = "\n".join([
-			f"{mem['role']}: {mem['message']}" 
-			for mem in reversed(memories)  # Reverse to get chronological order
-		])
-		
-		# Create summarization prompt
+		][: max(limit - len(pending), 0)]
+
+	async def get_summary(self, user_id: str) -> str:
+		"""Stored rolling summary of the user's conversations, no LLM call on the request path"""
+		memory_summary = await run_in_session(self.summary_repo.get, user_id)
+		if memory_summary is None or not memory_summary.summary:
+			return NO_MEMORY
+		return memory_summary.summary
+
+	def summary_due(self, user_id: str) -> bool:
+		"""Whether enough messages were added since the last fold to fold a batch, no DB read"""
+		return unsummarized_messages[user_id] >= self.min_messages
+
+	def schedule_summary(self, user_id: str) -> asyncio.Task:
+		"""Fold the new messages of the user into the summary in the background"""
+		unsummarized_messages.pop(user_id, None)
+		previous = summary_tasks.get(user_id)
+		task = asyncio.create_task(self.summarize_after(previous, user_id))
+		summary_tasks[user_id] = task
+		task.add_done_callback(lambda done: summary_tasks.pop(user_id, None) if summary_tasks.get(user_id) is done else None)
+		return task
+
+	async def summarize_after(self, previous: asyncio.Task | None, user_id: str):
+		if previous is not None:
+			await asyncio.gather(previous, return_exceptions=True)
+		resources = self.resources_factory()
+		try:
+			# the messages of this turn may still be queued, only written rows are folded
+			await self.write_buffer.flush()
+			with use_resources(resources):
+				await self.summarize_memory(user_id)
+		except Exception as e:
+			logging.warning(f"Memory summary of {user_id} failed: {e}")
+		finally:
+			await resources.close()
+
+	async def summarize_memory(self, user_id: str) -> str:
+		"""Fold the messages not folded yet into the stored summary, batch by batch"""
+		memory_summary = await run_in_session(self.summary_repo.get, user_id)
+		summary = memory_summary.summary if memory_summary is not None else ""
+
+		while True:
+			memories = await run_in_session(self.memory_repo.get_unfolded, user_id, self.batch_size)
+			if len(memories) < self.min_messages:
+				break
+			summary = await self.fold(summary, memories) or summary
+			if await run_in_session(self.summary_repo.save, user_id, summary, [memory.id for memory in memories]) is None:
+				# another worker folded these messages first, its summary is kept
+				return await self.get_summary(user_id)
+			if len(memories) < self.batch_size:
+				break
+
+		return summary or NO_MEMORY
+
+	async def fold(self, summary: str, memories: list) -> str:
+		memory_text = "\n".join([f"{mem.role}: {mem.message}" for mem in memories])
+
 		summarization_prompt = f"""
-		You are an AI assistant tasked with summarizing a conversation between a user and an assistant.
-		Given the following conversation, create a concise summary that clearly outlines the user's questions or requests and provides a brief overview of the assistant's responses.
-		Highlight key points, including the user's requests and the assistant's specific Final Answers.
+		You are an AI assistant maintaining a running summary of the conversation between a user and an assistant.
+		Update the current summary with the new messages, keep what is still relevant from the current summary
+		and add the user's new questions or requests and the assistant's specific Final Answers.
 		Ensure the summary is clear, concise, and written in a single short paragraph.
 
-		Chat History:
+		Current Summary:
+		{summary or NO_MEMORY}
+
+		New Messages:
 		{memory_text}
 		"""
-		
-		# Use LLM service to generate summary
+
 		messages = [{"role": "user", "content": summarization_prompt}]
-		summary = self.llm_service.query_execute(messages) # type: ignore
-		
-		return summary or "Unable to generate summary."
\ No newline at end of file
+		return await self.llm_service.query_execute(messages)  # type: ignore
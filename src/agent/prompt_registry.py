@@ -0,0 +1,71 @@
+import os
+from functools import lru_cache
+from typing import Iterable
+
+import yaml
+from jinja2 import Template
+
+from src.core.config.environtment import PROMPT_VERSION
+from src.core.interfaces.tool import Tool
+
+PROMPT_PATH = os.path.join(os.path.dirname(__file__), "prompt", "system_prompt.yaml")
+
+
+@lru_cache(maxsize=1)
+def get_prompt_registry():
+	return PromptRegistry(PROMPT_PATH)
+
+
+class CompiledPrompt:
+	"""
+	System prompt with the static part (instructions + tools) rendered once.
+	Only the memory block is rendered per request and it is always appended after the static prefix,
+	so the prefix stays byte-identical between requests and can be served from the provider prompt cache.
+	"""
+
+	def __init__(self, version: str, prefix: str, memory_template: Template):
+		self.version = version
+		self.prefix = prefix
+		self.memory_template = memory_template
+
+	def render(self, user_memory: str | None = None) -> str:
+		if not user_memory:
+			return self.prefix
+		return f"{self.prefix}\n\n{self.memory_template.render(user_memory=user_memory)}"
+
+
+class PromptRegistry:
+	def __init__(self, path: str = PROMPT_PATH):
+		with open(path, "r") as file:
+			templates = yaml.safe_load(file)
+		self.system_prompts: dict[str, str] = templates["system_prompt"]
+		self.memory_template = Template(templates["memory_prompt"])
+		self.compiled: dict[tuple[str, tuple[str, ...]], CompiledPrompt] = {}
+
+	def versions(self) -> list[str]:
+		return list(self.system_prompts.keys())
+
+	def get(self, tools: Iterable[Tool], version: str | None = None) -> CompiledPrompt:
+		"""Get the compiled prompt for the given tools, the template is compiled only on the first call."""
+		version = version or PROMPT_VERSION
+		tools = list(tools)
+		key = (version, tuple(tool.name() for tool in tools))
+		if key not in self.compiled:
+			self.compiled[key] = self.compile(version, tools)
+		return self.compiled[key]
+
+	def compile(self, version: str, tools: list[Tool]) -> CompiledPrompt:
+		if version not in self.system_prompts:
+			raise ValueError(f"Unknown prompt version: {version}, available versions: {', '.join(self.versions())}")
+		prefix = Template(self.system_prompts[version]).render(tools_description=self.tools_description(tools))
+		return CompiledPrompt(version, prefix, self.memory_template)
+
+	@staticmethod
+	def tools_description(tools: list[Tool]) -> str:
+		"""Description of the tools to call, the results of static tools are rendered as data so they are never called"""
+		static_results = {tool.name(): tool.static_result() for tool in tools}
+		described = [f"{tool.name()}: {tool.description()} Args: {tool.get_args_schema()} Output: {tool.output_schema()}" for tool in tools if static_results[tool.name()] is None]
+		data = [f"{name}: {result}" for name, result in static_results.items() if result is not None]
+		if not data:
+			return "\n".join(described)
+		return "\n".join(described) + "\n\nAlready known, use these results instead of calling the tool:\n" + "\n".join(data)
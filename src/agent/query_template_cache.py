@@ -0,0 +1,234 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.agent.date_resolver import MONTH, MONTHS, build_date
+from src.core.config.environtment import (
+	QUERY_TEMPLATE_CACHE_MAX_ENTRIES,
+	QUERY_TEMPLATE_HIT_FLUSH_INTERVAL,
+	QUERY_TEMPLATE_MEMORY_TTL,
+	QUERY_TEMPLATE_TTL_DAYS,
+)
+from src.database.connection import SessionLocal
+from src.repositories.query_template_repository import QueryTemplateRepository
+from src.repositories.raw_query_guard import tokenize_sql
+
+MAX_KEY_LENGTH = 500
+ISO_DATE_PATTERN = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE_PATTERN = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\b")
+DAY_MONTH_PATTERN = re.compile(rf"\b(\d{{1,2}}) ({MONTH})\b(?: (\d{{4}})\b)?")
+NUMBER_PATTERN = re.compile(r"\b(\d+(?:[.,]\d+)*)(?: ?(rb|ribu|k|jt|juta))?\b")
+MULTIPLIERS = {"rb": 1_000, "ribu": 1_000, "k": 1_000, "jt": 1_000_000, "juta": 1_000_000}
+# bind parameters of a text() statement, the same rule SQLAlchemy uses (a "::" cast is not a parameter)
+BIND_PATTERN = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+# string literals a template may keep: date parts, intervals, date formats and the transaction types.
+# Anything else (a date, a category, a description) is a value of one question and must not be reused
+STRUCTURAL_LITERAL = re.compile(
+	r"year|quarter|month|week|day|dow|doy|hour|minute|second|epoch|expense|income|start of (?:month|year)|weekday \d"
+	r"|[-+]?\d+ (?:days?|weeks?|months?|years?|hours?)|[%YMDHSWmdyhsw/:. -]+",
+	re.I,
+)
+
+
+@lru_cache(maxsize=1)
+def get_query_template_cache():
+	return QueryTemplateCache()
+
+
+def parse_amount(value: str, unit: str | None) -> int | float:
+	"""Indonesian amounts, "50.000" is fifty thousand and "1,5" one and a half"""
+	if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", value) and unit is None:
+		number = float(value.replace(".", "").replace(",", ""))
+	else:
+		number = float(value.replace(".", "").replace(",", ".")) if value.count(",") == 1 else float(value.replace(",", ""))
+	number *= MULTIPLIERS.get(unit, 1)
+	return int(number) if number.is_integer() else number
+
+
+def normalize_query(query: str, today: date | None = None) -> tuple[str, dict]:
+	"""
+	Shape of the question with absolute dates and numbers replaced by bind parameter names,
+	e.g. "pengeluaran di atas 50rb sejak 1 juni 2025" -> ("pengeluaran di atas :num_0 sejak :date_0", {...}).
+	Relative periods ("bulan ini") stay in the key, their SQL uses CURRENT_DATE so the template keeps its meaning.
+	"""
+	today = today or date.today()
+	text = " ".join(query.lower().split()).strip(" ?!.")
+	params: dict = {}
+
+	def bind(prefix: str, value) -> str:
+		name = f"{prefix}_{sum(1 for key in params if key.startswith(prefix))}"
+		params[name] = value
+		return f":{name}"
+
+	def bind_date(match: re.Match, value: date | None) -> str:
+		return bind("date", value) if value is not None else match.group(0)
+
+	text = ISO_DATE_PATTERN.sub(lambda m: bind_date(m, build_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))), text)
+	text = NUMERIC_DATE_PATTERN.sub(
+		lambda m: bind_date(m, build_date(int(m.group(3)) + (2000 if len(m.group(3)) == 2 else 0), int(m.group(2)), int(m.group(1)))), text
+	)
+	text = DAY_MONTH_PATTERN.sub(
+		lambda m: bind_date(m, build_date(int(m.group(3)) if m.group(3) else today.year, MONTHS[m.group(2)], int(m.group(1)))), text
+	)
+	text = NUMBER_PATTERN.sub(lambda m: bind("num", parse_amount(m.group(1), m.group(2))), text)
+	return text, params
+
+
+def bind_names(sql: str) -> set[str]:
+	return set(BIND_PATTERN.findall(sql))
+
+
+def hard_coded_values(sql: str, params: dict) -> list[str]:
+	"""Literals of the template that are values of the question instead of bind parameters"""
+	numbers = {str(value) for value in params.values() if isinstance(value, (int, float)) and not isinstance(value, bool)}
+	found = []
+	for token in tokenize_sql(sql):
+		if token.lastgroup == "number" and token.group() in numbers:
+			found.append(token.group())
+		elif token.lastgroup == "string":
+			value = token.group()[1:-1]
+			if not STRUCTURAL_LITERAL.fullmatch(value) or numbers.intersection(re.findall(r"\d+", value)):
+				found.append(token.group())
+	return found
+
+
+class QueryTemplateCache:
+	"""
+	Validated SQL templates of find_transaction keyed by the normalized question. A hit skips the LLM,
+	only the parameters of the new question are bound. Templates are persisted in the query_template table
+	so every worker shares them, the most used ones are kept in memory. Hit counters are counted in memory
+	and written in the background, a hit costs no database write.
+	Storage errors only turn a lookup into a miss, the cache never fails the tool.
+	"""
+
+	def __init__(
+		self,
+		session_factory: Callable = SessionLocal,
+		max_entries: int = QUERY_TEMPLATE_CACHE_MAX_ENTRIES,
+		hit_flush_interval: float = QUERY_TEMPLATE_HIT_FLUSH_INTERVAL,
+		memory_ttl: float = QUERY_TEMPLATE_MEMORY_TTL,
+		ttl_days: int = QUERY_TEMPLATE_TTL_DAYS,
+	):
+		self.session_factory = session_factory
+		self.max_entries = max_entries
+		self.hit_flush_interval = hit_flush_interval
+		self.memory_ttl = memory_ttl
+		self.ttl_days = ttl_days
+		# normalized question -> (SQL template, time.monotonic() it was read)
+		self.templates: OrderedDict[str, tuple[str, float]] = OrderedDict()
+		self.loaded = False
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		# hits of each template not written to query_template yet
+		self.pending_hits: Counter[str] = Counter()
+		self.hits_flushed_at = time.monotonic()
+		self.flushing = False
+
+	def with_repository(self, func: Callable, default=None):
+		session = self.session_factory()
+		try:
+			return func(QueryTemplateRepository(session))
+		except SQLAlchemyError as e:
+			session.rollback()
+			logging.warning(f"Query template storage failed: {e}")
+			return default
+		finally:
+			session.close()
+
+	def remember(self, key: str, sql: str):
+		self.templates[key] = (sql, time.monotonic())
+		self.templates.move_to_end(key)
+		while len(self.templates) > self.max_entries:
+			self.templates.popitem(last=False)
+
+	def used_since(self) -> datetime:
+		return datetime.now() - timedelta(days=self.ttl_days)
+
+	def load(self):
+		templates = self.with_repository(
+			lambda repository: [(t.normalized_query, t.sql_template) for t in repository.get_most_used(self.max_entries, self.used_since())], []
+		)
+		with self.lock:
+			for key, sql in reversed(templates):
+				self.remember(key, sql)
+			self.loaded = True
+
+	def get(self, key: str) -> str | None:
+		"""SQL template of the normalized question, blocking (storage is read on a miss of the memory cache)"""
+		if not self.loaded:
+			self.load()
+		with self.lock:
+			sql, read_at = self.templates.get(key, (None, 0))
+			if sql is not None and time.monotonic() - read_at > self.memory_ttl:
+				# read again, the template may have been deleted by another worker
+				sql = None
+				del self.templates[key]
+		if sql is None:
+			sql = self.with_repository(lambda repository: getattr(repository.get(key, self.used_since()), "sql_template", None))
+		with self.lock:
+			if sql is None:
+				self.misses += 1
+				return None
+			self.hits += 1
+			self.pending_hits[key] += 1
+			self.remember(key, sql)
+		self.schedule_hit_flush()
+		return sql
+
+	def schedule_hit_flush(self):
+		"""Write the hit counters in a background thread at most once per hit_flush_interval"""
+		with self.lock:
+			if self.flushing or not self.pending_hits or time.monotonic() - self.hits_flushed_at < self.hit_flush_interval:
+				return
+			self.flushing = True
+		threading.Thread(target=self.flush_hits, daemon=True).start()
+
+	def flush_hits(self):
+		"""Add the counted hits to query_template, also called on shutdown"""
+		with self.lock:
+			hits, self.pending_hits = self.pending_hits, Counter()
+			self.hits_flushed_at = time.monotonic()
+		try:
+			if hits and self.with_repository(lambda repository: repository.record_hits(hits)) is None:
+				# storage failed, the hits are counted again on the next flush
+				with self.lock:
+					self.pending_hits.update(hits)
+		finally:
+			with self.lock:
+				self.flushing = False
+
+	def is_reusable(self, key: str, sql: str, params: dict) -> bool:
+		"""
+		Only single statements binding exactly the user and the values taken out of the question are reused,
+		without literals of the question (a date, an amount, a category) that would be wrong for the next one
+		"""
+		if len(key) > MAX_KEY_LENGTH or ";" in sql.strip().rstrip(";"):
+			return False
+		return bind_names(sql) == set(params) and not hard_coded_values(sql, params)
+
+	def store(self, key: str, sql: str):
+		with self.lock:
+			self.remember(key, sql)
+		self.with_repository(lambda repository: repository.save(key, sql))
+
+	def forget(self, key: str):
+		"""Delete a bad template (e.g. one that failed when it was reused), the next question of its shape asks the LLM"""
+		with self.lock:
+			self.templates.pop(key, None)
+			self.pending_hits.pop(key, None)
+		self.with_repository(lambda repository: repository.delete([key]))
+
+	def prune(self) -> int:
+		"""Delete the expired templates from storage, return the number deleted"""
+		return self.with_repository(lambda repository: repository.delete_unused(self.used_since()), 0)
+
+	def stats(self) -> dict:
+		return {"hits": self.hits, "misses": self.misses, "entries": len(self.templates)}
@@ -0,0 +1,123 @@
+from collections import Counter
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Iterable
+
+from src.agent.context_window import estimate_tokens
+from src.core.config.environtment import RESULT_MAX_TOKENS
+
+# the observation is always about the current user, the id is only noise
+DROPPED_COLUMNS = {"user_id"}
+SUMMARY_RESERVED_TOKENS = 80
+MAX_SUMMARY_VALUES = 5
+
+
+def is_record(value: Any) -> bool:
+	return isinstance(value, dict) or hasattr(value, "_mapping") or hasattr(value, "to_dict") or hasattr(value, "__table__")
+
+
+def as_record(row: Any) -> dict:
+	"""Column -> value of a SQLAlchemy Row, ORM model, schema with to_dict, dict or plain tuple"""
+	if isinstance(row, dict):
+		return row
+	if hasattr(row, "_mapping"):
+		return dict(row._mapping)
+	if hasattr(row, "to_dict"):
+		return row.to_dict()
+	if hasattr(row, "__table__"):
+		return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+	if isinstance(row, (tuple, list)):
+		return {f"col{index + 1}": value for index, value in enumerate(row)}
+	return {"value": row}
+
+
+def format_value(value: Any) -> str:
+	if value is None:
+		return ""
+	if isinstance(value, datetime):
+		return value.date().isoformat() if value.time() == time(0) and value.tzinfo is None else value.isoformat(timespec="minutes")
+	if isinstance(value, date):
+		return value.isoformat()
+	if isinstance(value, (float, Decimal)):
+		return str(int(value)) if value == int(value) else f"{float(value):.2f}".rstrip("0")
+	return str(value).replace("|", "/").replace("\n", " ")
+
+
+def is_number(value: Any) -> bool:
+	return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def summarize(records: list[dict], columns: list[str]) -> str:
+	"""Aggregates of the rows that did not fit: sum/min/max of numbers, range of dates, counts of repeated values"""
+	parts = []
+	for column in columns:
+		values = [record.get(column) for record in records if record.get(column) is not None]
+		if not values or column == "id":
+			continue
+		if all(is_number(value) for value in values):
+			parts.append(f"{column} sum={format_value(sum(values))} min={format_value(min(values))} max={format_value(max(values))}")
+		elif all(isinstance(value, (date, datetime)) for value in values):
+			parts.append(f"{column} {format_value(min(values))}..{format_value(max(values))}")
+		else:
+			counts = Counter(format_value(value) for value in values)
+			if len(counts) <= len(values) // 2:
+				top = ", ".join(f"{value}={count}" for value, count in counts.most_common(MAX_SUMMARY_VALUES))
+				more = f", +{len(counts) - MAX_SUMMARY_VALUES} more" if len(counts) > MAX_SUMMARY_VALUES else ""
+				parts.append(f"{column} {top}{more}")
+	return "; ".join(parts)
+
+
+def encode_rows(rows: Iterable[Any], total_rows: int | None = None, max_tokens: int = RESULT_MAX_TOKENS) -> str:
+	"""
+	Header plus pipe separated rows, e.g.
+	3 rows | id|date|amount|description
+	all rows: category=Food, type=expense
+	1|2026-10-01|25000|Nasi goreng
+	Columns with the same value in every row are written once. Rows beyond `max_tokens` are replaced by a summary.
+	"""
+	records = [as_record(row) for row in rows]
+	if not records:
+		return "0 rows"
+	columns = [column for column in dict.fromkeys(key for record in records for key in record) if column not in DROPPED_COLUMNS]
+	constant = {}
+	if len(records) > 1:
+		constant = {column: records[0].get(column) for column in columns if column != "id" and all(record.get(column) == records[0].get(column) for record in records)}
+	shown = [column for column in columns if column not in constant] or columns
+	if shown is columns:
+		constant = {}
+
+	count = f"{len(records)} of {total_rows} rows (query row cap)" if total_rows is not None and total_rows > len(records) else f"{len(records)} rows"
+	lines = [f"{count} | {'|'.join(shown)}"]
+	if constant:
+		lines.append("all rows: " + ", ".join(f"{column}={format_value(value)}" for column, value in constant.items()))
+	used = estimate_tokens("\n".join(lines))
+	for index, record in enumerate(records):
+		line = "|".join(format_value(record.get(column)) for column in shown)
+		tokens = estimate_tokens(line) + 1
+		if used + tokens > max_tokens - SUMMARY_RESERVED_TOKENS and index < len(records) - 1 or used + tokens > max_tokens:
+			rest = records[index:]
+			lines.append(f"... {len(rest)} more rows not shown")
+			summary = summarize(records, shown)
+			if summary:
+				lines.append(f"summary of all {len(records)} rows: {summary}")
+			break
+		lines.append(line)
+		used += tokens
+	return "\n".join(lines)
+
+
+def encode_result(result: Any, max_tokens: int = RESULT_MAX_TOKENS) -> str:
+	"""Observation text of a tool result, lists of records are encoded as rows and everything else is kept as it is"""
+	if isinstance(result, str):
+		return result
+	if isinstance(result, list) and result and all(is_record(item) for item in result):
+		return encode_rows(result, max_tokens=max_tokens)
+	if isinstance(result, dict):
+		lines = []
+		for key, value in result.items():
+			if isinstance(value, list) and all(is_record(item) for item in value):
+				lines.append(f"{key}: {encode_rows(value, max_tokens=max_tokens)}")
+			elif key not in DROPPED_COLUMNS:
+				lines.append(f"{key}: {format_value(value)}")
+		return "\n".join(lines)
+	return f"{result}"
@@ -0,0 +1,107 @@
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable
+
+from src.core.config.environtment import TOOL_CACHE_MAX_ENTRIES
+from src.core.interfaces.tool import Tool
+
+
+@lru_cache(maxsize=1)
+def get_tool_result_cache():
+	return ToolResultCache()
+
+
+def normalize_args(args: Any) -> Any:
+	if isinstance(args, dict):
+		return {str(key): normalize_args(value) for key, value in args.items()}
+	if isinstance(args, list):
+		return [normalize_args(value) for value in args]
+	if isinstance(args, str):
+		return " ".join(args.lower().split())
+	return args
+
+
+class ToolResultCache:
+	"""
+	Results of pure tools keyed by (tool, normalized args, version of the user data the tool reads).
+	Tools that write user data bump the version of the keys they invalidate, so stale entries are never read again
+	and age out of the LRU. TTLs bound the staleness of writes made by other processes.
+	Versions come from one counter and are kept in an LRU as large as the entries. The version of an evicted key
+	becomes `version_floor`, the default of every key that has none, so an entry older than the eviction can't match again.
+	"""
+
+	def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES, clock: Callable[[], float] = time.monotonic):
+		self.max_entries = max_entries
+		self.clock = clock
+		self.entries: OrderedDict[tuple, tuple[float | None, Any]] = OrderedDict()
+		self.versions: OrderedDict[tuple[str, str], int] = OrderedDict()
+		self.version_counter = 0
+		self.version_floor = 0
+		self.hits = 0
+		self.misses = 0
+
+	def user_of(self, args: Any, user_id: str) -> str:
+		"""User the call is scoped to, the transaction tools carry it in their args"""
+		first = args[0] if isinstance(args, list) and args else args
+		if isinstance(first, dict) and isinstance(first.get("user_id"), str):
+			return first["user_id"]
+		return user_id
+
+	def key(self, tool: Tool, args: Any, user_id: str) -> tuple:
+		versions = tuple(self.versions.get((user_id, data), self.version_floor) for data in tool.depends_on())
+		return (tool.name(), json.dumps(normalize_args(args), sort_keys=True, default=str), user_id, versions)
+
+	def get(self, key: tuple) -> tuple[bool, Any]:
+		entry = self.entries.get(key)
+		if entry is None:
+			return False, None
+		expires_at, result = entry
+		if expires_at is not None and self.clock() >= expires_at:
+			del self.entries[key]
+			return False, None
+		self.entries.move_to_end(key)
+		return True, result
+
+	def set(self, key: tuple, result: Any, ttl: float | None):
+		self.entries[key] = (self.clock() + ttl if ttl is not None else None, result)
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+
+	def invalidate(self, user_id: str, data_keys: list[str]):
+		for data in data_keys:
+			self.version_counter += 1
+			self.versions[(user_id, data)] = self.version_counter
+			self.versions.move_to_end((user_id, data))
+		while len(self.versions) > self.max_entries:
+			_, version = self.versions.popitem(last=False)
+			# the evicted key now reads the floor, newer than any entry of the key written before this version
+			self.version_floor = max(self.version_floor, version)
+
+	async def run(self, tool: Tool, args: Any, user_id: str = ""):
+		"""Run the tool through the cache"""
+		user_id = self.user_of(args, user_id)
+		if tool.invalidates():
+			try:
+				return await tool.run(args)
+			finally:
+				# bumped even when the tool fails, the write may have happened before the error
+				self.invalidate(user_id, tool.invalidates())
+		if not tool.is_pure():
+			return await tool.run(args)
+
+		key = self.key(tool, args, user_id)
+		hit, result = self.get(key)
+		if hit:
+			self.hits += 1
+			return result
+		self.misses += 1
+		result = await tool.run(args)
+		if tool.cacheable_result(result):
+			self.set(key, result, tool.cache_ttl())
+		return result
+
+	def stats(self) -> dict:
+		return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "versions": len(self.versions)}
@@ -0,0 +1,60 @@
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Iterator
+
+from src.agent.tools.category_tools import GetListCategoryTool
+from src.agent.tools.common_tools import GetDateTool, ImageExtractInformationTool
+from src.agent.tools.transaction_tools import CreateTransactionTool, DeleteTransactionTool, FindTransactionTool, QueryTransactionTool, UpdateTransactionTool
+from src.core.interfaces.tool import Tool
+
+
+def normalize_tool_name(name: str) -> str:
+	return name.strip().lower()
+
+
+@lru_cache(maxsize=1)
+def get_tool_registry():
+	return ToolRegistry(
+		[
+			ImageExtractInformationTool(),
+			GetDateTool(),
+			GetListCategoryTool(),
+			CreateTransactionTool(),
+			QueryTransactionTool(),
+			FindTransactionTool(),
+			UpdateTransactionTool(),
+			DeleteTransactionTool(),
+		]
+	)
+
+
+class ToolRegistry:
+	"""
+	Immutable set of stateless tools keyed by normalized name.
+	The default registry is built once per process and shared by every agent, per-request resources
+	are borrowed by the tools from the current AgentResources instead of being held by the tool.
+	"""
+
+	def __init__(self, tools: Iterable[Tool]):
+		tools_by_name = {}
+		for tool in tools:
+			name = normalize_tool_name(tool.name())
+			if name in tools_by_name:
+				raise ValueError(f"Duplicate tool name: {tool.name()}")
+			tools_by_name[name] = tool
+		self.tools = MappingProxyType(tools_by_name)
+
+	def get(self, name: str) -> Tool | None:
+		return self.tools.get(normalize_tool_name(name))
+
+	def names(self) -> list[str]:
+		return [tool.name() for tool in self.tools.values()]
+
+	def __contains__(self, name: str) -> bool:
+		return normalize_tool_name(name) in self.tools
+
+	def __iter__(self) -> Iterator[Tool]:
+		return iter(self.tools.values())
+
+	def __len__(self) -> int:
+		return len(self.tools)
@@ -1,5 +1,58 @@
 from src.core.interfaces.tool import Tool
 
+CATEGORIES = [
+	"Housing",
+	"Clothing",
+	"Personal Care",
+	"Food",
+	"Transportation",
+	"Entertainment",
+	"Shopping",
+	"Medical",
+	"Transfer",
+	"Salary",
+	"Taxes",
+	"Insurance",
+	"Debt",
+	"Savings",
+	"Investment",
+	"Gifts",
+	"Education",
+	"Charity",
+	"Credit Card",
+	"Other",
+]
+
+# keywords (single words or two-word phrases, lower case) that identify a category in short Indonesian/English messages
+CATEGORY_KEYWORDS = {
+	"Housing": ["sewa", "kos", "kost", "kontrakan", "listrik", "pln", "pdam", "token listrik", "internet", "wifi", "indihome", "ipl", "rent"],
+	"Clothing": ["baju", "celana", "kaos", "kemeja", "jaket", "sepatu", "sandal", "sendal", "hijab", "kerudung", "clothes", "shoes"],
+	"Personal Care": ["potong rambut", "cukur", "pangkas", "salon", "sabun", "sampo", "shampoo", "skincare", "kosmetik", "laundry", "odol", "haircut"],
+	"Food": [
+		"makan", "makanan", "kopi", "ngopi", "sarapan", "jajan", "snack", "minum", "bakso", "nasi", "mie", "mi", "ayam", "sate", "soto", "gorengan", "teh", "roti",
+		"warteg", "gofood", "grabfood", "shopeefood", "restoran", "resto", "cafe", "kafe", "martabak", "pizza", "burger", "boba", "galon", "lunch", "dinner",
+		"breakfast", "coffee", "food",
+	],
+	"Transportation": [
+		"bensin", "bbm", "pertalite", "pertamax", "solar", "parkir", "tol", "ojek", "ojol", "gojek", "goride", "grab", "gocar", "grabcar", "taksi", "taxi",
+		"kereta", "krl", "mrt", "lrt", "busway", "transjakarta", "bus", "angkot", "fuel", "parking",
+	],
+	"Entertainment": ["nonton", "bioskop", "film", "netflix", "spotify", "game", "konser", "karaoke", "liburan", "movie"],
+	"Shopping": ["belanja", "belanjaan", "shopee", "tokopedia", "lazada", "indomaret", "alfamart", "supermarket", "minimarket", "groceries"],
+	"Medical": ["obat", "dokter", "apotek", "rumah sakit", "klinik", "vitamin", "periksa", "medicine"],
+	"Transfer": ["transfer", "tf", "kirim uang"],
+	"Salary": ["gaji", "gajian", "salary", "thr"],
+	"Taxes": ["pajak", "pbb", "tax"],
+	"Insurance": ["asuransi", "bpjs", "premi", "insurance"],
+	"Debt": ["utang", "hutang", "cicilan", "pinjaman", "paylater", "debt"],
+	"Savings": ["tabungan", "nabung", "menabung", "savings"],
+	"Investment": ["investasi", "saham", "reksadana", "reksa dana", "crypto", "kripto", "emas", "dividen", "deposito", "investment"],
+	"Gifts": ["hadiah", "kado", "angpao", "angpau", "gift"],
+	"Education": ["sekolah", "spp", "kuliah", "ukt", "kursus", "les", "buku", "seminar", "course"],
+	"Charity": ["sedekah", "zakat", "infaq", "infak", "donasi", "sumbangan", "amal", "charity"],
+	"Credit Card": ["kartu kredit", "credit card"],
+}
+
 
 class GetListCategoryTool(Tool):
 	def name(self) -> str:
@@ -8,30 +61,14 @@ class GetListCategoryTool(Tool):
 	def description(self) -> str:
 		return "Get list of category for expense/income classification. Always classify user input based on result of this tools."
 
-	def run(self, args) -> str:
-		cartegories = [
-			"Housing",
-			"Clothing",
-			"Personal Care",
-			"Food",
-			"Transportation",
-			"Entertainment",
-			"Shopping",
-			"Medical",
-			"Transfer",
-			"Salary",
-			"Taxes",
-			"Insurance",
-			"Debt",
-			"Savings",
-			"Investment",
-			"Gifts",
-			"Education",
-			"Charity",
-			"Credit Card",
-			"Other",
-		]
-		return ",".join(cartegories)
+	async def run(self, args) -> str:
+		return ",".join(CATEGORIES)
+
+	def is_pure(self) -> bool:
+		return True
+
+	def static_result(self) -> str | None:
+		return ",".join(CATEGORIES)
 
 	def get_args_schema(self):
 		return None
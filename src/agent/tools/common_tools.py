@@ -1,30 +1,46 @@
 from datetime import datetime
 import hashlib
 import hmac
+import json
 from mimetypes import guess_type
 import os
 
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from src.agent.date_resolver import DateResolver
+from src.core.config.environtment import DEFAULT_TIMEZONE
 from src.core.interfaces.tool import Tool
-from datetime import timezone as tz
 
-from src.services.llm_service import get_llm_service
+from src.services.llm_service import VISION_POOL, get_llm_service
 import base64
 
 load_dotenv()
 
 
+class ResolvedDate(str):
+	"""generate_date result of the local resolver, answers of the LLM fallback are not cached"""
+
+
 class GetDateTool(Tool):
+	def __init__(self, resolver: DateResolver | None = None) -> None:
+		self.resolver = resolver or DateResolver()
+
 	def name(self) -> str:
 		return "generate_date"
 
 	def description(self) -> str:
 		return "Convert a natural-language date/time expression into an exact ISO-8601 date or datetime. "
 
-	def run(self, args):
-		ref_ts = datetime.now().isoformat()
+	async def run(self, args):
 		expression = args["expression"]
-		timezone = args["timezone"] or tz.utc
+		timezone = args.get("timezone") or DEFAULT_TIMEZONE
+
+		# 1) Most expressions ("kemarin", "2 minggu lalu", "10 juni") are resolved locally without the LLM
+		resolved = self.resolver.resolve(expression, timezone)
+		if resolved is not None:
+			return ResolvedDate(json.dumps({"datetime": resolved.isoformat()}))
+
+		ref_ts = datetime.now(self.resolver.zone(timezone)).isoformat()
 
 		system_prompt = (
 			"You are a precise date/time parser."
@@ -35,11 +51,22 @@ class GetDateTool(Tool):
 		)
 		user_prompt = f'Expression: "{expression}"\nReference Current Timestamp: "{ref_ts}"\nTimezone: "{timezone}"\nReturn the exact ISO-8601 date/time in the following format: {{format}}'
 
-		# 2) Call the LLM
+		# 2) Fall back to the LLM for the expressions the resolver does not understand
 		llm_service = get_llm_service()
-		resp = llm_service.query_execute(messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}], max_token=200)
+		resp = await llm_service.query_execute(messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}], max_token=200)
 		return resp
 
+	def is_pure(self) -> bool:
+		return True
+
+	def cache_ttl(self) -> float | None:
+		# relative expressions change meaning at midnight
+		return 60
+
+	def cacheable_result(self, result) -> bool:
+		# an LLM answer may be wrong or malformed, it is asked again instead of being served for a minute
+		return isinstance(result, ResolvedDate)
+
 	def get_args_schema(self):
 		return [
 			{"name": "expression", "type": "str", "description": "Natural-language date/time expression", "status": "required"},
@@ -60,7 +87,7 @@ class GetUserIdTool(Tool):
 	def description(self) -> str:
 		return "Get user ID from the encrypted user ID. Always use this tool to get the user ID when you need a user ID."
 
-	def run(self, args):
+	async def run(self, args):
 		return self.create_encrypted_user_id(self.id)
 
 	def output_schema(self):
@@ -81,7 +108,7 @@ class ImageExtractInformationTool(Tool):
 	def description(self) -> str:
 		return "Extract information from an image."
 
-	def run(self, args):
+	async def run(self, args):
 		if "image_path" in args:
 			image_path = args["image_path"]
 			if not os.path.exists(image_path):
@@ -97,7 +124,7 @@ class ImageExtractInformationTool(Tool):
 		if not os.access(image_path, os.R_OK):
 			raise PermissionError(f"Image file is not readable: {image_path}")
 
-		image_base64_resuslt = self.image_to_data_uri(image_path)
+		image_base64_resuslt = await run_in_threadpool(self.image_to_data_uri, image_path)
 
 		contents = []
 		if "caption" in args and args["caption"]:
@@ -120,8 +147,8 @@ class ImageExtractInformationTool(Tool):
 
 		contents.append({"type": "image_url", "image_url": {"url": image_base64_resuslt}})
 		llm_service = get_llm_service()
-		resp = llm_service.query_execute(messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": contents}], model="opengvlab/internvl3-14b:free")
-		self.remove_image_file(image_path)
+		resp = await llm_service.query_execute(messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": contents}], pool=VISION_POOL)
+		await run_in_threadpool(self.remove_image_file, image_path)
 		return resp
 
 	def encode_image_to_base64(self, image_path: str) -> str:
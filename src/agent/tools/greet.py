@@ -8,5 +8,5 @@ class GreetTool(Tool):
 	def description(self) -> str:
 		return "Greet the user"
 
-	def run(self, args):
+	async def run(self, args):
 		return "Hello, My name is AI. How can I help you today?"
@@ -1,22 +1,50 @@
+import logging
+from src.agent.agent_resources import get_current_resources, run_in_session
+from datetime import datetime, timedelta
+from src.agent.category_classifier import CORRECTION_WEIGHT, CategoryClassifier, get_category_classifier
+from src.agent.date_resolver import DateResolver
+from src.agent.query_template_cache import QueryTemplateCache, bind_names, get_query_template_cache, normalize_query
+from src.agent.result_encoder import encode_rows
 from src.core.interfaces.tool import Tool
-from src.core.interfaces.transaction_repository_interface import ITransactionRepository
-from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
-from src.repositories.transaction_repository import get_transaction_repository
-from src.services.llm_service import get_llm_service
+from src.core.interfaces.transaction_repository_interface import IAsyncTransactionRepository, ITransactionRepository
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
+from src.services.llm_service import QUERY_POOL, get_llm_service
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 
-class CreateTransactionTool(Tool):
-    def __init__(self, repository: Optional[ITransactionRepository] = None) -> None:
-        self.repository = repository or get_transaction_repository()
 
+class TransactionTool(Tool):
+    """
+    Base for the tools working on the transaction repository.
+    The tools are shared across agents, so the (async) repository is borrowed from the current agent run
+    unless one is given explicitly (e.g. in tests). Calls go through run_in_session, which awaits either kind.
+    """
+
+    def __init__(self, repository: Optional[ITransactionRepository | IAsyncTransactionRepository] = None, classifier: Optional[CategoryClassifier] = None) -> None:
+        self._repository = repository
+        self.classifier = classifier or get_category_classifier()
+
+    @property
+    def repository(self) -> ITransactionRepository | IAsyncTransactionRepository:
+        if self._repository is not None:
+            return self._repository
+        resources = get_current_resources()
+        if resources is None:
+            raise RuntimeError(f"{self.name()} must run inside an agent run or be given a repository")
+        return resources.transaction_repository
+
+class CreateTransactionTool(TransactionTool):
     def name(self) -> str:
         return "create_transaction"
 
+    def invalidates(self) -> list[str]:
+        return ["transaction"]
+
     def description(self) -> str:
         return "Create a new transaction data"
 
     def validate_args(self, args):
-        required_keys = ["user_id", "date", "amount", "description", "category", "type"]
+        required_keys = ["user_id", "date", "amount", "description", "type"]
         for key in required_keys:
             if key not in args:
                 raise ValueError(f"Missing required argument: {key}")
@@ -28,12 +56,19 @@ class CreateTransactionTool(Tool):
                 raise ValueError("Amount must be a number")
             if key == "type" and args[key] not in ["expense", "income"]:
                 raise ValueError("Type must be either 'expense' or 'income'")
-            if key == "category" and not isinstance(args[key], str):
-                raise ValueError("Category must be a string")
             if key == "description" and not isinstance(args[key], str):
                 raise ValueError("Description must be a string")
+        if args.get("category") is not None and not isinstance(args["category"], str):
+            raise ValueError("Category must be a string")
+
+    async def fill_category(self, arg: dict) -> Optional[str]:
+        """Category given by the LLM, or classified from the user's history when it is missing"""
+        if arg.get("category"):
+            return arg["category"]
+        await self.classifier.ensure_user(arg["user_id"], self.repository)
+        return self.classifier.predict(arg["user_id"], arg["description"])
 
-    def run(self, args: list):
+    async def run(self, args: list):
         createData = []
         # check if args is list
         if not isinstance(args, list):
@@ -47,10 +82,15 @@ class CreateTransactionTool(Tool):
             if not isinstance(arg, dict):
                 return "Each argument in the list should be a dictionary"
             self.validate_args(arg)
+            category = await self.fill_category(arg)
+            if category is None:
+                return f"Category of '{arg['description']}' is unclear, choose one from the category list and call create_transaction again with the category"
             # Create a transaction schema for each argument
-            createData.append(CreateTransactionSchema(user_id=arg["user_id"], date=arg["date"], amount=arg["amount"], description=arg["description"], category=arg["category"], type=arg["type"]))
+            createData.append(CreateTransactionSchema(user_id=arg["user_id"], date=arg["date"], amount=arg["amount"], description=arg["description"], category=category, type=arg["type"]))
 
-        self.repository.create(createData)
+        await run_in_session(self.repository.create, createData)
+        for item in createData:
+            self.classifier.learn(item.user_id, item.description, item.category)
         return {
             "message": f"{len(createData)} record(s) successfully created",
             "transactions": [item.to_dict() for item in createData],
@@ -65,7 +105,7 @@ class CreateTransactionTool(Tool):
                 "date":"Date of the transaction",
                 "amount":"Amount of the transaction",
                 "description":"Description of the transaction",
-                "category":"Category of the transaction",
+                "category":"Optional, category of the transaction. Leave it out unless the user states it, it is classified from the description",
                 "type":"Type of the transaction (expense, income)"
             }
         ]
@@ -75,19 +115,126 @@ class CreateTransactionTool(Tool):
         return "str"
 
 
-class FindTransactionRawSQLTool(Tool):
-    def __init__(self, repository: Optional[ITransactionRepository] = None) -> None:
-        self.repository = repository or get_transaction_repository()
+class QueryTransactionTool(TransactionTool):
+    """
+    Finds and summarizes transactions from a structured query. The LLM only fills the arguments, the statement
+    is built by the repository with bound parameters and always scoped to the user.
+    """
+
+    def __init__(self, repository: Optional[ITransactionRepository | IAsyncTransactionRepository] = None, classifier: Optional[CategoryClassifier] = None, resolver: Optional[DateResolver] = None) -> None:
+        super().__init__(repository, classifier)
+        self.resolver = resolver or DateResolver()
+
+    def name(self) -> str:
+        return "query_transaction"
+
+    def is_pure(self) -> bool:
+        return True
+
+    def depends_on(self) -> list[str]:
+        return ["transaction"]
+
+    def cache_ttl(self) -> float | None:
+        # bounds staleness of writes made by other workers
+        return 300
+
+    def cacheable_result(self, result) -> bool:
+        return isinstance(result, dict)
+
+    def description(self) -> str:
+        return (
+            "Find, list or summarize the user's transactions with filters (date range, categories, type, description search), "
+            "optionally grouped by day, month, category or type with sum, count or avg of the amount."
+        )
+
+    def parse_date(self, value, end: bool = False) -> Optional[datetime]:
+        """Naive local datetime of an ISO date or a date expression, a date-only end date includes the whole day"""
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            raise ValueError("Dates must be strings")
+        try:
+            parsed = datetime.fromisoformat(value)
+            date_only = len(value.strip()) == 10
+        except ValueError:
+            parsed = self.resolver.resolve(value)
+            if parsed is None:
+                raise ValueError(f"Unrecognized date '{value}', use YYYY-MM-DD")
+            date_only = parsed.hour == parsed.minute == 0
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(self.resolver.zone(None)).replace(tzinfo=None)
+        return parsed + timedelta(days=1) if end and date_only else parsed
+
+    async def run(self, args):
+        if not isinstance(args, dict) or not isinstance(args.get("user_id"), str):
+            return "Args should be a dictionary with a 'user_id' string"
+        categories = args.get("categories")
+        if isinstance(categories, str):
+            categories = [categories]
+        aggregates = args.get("aggregates")
+        if isinstance(aggregates, str):
+            aggregates = [aggregates]
+        try:
+            query = TransactionQuerySchema(
+                user_id=args["user_id"],
+                start_date=self.parse_date(args.get("start_date")),
+                end_date=self.parse_date(args.get("end_date"), end=True),
+                categories=categories,
+                type=args.get("type"),
+                search=args.get("search"),
+                group_by=args.get("group_by"),
+                aggregates=aggregates,
+                order_by=args.get("order_by"),
+                order=args.get("order") or "desc",
+                limit=args.get("limit") or 50,
+            )
+        except ValueError as e:
+            return f"Args error: {e}"
+        rows = await run_in_session(self.repository.query, query)
+        return {"rows": rows, "count": len(rows)}
+
+    def get_args_schema(self):
+        return """
+        Args should be a dictionary with the following keys, only user_id is required
+        {
+            "user_id":"User ID",
+            "start_date":"Optional, first day included (YYYY-MM-DD)",
+            "end_date":"Optional, last day included (YYYY-MM-DD)",
+            "categories":"Optional, list of categories",
+            "type":"Optional, expense or income",
+            "search":"Optional, text contained in the description",
+            "group_by":"Optional, one of day, month, category, type",
+            "aggregates":"Optional, list of sum, count, avg. Defaults to sum and count when group_by is set",
+            "order_by":"Optional, one of date, amount, period, category, type, sum, count, avg",
+            "order":"Optional, asc or desc (default desc)",
+            "limit":"Optional, max rows (default 50, max 200)"
+        }
+        """
+
+    def output_schema(self):
+        return "dict"
+
 
+class FindTransactionRawSQLTool(TransactionTool):
     def name(self) -> str:
         return "find_transaction_using_raw_sql"
 
+    def is_pure(self) -> bool:
+        return True
+
+    def depends_on(self) -> list[str]:
+        return ["transaction"]
+
+    def cache_ttl(self) -> float | None:
+        # bounds staleness of writes made by other workers
+        return 300
+
     def description(self) -> str:
         return "Find transaction using raw SQL queryExample: SELECT * FROM transaction WHERE user_id = '123' AND date = '2023-01-01'"
 
-    def run(self, args):
+    async def run(self, args):
         query = args["query"]
-        transactions = self.repository.findRaw(query)
+        transactions = await run_in_session(self.repository.findRaw, query)
         return f"Transactions found: {transactions}"
 
     def get_args_schema(self):
@@ -97,22 +244,57 @@ class FindTransactionRawSQLTool(Tool):
         return "str"
 
 
-class FindTransactionTool(Tool):
-    def __init__(self, repository: Optional[ITransactionRepository] = None) -> None:
-        self.repository = repository or get_transaction_repository()
+class FindTransactionTool(TransactionTool):
+    """
+    Answers from SQL generated by the LLM. The question is normalized (dates and numbers become bind parameters)
+    and the validated SQL template is cached, so the same shape of question is answered without the LLM.
+    """
+
+    def __init__(self, repository: Optional[ITransactionRepository | IAsyncTransactionRepository] = None, classifier: Optional[CategoryClassifier] = None, templates: Optional[QueryTemplateCache] = None) -> None:
+        super().__init__(repository, classifier)
+        self.templates = templates or get_query_template_cache()
 
     def name(self) -> str:
         return "find_transaction"
 
+    def is_pure(self) -> bool:
+        return True
+
+    def depends_on(self) -> list[str]:
+        return ["transaction"]
+
+    def cache_ttl(self) -> float | None:
+        # bounds staleness of writes made by other workers
+        return 300
+
+    def cacheable_result(self, result) -> bool:
+        # errors are not cached so the next call tries again
+        return isinstance(result, str) and not result.startswith(("Error", "Args", "No response"))
+
     def description(self) -> str:
-        return "Find or Get data from the database by natural-language query from user input and user_id."
+        return "Find or Get data from the database by natural-language query from user input and user_id. Use it only when query_transaction cannot express the question."
 
-    def run(self, args):
+    async def run(self, args):
         if "query" not in args or "user_id" not in args:
             return "Args should contain 'query' and 'user_id' keys"
         if not isinstance(args["query"], str) or not isinstance(args["user_id"], str):
             return "Args 'query' and 'user_id' should be strings"
-        query = f"Natural Query: {args['query']} User ID: {args['user_id']}"
+        key, params = normalize_query(args["query"])
+        params["user_id"] = args["user_id"]
+
+        # 1) Same shape of question as before: bind the new values to the validated template, no LLM call
+        template = await run_in_threadpool(self.templates.get, key)
+        if template is not None:
+            try:
+                transactions = await run_in_session(self.repository.findRaw, template, params, args["user_id"])
+                return self.format_result(transactions)
+            except Exception as e:
+                # a bad template is deleted, the LLM writes a new query below
+                logging.warning(f"Query template of '{key}' failed, forgetting it: {e}")
+                await run_in_threadpool(self.templates.forget, key)
+
+        values = ", ".join(f":{name} = {value!r}" for name, value in params.items())
+        query = f"Natural Query: {key} Parameters: {values}"
 
         system_prompt = """
             You are a precise transaction finder. 
@@ -134,13 +316,17 @@ class FindTransactionTool(Tool):
             1. Generate a PostgreSQL compatible SQL query to find transactions based on the user's natural language query.
             2. Always include a filter for user_id in the query to ensure data is scoped to the specific user.
             3. Return only string the RAW SQL query without any other text or formatting or wrapping.
+            4. Use the given parameters as bind parameters (e.g. `user_id = :user_id`, `amount > :num_0`), never write their values.
+            5. Write relative periods (today, this month, last week) with CURRENT_DATE, never as literal dates.
+            6. Only read the transaction table and only call aggregate, date, string and math functions
+               (SUM, COUNT, AVG, MIN, MAX, DATE_TRUNC, EXTRACT, TO_CHAR, LOWER, COALESCE, ROUND, ...).
             """
 
         # 2) Call the LLM
         llm_service = get_llm_service()
-        resp = llm_service.query_execute(
+        resp = await llm_service.query_execute(
             messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": query}],
-            model="meta-llama/llama-4-scout:free"
+            pool=QUERY_POOL,
         )
         if not resp:
             return "No response from LLM, please try again"
@@ -148,8 +334,12 @@ class FindTransactionTool(Tool):
         raw_query = self.validate_query_raw_sql(resp)
         try:
             print(f"Raw SQL Query: {raw_query}")
-            transactions = self.repository.findRaw(raw_query)
-            return f"{transactions}"
+            bound = {name: value for name, value in params.items() if name in bind_names(raw_query)}
+            transactions = await run_in_session(self.repository.findRaw, raw_query, bound or None, args["user_id"])
+            # 3) The template ran, reuse it for the next question of the same shape
+            if self.templates.is_reusable(key, raw_query, params):
+                await run_in_threadpool(self.templates.store, key, raw_query)
+            return self.format_result(transactions)
         except Exception as e:
             return f"Error executing query: {e}"
 
@@ -159,6 +349,9 @@ class FindTransactionTool(Tool):
     def output_schema(self):
         return "str"
 
+    def format_result(self, transactions) -> str:
+        return encode_rows(transactions, getattr(transactions, "total_rows", None))
+
     def validate_query_raw_sql(self, query: str) -> str:
         if query.startswith('"') and query.endswith('"'):
             query = query[1:-1]
@@ -174,13 +367,13 @@ class FindTransactionTool(Tool):
         return query
 
 
-class UpdateTransactionTool(Tool):
-    def __init__(self, repository: Optional[ITransactionRepository] = None) -> None:
-        self.repository = repository or get_transaction_repository()
-
+class UpdateTransactionTool(TransactionTool):
     def name(self) -> str:
         return "update_transaction"
 
+    def invalidates(self) -> list[str]:
+        return ["transaction"]
+
     def description(self) -> str:
         return "Update a transaction data by given ID and new values"
 
@@ -196,14 +389,16 @@ class UpdateTransactionTool(Tool):
             if key == "type" and args[key] not in ["expense", "income"]:
                 raise ValueError("Type must be either 'expense' or 'income'")
 
-    def run(self, args):
+    async def run(self, args):
         # Validate the arguments
         self.validate_args(args)
 
         id = args["id"]
         updateData = UpdateTransactionSchema(id=id, user_id=args["user_id"], date=args["date"], amount=args["amount"], description=args["description"], category=args["category"], type=args["type"])
-        transaction = self.repository.update(updateData)
-        return f"{transaction.type} record successfully updated with ID {transaction.id} for {transaction.amount} amount and {transaction.category} category"
+        transaction = await run_in_session(self.repository.update, updateData)
+        # an update is usually a correction of the category, weigh it more than a normal transaction
+        self.classifier.learn(transaction.user_id, transaction.description, transaction.category, CORRECTION_WEIGHT)
+        return f"{transaction.type} record successfully updated with ID {transaction.id}\n{encode_rows([transaction])}"
 
     def get_args_schema(self):
         return [
@@ -220,23 +415,23 @@ class UpdateTransactionTool(Tool):
         return "str"
 
 
-class DeleteTransactionTool(Tool):
-    def __init__(self, repository: Optional[ITransactionRepository] = None) -> None:
-        self.repository = repository or get_transaction_repository()
-
+class DeleteTransactionTool(TransactionTool):
     def name(self) -> str:
         return "delete_transaction"
 
+    def invalidates(self) -> list[str]:
+        return ["transaction"]
+
     def description(self) -> str:
         return "Delete a transaction data by given ID and user_id"
 
-    def run(self, args):
+    async def run(self, args):
         id = args["id"]
         user_id = args["user_id"]
         if not isinstance(id, int) or not isinstance(user_id, str):
             return "ID must be an integer and user_id must be a string"
-        transaction = self.repository.delete(id, user_id)
-        return f"{transaction.type} record successfully deleted with ID {transaction.id} for {transaction.amount} amount and {transaction.category} category"
+        transaction = await run_in_session(self.repository.delete, id, user_id)
+        return f"{transaction.type} record successfully deleted with ID {transaction.id}\n{encode_rows([transaction])}"
 
     def get_args_schema(self):
         return [{"name": "id", "type": "int", "description": "ID of the transaction to delete"}, {"name": "user_id", "type": "str", "description": "User ID"}]
@@ -0,0 +1,37 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel, Field
+
+from src.core.config.environtment import SERVICE_API_KEY, USER_TOKEN_TTL
+from src.services.utils import InvalidUserTokenError, create_encrypted_user_id, create_user_token, verify_user_token
+
+router = APIRouter()
+
+
+class TokenRequest(BaseModel):
+	phone_number: str = Field(..., description="Phone number of the user", min_length=9, max_length=15)
+
+
+def require_service_key(x_api_key: str = Header("")):
+	"""Only trusted services (the WhatsApp bot, the admin tools) know SERVICE_API_KEY, it is disabled when unset"""
+	if not SERVICE_API_KEY or not hmac.compare_digest(x_api_key, SERVICE_API_KEY):
+		raise HTTPException(status_code=401, detail="Invalid API key")
+
+
+def get_token_user_id(authorization: str = Header("")) -> str:
+	"""The (encrypted) user id of the `Authorization: Bearer <token>` header, the user is never taken from the query"""
+	scheme, _, token = authorization.partition(" ")
+	if scheme.lower() != "bearer" or not token:
+		raise HTTPException(status_code=401, detail="Missing bearer token", headers={"WWW-Authenticate": "Bearer"})
+	try:
+		return verify_user_token(token.strip())
+	except InvalidUserTokenError as e:
+		raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.post("/auth/token", dependencies=[Depends(require_service_key)])
+async def issue_user_token(payload: TokenRequest):
+	"""Short-lived token of one user for the import/export endpoints, the phone number stays out of URLs and logs"""
+	token = create_user_token(create_encrypted_user_id(payload.phone_number), USER_TOKEN_TTL)
+	return {"access_token": token, "token_type": "bearer", "expires_in": USER_TOKEN_TTL}
@@ -0,0 +1,29 @@
+from datetime import date, datetime, time, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from src.controllers.auth_controller import get_token_user_id
+from src.services.transaction_export import MEDIA_TYPES, export_transactions
+
+router = APIRouter()
+
+
+@router.get("/transactions/export")
+async def export_user_transactions(
+	format: str = Query("csv", pattern="^(csv|jsonl)$"),
+	start_date: date | None = Query(None, description="First day to export"),
+	end_date: date | None = Query(None, description="Last day to export (inclusive)"),
+	gzip: bool = Query(False, description="Compress the file with gzip"),
+	user_id: str = Depends(get_token_user_id),
+):
+	"""Download the token user's transactions, written to the response while they are read from the database"""
+	start = datetime.combine(start_date, time()) if start_date else None
+	end = datetime.combine(end_date + timedelta(days=1), time()) if end_date else None
+	filename = f"transactions.{format}{'.gz' if gzip else ''}"
+	# a sync generator is iterated in the threadpool, the database reads never block the event loop
+	return StreamingResponse(
+		export_transactions(user_id, format, start, end, compress=gzip),
+		media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+		headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+	)
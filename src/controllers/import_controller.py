@@ -0,0 +1,64 @@
+import io
+import json
+import logging
+from itertools import chain
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from src.agent.tool_cache import get_tool_result_cache
+from src.controllers.auth_controller import get_token_user_id
+from src.services.statement_import import StatementFormatError, format_of_filename, import_statement
+
+router = APIRouter()
+
+
+@router.post("/transactions/import")
+async def import_transactions(
+	file: UploadFile = File(..., description="CSV or OFX statement"),
+	format: str | None = Form(None, pattern="^(csv|ofx)$"),
+	user_id: str = Depends(get_token_user_id),
+):
+	"""
+	Import a bank or e-wallet statement into the token user's transactions. The upload is spooled to disk by the server
+	and read line by line, rows are loaded in chunks and rows already in the user's transactions are skipped.
+	The progress is streamed back as NDJSON, one line after every chunk and a last one with "done": true or an "error".
+	"""
+	lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+	progresses = import_statement(lines, user_id, format or format_of_filename(file.filename))
+
+	def close():
+		progresses.close()
+		# the upload is closed by the framework, not by the wrapper
+		lines.detach()
+
+	try:
+		# the first chunk is loaded before answering, a file that is not a statement is still rejected with a 400
+		first = await run_in_threadpool(next, progresses)
+	except StatementFormatError as e:
+		close()
+		raise HTTPException(status_code=400, detail=str(e))
+	except Exception:
+		close()
+		raise
+
+	def report() -> Iterator[str]:
+		try:
+			for progress in chain([first], progresses):
+				logging.info(f"Statement import {file.filename}: {progress}")
+				if progress.done:
+					# the imported rows were not written by a tool, cached results of the user's transactions are stale
+					get_tool_result_cache().invalidate(user_id, ["transaction"])
+				yield json.dumps(progress.to_dict()) + "\n"
+		except Exception as e:
+			# the status line is already sent, nothing was committed and the client gets the error as the last line
+			logging.exception(f"Statement import {file.filename} failed")
+			error = str(e) if isinstance(e, StatementFormatError) else "Import failed, no rows were imported"
+			yield json.dumps({"error": error, "done": False}) + "\n"
+		finally:
+			close()
+
+	# a sync generator is iterated in the threadpool, the parsing and the database writes never block the event loop
+	return StreamingResponse(report(), media_type="application/x-ndjson")
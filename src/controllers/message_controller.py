@@ -13,6 +13,6 @@ class MessageRequest(BaseModel):
 
 
 @router.post("/message")
-def incoming_message(payload: MessageRequest, agent: Agent = Depends(get_agent)):
-	response = agent.run(payload.message, payload.phone_number)
+async def incoming_message(payload: MessageRequest, agent: Agent = Depends(get_agent)):
+	response = await agent.run(payload.message)
 	return {"message": response}
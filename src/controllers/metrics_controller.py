@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from src.agent.query_template_cache import get_query_template_cache
+from src.agent.tool_cache import get_tool_result_cache
+from src.controllers.auth_controller import require_service_key
+from src.database.async_connection import get_async_engine
+from src.database.connection import engine
+from src.database.pool_metrics import pool_stats
+from src.services.llm_service import get_llm_service
+
+router = APIRouter()
+
+
+@router.get("/metrics", dependencies=[Depends(require_service_key)])
+def metrics():
+	"""Pool, LLM and cache statistics, only for the services holding SERVICE_API_KEY (model names, usage volumes)"""
+	return {
+		"db_pool": pool_stats(engine),
+		# the agent runs and the memory writes use the async engine
+		"db_async_pool": pool_stats(get_async_engine().sync_engine),
+		"llm": get_llm_service().stats(),
+		"tool_cache": get_tool_result_cache().stats(),
+		"query_templates": get_query_template_cache().stats(),
+	}
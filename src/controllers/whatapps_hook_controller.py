@@ -13,6 +13,9 @@ messenger = WhatsApp(os.getenv("WHATAPP_APP_TOKEN"), phone_number_id=os.getenv("
 
 VERIFY_TOKEN = os.getenv("WHATAPP_WEBHOOK_API_KEY", "secret_verify_token")
 
+# keep a reference to in-flight conversations so they are not garbage collected mid-run
+background_tasks: set[asyncio.Task] = set()
+
 
 @router.get("/webhook")
 async def webhook_verify(
@@ -47,11 +50,13 @@ async def hook(request: Request, webhook_service: WebhookMessageService = Depend
 
 		# jika ada pesan baru, kita proses pesan tersebut
 		async def process_and_respond():
-			response = await run_in_threadpool(agent.process_message, message)
+			response = await agent.process_message(message)
 			print("Response from agent:", response)
 			await run_in_threadpool(messenger.send_message, response, sender_id)
 
-		asyncio.create_task(process_and_respond())
+		task = asyncio.create_task(process_and_respond())
+		background_tasks.add(task)
+		task.add_done_callback(background_tasks.discard)
 
 	return "OK", 200
 
@@ -68,7 +73,7 @@ async def hookTest(request: Request, webhook_service: WebhookMessageService = De
 
 	if webhook_data.is_changed_field() and webhook_data.is_new_message and webhook_data.message is not None:
 		# jika ada pesan baru, kita proses pesan tersebut
-		result = agent.process_message(webhook_data.message)
+		result = await agent.process_message(webhook_data.message)
 
 	return {
 		"status": "success",
@@ -0,0 +1,94 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# version key of system_prompt in src/agent/prompt/system_prompt.yaml used by the agent
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "v6")
+
+# stream the agent completions and dispatch the tool as soon as the Action JSON is closed
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# timezone used to resolve relative dates ("kemarin", "tadi pagi") when the user does not give one
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Jakarta")
+
+# record short messages like "kopi 18rb" without calling the LLM when the local parser is confident enough
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+# token budget of the agent prompt sent on each iteration, see src/agent/context_window.py
+CONTEXT_MAX_PROMPT_TOKENS = int(os.getenv("CONTEXT_MAX_PROMPT_TOKENS", "24000"))
+CONTEXT_KEEP_LAST_MESSAGES = int(os.getenv("CONTEXT_KEEP_LAST_MESSAGES", "6"))
+CONTEXT_MAX_OBSERVATION_TOKENS = int(os.getenv("CONTEXT_MAX_OBSERVATION_TOKENS", "2000"))
+CONTEXT_ELIDED_OBSERVATION_TOKENS = int(os.getenv("CONTEXT_ELIDED_OBSERVATION_TOKENS", "80"))
+
+# LLM model pools (comma separated), requests are routed to the fastest healthy model of the pool
+LLM_AGENT_MODELS = os.getenv("LLM_AGENT_MODELS", "meta-llama/llama-4-maverick:free")
+LLM_QUERY_MODELS = os.getenv("LLM_QUERY_MODELS", "meta-llama/llama-4-scout:free,meta-llama/llama-4-maverick:free")
+LLM_VISION_MODELS = os.getenv("LLM_VISION_MODELS", "opengvlab/internvl3-14b:free,google/gemma-3-27b-it:free")
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+# send a duplicate request to the next model when the first one is slower than its p95 latency (at least LLM_HEDGE_MIN_DELAY seconds)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "3"))
+# circuit breaker, a model is skipped for LLM_BREAKER_COOLDOWN seconds after LLM_BREAKER_FAILURES failures in a row
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))
+
+# rolling memory summary, new messages are folded into the stored summary in the background once there are enough of them
+MEMORY_SUMMARY_MIN_MESSAGES = int(os.getenv("MEMORY_SUMMARY_MIN_MESSAGES", "20"))
+MEMORY_SUMMARY_BATCH_SIZE = int(os.getenv("MEMORY_SUMMARY_BATCH_SIZE", "50"))
+
+# write-behind buffer for memory messages, rows are inserted in one batch per MEMORY_WRITE_BATCH_SIZE rows or MEMORY_WRITE_FLUSH_INTERVAL seconds
+MEMORY_WRITE_BATCH_SIZE = int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "50"))
+MEMORY_WRITE_FLUSH_INTERVAL = float(os.getenv("MEMORY_WRITE_FLUSH_INTERVAL", "1"))
+MEMORY_WRITE_MAX_PENDING = int(os.getenv("MEMORY_WRITE_MAX_PENDING", "1000"))
+
+# compaction job, messages folded into the summary and older than MEMORY_RETENTION_DAYS are moved to memory_message_archive
+MEMORY_RETENTION_DAYS = int(os.getenv("MEMORY_RETENTION_DAYS", "30"))
+MEMORY_COMPACTION_BATCH_SIZE = int(os.getenv("MEMORY_COMPACTION_BATCH_SIZE", "1000"))
+
+# local category classifier, the category is filled without the LLM when the confidence is at least CATEGORY_MIN_CONFIDENCE
+CATEGORY_MIN_CONFIDENCE = float(os.getenv("CATEGORY_MIN_CONFIDENCE", "0.8"))
+CATEGORY_HISTORY_LIMIT = int(os.getenv("CATEGORY_HISTORY_LIMIT", "500"))
+
+# results of pure tools cached across agent runs, keyed by tool, args and the version of the user data they read
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+
+# validated SQL templates of find_transaction, kept in memory for the most used ones
+QUERY_TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_TEMPLATE_CACHE_MAX_ENTRIES", "2048"))
+# hit counters of the templates are kept in memory and written at most once per QUERY_TEMPLATE_HIT_FLUSH_INTERVAL seconds
+QUERY_TEMPLATE_HIT_FLUSH_INTERVAL = float(os.getenv("QUERY_TEMPLATE_HIT_FLUSH_INTERVAL", "60"))
+# templates in memory are read from storage again after QUERY_TEMPLATE_MEMORY_TTL seconds, a deleted template leaves every worker
+QUERY_TEMPLATE_MEMORY_TTL = float(os.getenv("QUERY_TEMPLATE_MEMORY_TTL", "300"))
+# templates not used for QUERY_TEMPLATE_TTL_DAYS days expire, src.jobs.prune_query_templates deletes them
+QUERY_TEMPLATE_TTL_DAYS = int(os.getenv("QUERY_TEMPLATE_TTL_DAYS", "30"))
+
+# guarded raw SQL of find_transaction, results above RAW_QUERY_MAX_ROWS rows are truncated
+RAW_QUERY_MAX_ROWS = int(os.getenv("RAW_QUERY_MAX_ROWS", "200"))
+RAW_QUERY_TIMEOUT_MS = int(os.getenv("RAW_QUERY_TIMEOUT_MS", "5000"))
+
+# token budget of one encoded tool result in an observation, the rows beyond it are summarized
+RESULT_MAX_TOKENS = int(os.getenv("RESULT_MAX_TOKENS", "1500"))
+
+# database connection pool, see src/database/connection.py (ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+# statement timeout of the bulk writes (statement import, rollup rebuild) instead of DB_STATEMENT_TIMEOUT_MS, 0 disables it
+DB_BULK_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_BULK_STATEMENT_TIMEOUT_MS", "600000"))
+
+# statement import, rows are parsed, classified and loaded IMPORT_CHUNK_ROWS at a time
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+
+# transaction export, rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+# import/export endpoints, the user comes from a signed token (Authorization: Bearer) valid for USER_TOKEN_TTL seconds,
+# tokens are issued by POST /api/v1/auth/token to callers sending SERVICE_API_KEY in the X-API-Key header
+SERVICE_API_KEY = os.getenv("SERVICE_API_KEY", "")
+USER_TOKEN_TTL = int(os.getenv("USER_TOKEN_TTL", "900"))
@@ -11,7 +11,7 @@ class Tool:
 		pass
 
 	@abstractmethod
-	def run(self, *args, **kwargs):
+	async def run(self, *args, **kwargs):
 		pass
 
 	@abstractmethod
@@ -21,3 +21,26 @@ class Tool:
 	@abstractmethod
 	def output_schema(self):
 		pass
+
+	def is_pure(self) -> bool:
+		"""The result only depends on the args and on the user data named in `depends_on`, so it can be cached"""
+		return False
+
+	def cache_ttl(self) -> float | None:
+		"""Seconds a cached result stays valid, None to keep it until the data it depends on changes"""
+		return None
+
+	def depends_on(self) -> list[str]:
+		"""User data keys the result is read from, e.g. ["transaction"]"""
+		return []
+
+	def invalidates(self) -> list[str]:
+		"""User data keys changed by the tool, cached results depending on them are dropped"""
+		return []
+
+	def cacheable_result(self, result) -> bool:
+		return True
+
+	def static_result(self) -> str | None:
+		"""Result of a tool without args that never changes, it is rendered into the system prompt instead of being called"""
+		return None
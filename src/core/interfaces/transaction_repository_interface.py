@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Union
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
 from src.core.models.transaction_model import TransactionModel
-from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
 
 
 class ITransactionRepository(ABC):
@@ -14,20 +15,79 @@ class ITransactionRepository(ABC):
     
     @abstractmethod
     def get_all(self) -> List[TransactionModel]:
-        """Get all transactions"""
+        """Get all transactions of every user at once, iter_export streams the rows of one user"""
         pass
     
     @abstractmethod
     def update(self, data: UpdateTransactionSchema) -> TransactionModel:
-        """Update a transaction"""
+        """Update a transaction of data.user_id, returning the updated row"""
         pass
     
     @abstractmethod
     def delete(self, id: int, user_id: str) -> TransactionModel:
-        """Delete a transaction"""
+        """Delete a transaction of the user, returning the deleted row"""
         pass
     
     @abstractmethod
-    def findRaw(self, query: str) -> List:
-        """Execute raw SQL query"""
-        pass
\ No newline at end of file
+    def findRaw(self, query: str, params: Optional[dict] = None, user_id: Optional[str] = None) -> List:
+        """Execute raw SQL query, with optional bind parameters. Given a user_id the query is guarded and scoped to the user"""
+        pass
+
+    @abstractmethod
+    def get_category_history(self, user_id: str, limit: int = 500) -> List[Tuple[str, str]]:
+        """Latest (description, category) pairs of the user, oldest first"""
+        pass
+
+    @abstractmethod
+    def query(self, query: TransactionQuerySchema) -> List[dict]:
+        """Run a structured query scoped to the user"""
+        pass
+
+    @abstractmethod
+    def iter_export(self, user_id: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Iterator:
+        """Stream the user's rows in a date range (end exclusive), oldest first, without loading them all"""
+        pass
+
+
+class IAsyncTransactionRepository(ABC):
+    """ITransactionRepository for an AsyncSession, every operation is awaited"""
+
+    @abstractmethod
+    async def create(self, data: Union[CreateTransactionSchema, List[CreateTransactionSchema]]) -> List[TransactionModel]:
+        """Create one or more transactions"""
+        pass
+
+    @abstractmethod
+    async def get_all(self) -> List[TransactionModel]:
+        """Get all transactions of every user at once, iter_export streams the rows of one user"""
+        pass
+
+    @abstractmethod
+    async def update(self, data: UpdateTransactionSchema) -> TransactionModel:
+        """Update a transaction of data.user_id, returning the updated row"""
+        pass
+
+    @abstractmethod
+    async def delete(self, id: int, user_id: str) -> TransactionModel:
+        """Delete a transaction of the user, returning the deleted row"""
+        pass
+
+    @abstractmethod
+    async def findRaw(self, query: str, params: Optional[dict] = None, user_id: Optional[str] = None) -> List:
+        """Execute raw SQL query, with optional bind parameters. Given a user_id the query is guarded and scoped to the user"""
+        pass
+
+    @abstractmethod
+    async def get_category_history(self, user_id: str, limit: int = 500) -> List[Tuple[str, str]]:
+        """Latest (description, category) pairs of the user, oldest first"""
+        pass
+
+    @abstractmethod
+    async def query(self, query: TransactionQuerySchema) -> List[dict]:
+        """Run a structured query scoped to the user"""
+        pass
+
+    @abstractmethod
+    def iter_export(self, user_id: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> AsyncIterator:
+        """Stream the user's rows in a date range (end exclusive), oldest first, without loading them all"""
+        pass
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, DateTime, Integer, String, Text, func
+from uuid import uuid4
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, func
 
 from src.database.base import Base
 
@@ -11,4 +13,31 @@ class MemoryMessageModel(Base):
 	role = Column(String(50), nullable=False)
 	message = Column(Text, nullable=False)
 	created_at = Column(DateTime, nullable=False, server_default=func.now())
-	updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+	updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+	# when the message was folded into the user's summary, NULL until then
+	folded_at = Column(DateTime, nullable=True)
+	# generated before the insert (write buffer), identifies a queued message once it is written. NULL for older rows
+	client_id = Column(String(32), nullable=True, default=lambda: uuid4().hex)
+
+	__table_args__ = (
+		# latest messages of a user (get_list)
+		Index("ix_memory_message_user_id_created_at", user_id, created_at.desc()),
+		# messages not folded into the summary yet (get_unfolded)
+		Index("ix_memory_message_user_id_unfolded", user_id, id, postgresql_where=folded_at.is_(None), sqlite_where=folded_at.is_(None)),
+		# a retried batch is not written twice (create_many)
+		Index("ix_memory_message_client_id", client_id, unique=True),
+	)
+
+
+class MemoryMessageArchiveModel(Base):
+	"""Messages already folded into the user's summary, moved out of memory_message by the compaction job"""
+
+	__tablename__ = "memory_message_archive"
+
+	id = Column(Integer, primary_key=True)
+	user_id = Column(String(255), nullable=False)
+	role = Column(String(50), nullable=False)
+	message = Column(Text, nullable=False)
+	created_at = Column(DateTime, nullable=False)
+	updated_at = Column(DateTime, nullable=False)
+	archived_at = Column(DateTime, nullable=False, server_default=func.now())
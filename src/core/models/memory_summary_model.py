@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, String, Text, func
+
+from src.database.base import Base
+
+
+class MemorySummaryModel(Base):
+	__tablename__ = "memory_summary"
+
+	user_id = Column(String(255), primary_key=True)
+	# the messages folded into it have memory_message.folded_at set
+	summary = Column(Text, nullable=False)
+	created_at = Column(DateTime, nullable=False, server_default=func.now())
+	updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
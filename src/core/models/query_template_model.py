@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+
+from src.database.base import Base
+
+
+class QueryTemplateModel(Base):
+	__tablename__ = "query_template"
+
+	# natural-language query with the user, dates and numbers replaced by bind parameter names
+	normalized_query = Column(String(500), primary_key=True)
+	sql_template = Column(Text, nullable=False)
+	hits = Column(Integer, nullable=False, default=0)
+	created_at = Column(DateTime, nullable=False, server_default=func.now())
+	last_used_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, Enum
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String, func
 
 from src.database.base import Base
 
@@ -18,3 +18,11 @@ class TransactionModel(Base):
 	description = Column(String(255), nullable=True)
 	category = Column(String(100), nullable=True)  # category
 	type = Column(Enum("expense", "income", name="type"), nullable=True)  # type
+
+	__table_args__ = (
+		# the user's transactions in a date range (every query is scoped to the user)
+		Index("ix_transaction_user_id_date", user_id, date),
+		# the user's transactions of some categories (matched case-insensitively), optionally in a date range
+		Index("ix_transaction_user_id_lower_category_date", user_id, func.lower(category), date),
+		# Postgres only, created by the migration: ix_transaction_description_trgm, GIN trigram index for ILIKE '%kopi%'
+	)
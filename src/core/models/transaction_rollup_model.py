@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Date, Float, Integer, String
+
+from src.database.base import Base
+
+
+class TransactionRollupModel(Base):
+	"""Monthly sum and count of the transactions of a user per category and type, maintained with every write"""
+
+	__tablename__ = "transaction_rollup"
+
+	user_id = Column(String(255), primary_key=True)
+	# first day of the month
+	month = Column(Date, primary_key=True)
+	# "" for transactions without category/type, primary key columns can't be NULL
+	category = Column(String(100), primary_key=True, default="")
+	type = Column(String(10), primary_key=True, default="")
+	total = Column(Float, nullable=False, default=0)
+	count = Column(Integer, nullable=False, default=0)
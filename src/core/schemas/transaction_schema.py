@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from src.core.models.transaction_model import TransactionType
 
 
@@ -38,3 +40,76 @@ class UpdateTransactionSchema:
 		self.description = description
 		self.category = category
 		self.type = type
+
+
+class TransactionQuerySchema:
+	"""Structured transaction query, compiled to a parameterized statement always scoped to user_id"""
+
+	GROUP_BY = ["day", "month", "category", "type"]
+	AGGREGATES = ["sum", "count", "avg"]
+	ORDER_BY = ["date", "amount", "period", "category", "type", "sum", "count", "avg"]
+	MAX_LIMIT = 200
+
+	user_id: str
+	start_date: datetime | None
+	end_date: datetime | None  # exclusive
+	categories: list[str]
+	type: str | None
+	search: str | None
+	group_by: str | None
+	aggregates: list[str]
+	order_by: str | None
+	order: str
+	limit: int
+
+	def __init__(self, user_id, start_date=None, end_date=None, categories=None, type=None, search=None, group_by=None, aggregates=None, order_by=None, order="desc", limit=50):
+		self.user_id = user_id
+		self.start_date = start_date
+		self.end_date = end_date
+		self.categories = categories or []
+		self.type = type
+		self.search = search
+		self.group_by = group_by
+		self.aggregates = aggregates or []
+		self.order_by = order_by
+		self.order = order
+		self.limit = limit
+		self.validate()
+
+	def validate(self):
+		if not isinstance(self.user_id, str) or not self.user_id:
+			raise ValueError("user_id must be a non-empty string")
+		if self.type is not None and self.type not in [TransactionType.expense, TransactionType.income]:
+			raise ValueError("type must be either 'expense' or 'income'")
+		if self.group_by is not None and self.group_by not in self.GROUP_BY:
+			raise ValueError(f"group_by must be one of {', '.join(self.GROUP_BY)}")
+		invalid = [aggregate for aggregate in self.aggregates if aggregate not in self.AGGREGATES]
+		if invalid:
+			raise ValueError(f"aggregates must be in {', '.join(self.AGGREGATES)}")
+		if self.order_by is not None and self.order_by not in self.ORDER_BY:
+			raise ValueError(f"order_by must be one of {', '.join(self.ORDER_BY)}")
+		if self.order not in ["asc", "desc"]:
+			raise ValueError("order must be 'asc' or 'desc'")
+		if not isinstance(self.limit, int) or not 1 <= self.limit <= self.MAX_LIMIT:
+			raise ValueError(f"limit must be an integer between 1 and {self.MAX_LIMIT}")
+		if self.start_date is not None and self.end_date is not None and self.start_date >= self.end_date:
+			raise ValueError("start_date must be before end_date")
+
+	@property
+	def is_aggregate(self) -> bool:
+		return self.group_by is not None or bool(self.aggregates)
+
+	def to_dict(self):
+		return {
+			"user_id": self.user_id,
+			"start_date": self.start_date.isoformat() if self.start_date else None,
+			"end_date": self.end_date.isoformat() if self.end_date else None,
+			"categories": self.categories,
+			"type": self.type,
+			"search": self.search,
+			"group_by": self.group_by,
+			"aggregates": self.aggregates,
+			"order_by": self.order_by,
+			"order": self.order,
+			"limit": self.limit,
+		}
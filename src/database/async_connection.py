@@ -0,0 +1,54 @@
+import os
+from functools import lru_cache
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from src.core.config.environtment import DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS
+from src.database.pool_metrics import TimedAsyncQueuePool
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> URL:
+	"""DATABASE_URL with the async driver of its backend, postgresql://... -> postgresql+asyncpg://..."""
+	parsed = make_url(url)
+	backend = parsed.get_backend_name()
+	if backend in ASYNC_DRIVERS:
+		return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+	return parsed
+
+
+def create_async_database_engine(url: str, **overrides) -> AsyncEngine:
+	"""Async counterpart of create_database_engine, same pool settings and statement timeout"""
+	async_url = async_database_url(url)
+	backend = async_url.get_backend_name()
+	if backend == "sqlite":
+		return create_async_engine(async_url, **overrides)
+	connect_args = {}
+	if backend == "postgresql":
+		# asyncpg takes the session settings directly instead of libpq "options"
+		connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+	options = {
+		"poolclass": TimedAsyncQueuePool,
+		"pool_size": DB_POOL_SIZE,
+		"max_overflow": DB_MAX_OVERFLOW,
+		"pool_timeout": DB_POOL_TIMEOUT,
+		"pool_recycle": DB_POOL_RECYCLE,
+		"pool_pre_ping": DB_POOL_PRE_PING,
+		"connect_args": connect_args,
+	}
+	return create_async_engine(async_url, **{**options, **overrides})
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+	# created on first use, the sync engine stays the only one of processes that never touch the async path
+	return create_async_database_engine(os.getenv("DATABASE_URL") or "")
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker:
+	# loaded attributes stay readable after commit, an async session can't lazy load them again
+	return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
@@ -1,8 +1,42 @@
 import os
-from sqlalchemy import create_engine
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
+from src.core.config.environtment import DB_BULK_STATEMENT_TIMEOUT_MS, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS
+from src.database.pool_metrics import TimedQueuePool
+
 DATABASE_URL = os.getenv("DATABASE_URL") or ""
 
-engine = create_engine(DATABASE_URL)
+
+def create_database_engine(url: str, **overrides):
+	"""Engine with the configured pool and a server-side statement timeout, SQLite keeps its default pool"""
+	backend = make_url(url).get_backend_name()
+	if backend == "sqlite":
+		return create_engine(url, **overrides)
+	connect_args = {}
+	if backend == "postgresql":
+		connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+	elif backend == "mysql":
+		connect_args["init_command"] = f"SET SESSION max_execution_time={DB_STATEMENT_TIMEOUT_MS}"
+	options = {
+		"poolclass": TimedQueuePool,
+		"pool_size": DB_POOL_SIZE,
+		"max_overflow": DB_MAX_OVERFLOW,
+		"pool_timeout": DB_POOL_TIMEOUT,
+		"pool_recycle": DB_POOL_RECYCLE,
+		"pool_pre_ping": DB_POOL_PRE_PING,
+		"connect_args": connect_args,
+	}
+	return create_engine(url, **{**options, **overrides})
+
+
+engine = create_database_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def extend_statement_timeout(session, timeout_ms: int = DB_BULK_STATEMENT_TIMEOUT_MS):
+	"""Replace the pool's statement timeout until the session's current transaction ends (Postgres)"""
+	if session.get_bind().dialect.name == "postgresql":
+		session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
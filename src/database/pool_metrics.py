@@ -0,0 +1,75 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+	"""Checkout wait times of a pool, updated by TimedQueuePool"""
+
+	def __init__(self, alpha: float = 0.2):
+		self.alpha = alpha
+		self.lock = threading.Lock()
+		self.checkouts = 0
+		self.timeouts = 0
+		self.wait_ewma = 0.0
+		self.wait_max = 0.0
+		self.wait_last = 0.0
+
+	def record(self, wait: float, timed_out: bool = False):
+		with self.lock:
+			if timed_out:
+				self.timeouts += 1
+			else:
+				self.checkouts += 1
+			self.wait_last = wait
+			self.wait_max = max(self.wait_max, wait)
+			self.wait_ewma = wait if self.checkouts + self.timeouts == 1 else (1 - self.alpha) * self.wait_ewma + self.alpha * wait
+
+
+class TimedQueuePool(QueuePool):
+	"""QueuePool that measures how long each checkout waits for a free connection"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.metrics = PoolMetrics()
+
+	def _do_get(self):
+		started = time.perf_counter()
+		try:
+			connection = super()._do_get()
+		except PoolTimeoutError:
+			self.metrics.record(time.perf_counter() - started, timed_out=True)
+			raise
+		self.metrics.record(time.perf_counter() - started)
+		return connection
+
+	def recreate(self):
+		pool = super().recreate()
+		pool.metrics = self.metrics
+		return pool
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+	"""TimedQueuePool of an async engine (asyncio queue, the wait is the time until a connection is handed out)"""
+
+
+def pool_stats(engine) -> dict:
+	"""Size and usage of the engine's pool, with the checkout waits when the pool is a TimedQueuePool"""
+	pool = engine.pool
+	stats = {"pool": type(pool).__name__}
+	if isinstance(pool, QueuePool):
+		stats.update({"size": pool.size(), "in_use": pool.checkedout(), "idle": pool.checkedin(), "overflow": max(pool.overflow(), 0)})
+	metrics = getattr(pool, "metrics", None)
+	if metrics is not None:
+		stats.update(
+			{
+				"checkouts": metrics.checkouts,
+				"checkout_timeouts": metrics.timeouts,
+				"checkout_wait_ewma_ms": round(metrics.wait_ewma * 1000, 3),
+				"checkout_wait_max_ms": round(metrics.wait_max * 1000, 3),
+				"checkout_wait_last_ms": round(metrics.wait_last * 1000, 3),
+			}
+		)
+	return stats
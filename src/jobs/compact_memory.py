@@ -0,0 +1,35 @@
+"""
+Retention job for memory_message, run periodically (e.g. from cron):
+
+	python -m src.jobs.compact_memory
+
+Messages already folded into the user's summary and older than MEMORY_RETENTION_DAYS are moved to
+memory_message_archive in batches, each batch in its own short transaction so the hot table is never locked for long.
+"""
+
+from datetime import datetime, timedelta
+
+from src.core.config.environtment import MEMORY_COMPACTION_BATCH_SIZE, MEMORY_RETENTION_DAYS
+from src.database.connection import SessionLocal
+from src.repositories.memory_message_repository import MemoryMessageRepository
+
+
+def compact_memory(session_factory=SessionLocal, retention_days: int = MEMORY_RETENTION_DAYS, batch_size: int = MEMORY_COMPACTION_BATCH_SIZE, now: datetime | None = None) -> int:
+	"""Archive every folded message older than the retention window, return the number of messages archived"""
+	before = (now or datetime.now()) - timedelta(days=retention_days)
+	archived = 0
+	session = session_factory()
+	try:
+		repository = MemoryMessageRepository(session)
+		while True:
+			moved = repository.archive_folded(before, batch_size)
+			archived += moved
+			if moved < batch_size:
+				break
+	finally:
+		session.close()
+	return archived
+
+
+if __name__ == "__main__":
+	print(f"Archived {compact_memory()} memory messages")
@@ -0,0 +1,31 @@
+"""
+Import a bank or e-wallet statement (CSV or OFX) into a user's transactions:
+
+	python -m src.jobs.import_statement <phone_number> <file> [--format csv|ofx] [--user-id]
+
+With --user-id the first argument is the stored (encrypted) user id instead of the phone number.
+Progress is printed after every IMPORT_CHUNK_ROWS rows, rows already in the user's transactions are skipped.
+"""
+
+import argparse
+
+from src.services.statement_import import format_of_filename, import_statement
+from src.services.utils import create_encrypted_user_id
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Import a CSV or OFX statement into a user's transactions")
+	parser.add_argument("user", help="phone number of the user (or the stored user id with --user-id)")
+	parser.add_argument("file")
+	parser.add_argument("--format", choices=["csv", "ofx"])
+	parser.add_argument("--user-id", action="store_true")
+	args = parser.parse_args()
+
+	user_id = args.user if args.user_id else create_encrypted_user_id(args.user)
+	with open(args.file, encoding="utf-8-sig", errors="replace", newline="") as lines:
+		for progress in import_statement(lines, user_id, args.format or format_of_filename(args.file)):
+			print(progress)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,25 @@
+"""
+Cleanup of query_template, run periodically (e.g. from cron) or by hand for a template known to be wrong:
+
+	python -m src.jobs.prune_query_templates [normalized_query ...]
+
+Without arguments the templates not used for QUERY_TEMPLATE_TTL_DAYS days are deleted, with arguments only the given
+templates. Workers stop using a deleted template once their memory copy is older than QUERY_TEMPLATE_MEMORY_TTL.
+"""
+
+import sys
+
+from src.agent.query_template_cache import QueryTemplateCache
+from src.database.connection import SessionLocal
+
+
+def prune_query_templates(session_factory=SessionLocal, normalized_queries: list[str] | None = None) -> int:
+	"""Delete the given templates, or the expired ones, return the number of templates deleted"""
+	cache = QueryTemplateCache(session_factory)
+	if normalized_queries:
+		return cache.with_repository(lambda repository: repository.delete(normalized_queries), 0)
+	return cache.prune()
+
+
+if __name__ == "__main__":
+	print(f"Deleted {prune_query_templates(normalized_queries=sys.argv[1:])} query templates")
@@ -0,0 +1,27 @@
+"""
+Rebuild of transaction_rollup, the migration backfills it, run this whenever the rollup is suspected to drift
+(e.g. writes of the previous release between the migration and the deploy):
+
+	python -m src.jobs.rebuild_rollup [user_id]
+
+The rollup is recomputed from the transaction table user by user, for every user or only the given one.
+Each user is rebuilt in its own DB transaction under the lock of the delta writes, the app can keep running.
+"""
+
+import sys
+
+from src.database.connection import SessionLocal
+from src.repositories.transaction_rollup_repository import TransactionRollupRepository
+
+
+def rebuild_rollup(session_factory=SessionLocal, user_id: str | None = None) -> int:
+	"""Recompute the monthly rollup, return the number of rollup rows written"""
+	session = session_factory()
+	try:
+		return TransactionRollupRepository(session).rebuild(user_id)
+	finally:
+		session.close()
+
+
+if __name__ == "__main__":
+	print(f"Rebuilt {rebuild_rollup(user_id=sys.argv[1] if len(sys.argv) > 1 else None)} rollup rows")
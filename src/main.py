@@ -1,10 +1,30 @@
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from src.controllers import message_controller, whatapps_hook_controller
+from fastapi.concurrency import run_in_threadpool
+from src.agent.prompt_registry import get_prompt_registry
+from src.agent.query_template_cache import get_query_template_cache
+from src.agent.tool_registry import get_tool_registry
+from src.controllers import auth_controller, export_controller, import_controller, message_controller, metrics_controller, whatapps_hook_controller
+from src.database.async_connection import get_async_engine
+from src.services.memory_write_buffer import get_memory_write_buffer
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# build the shared tools and compile the system prompt once at startup instead of on the first message
+	get_prompt_registry().get(get_tool_registry())
+	yield
+	# write the memory messages and template hit counters still queued before the process exits
+	await get_memory_write_buffer().stop()
+	await run_in_threadpool(get_query_template_cache().flush_hits)
+	await get_async_engine().dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 VERIFY_TOKEN = "your_verify_token"
 
 
@@ -15,3 +35,7 @@ def read_root():
 
 app.include_router(message_controller.router, prefix="/api/v1", tags=["message"])
 app.include_router(whatapps_hook_controller.router, prefix="/api/v1", tags=["whatsapp"])
+app.include_router(metrics_controller.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(auth_controller.router, prefix="/api/v1", tags=["auth"])
+app.include_router(import_controller.router, prefix="/api/v1", tags=["import"])
+app.include_router(export_controller.router, prefix="/api/v1", tags=["export"])
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from sqlalchemy import asc, delete, desc, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.core.models.memory_message_model import MemoryMessageArchiveModel, MemoryMessageModel
+from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
+
+
+class AsyncMemoryMessageRepository:
+	"""MemoryMessageRepository on an AsyncSession"""
+
+	def __init__(self, session):
+		self.session = session
+
+	async def create(self, data: CreateMemoryMessageSchema) -> MemoryMessageModel:
+		if not isinstance(data, CreateMemoryMessageSchema):
+			raise TypeError("data should be an instance of CreateMemoryMessageSchema")
+
+		memory_message = MemoryMessageModel(user_id=data.user_id, role=data.role, message=data.message)
+
+		self.session.add(memory_message)
+		await self.session.commit()
+		await self.session.refresh(memory_message)
+		return memory_message
+
+	async def create_many(self, rows: list[dict]) -> int:
+		"""MemoryMessageRepository.create_many, rows whose client_id is stored already are skipped"""
+		if not rows:
+			return 0
+		dialect = self.session.get_bind().dialect.name
+		statement = insert(MemoryMessageModel)
+		if dialect in ("postgresql", "sqlite"):
+			statement = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(MemoryMessageModel).on_conflict_do_nothing(index_elements=["client_id"])
+		await self.session.execute(statement, rows)
+		await self.session.commit()
+		return len(rows)
+
+	async def get_list(self, user_id: str, limit: int = 50) -> list[MemoryMessageModel]:
+		statement = select(MemoryMessageModel).filter_by(user_id=user_id).order_by(desc(MemoryMessageModel.created_at)).limit(limit)
+		return list((await self.session.scalars(statement)).all())
+
+	async def get_unfolded(self, user_id: str, limit: int = 50) -> list[MemoryMessageModel]:
+		"""Messages not folded into the user's summary yet, oldest first"""
+		statement = (
+			select(MemoryMessageModel)
+			.where(MemoryMessageModel.user_id == user_id, MemoryMessageModel.folded_at.is_(None))
+			.order_by(asc(MemoryMessageModel.id))
+			.limit(limit)
+		)
+		return list((await self.session.scalars(statement)).all())
+
+	async def archive_folded(self, before: datetime, limit: int = 1000) -> int:
+		"""MemoryMessageRepository.archive_folded, one batch moved to memory_message_archive"""
+		ids = (
+			await self.session.scalars(
+				select(MemoryMessageModel.id)
+				.where(MemoryMessageModel.folded_at.isnot(None), MemoryMessageModel.created_at < before)
+				.order_by(MemoryMessageModel.id)
+				.limit(limit)
+			)
+		).all()
+		if not ids:
+			return 0
+
+		columns = ["id", "user_id", "role", "message", "created_at", "updated_at"]
+		await self.session.execute(
+			insert(MemoryMessageArchiveModel).from_select(
+				columns,
+				select(*[MemoryMessageModel.__table__.c[column] for column in columns]).where(MemoryMessageModel.id.in_(ids)),
+			)
+		)
+		await self.session.execute(delete(MemoryMessageModel).where(MemoryMessageModel.id.in_(ids)))
+		await self.session.commit()
+		return len(ids)
@@ -0,0 +1,162 @@
+from sqlalchemy import desc, select, text
+from src.core.config.environtment import EXPORT_BATCH_ROWS, RAW_QUERY_MAX_ROWS, RAW_QUERY_TIMEOUT_MS
+from src.core.models.transaction_model import TransactionModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
+from src.core.interfaces.transaction_repository_interface import IAsyncTransactionRepository
+from src.repositories.raw_query_guard import SCOPE_PARAM, RawQueryResult, count_rows, scope_to_user, validate_select
+from src.repositories.transaction_queries import build_export_query, build_rollup_query, build_transaction_query, can_use_rollup, format_row
+from src.repositories.transaction_rollup_repository import AsyncTransactionRollupRepository, add_delta, rollup_deltas
+from src.repositories.transaction_writes import (
+	delete_statement,
+	insert_statement,
+	previous_row_statement,
+	previous_transaction,
+	reads_previous_row_in_update,
+	supports_returning,
+	transaction_values,
+	update_statement,
+)
+
+
+class AsyncTransactionRepository(IAsyncTransactionRepository):
+	"""TransactionRepository on an AsyncSession (expire_on_commit=False), the event loop keeps running while the database works"""
+
+	def __init__(self, session, returning: bool | None = None):
+		self.session = session
+		self.rollup = AsyncTransactionRollupRepository(session)
+		self.returning = returning
+
+	def uses_returning(self) -> bool:
+		if self.returning is None:
+			self.returning = supports_returning(self.session.get_bind().dialect)
+		return self.returning
+
+	async def create(self, data: CreateTransactionSchema | list[CreateTransactionSchema]) -> list[TransactionModel]:
+		items = data if isinstance(data, list) else [data]
+		if not isinstance(data, list) and not isinstance(data, CreateTransactionSchema):
+			raise TypeError("data should be an instance of CreateTransactionSchema")
+		try:
+			if self.uses_returning():
+				transactions = (await self.session.scalars(insert_statement(), [transaction_values(item) for item in items])).all()
+			else:
+				transactions = [TransactionModel(**transaction_values(item)) for item in items]
+				self.session.add_all(transactions)
+			deltas = rollup_deltas()
+			for transaction in transactions:
+				add_delta(deltas, transaction)
+			# same DB transaction as the insert, the rollup can't drift from the transaction table
+			await self.rollup.apply(deltas)
+			await self.session.commit()
+		except Exception:
+			await self.session.rollback()
+			raise
+		return list(transactions)
+
+	async def get_all(self):
+		return (await self.session.scalars(select(TransactionModel))).all()
+
+	async def update(self, data: UpdateTransactionSchema) -> TransactionModel:
+		dialect = self.session.get_bind().dialect
+		try:
+			if self.uses_returning() and reads_previous_row_in_update(dialect):
+				row = previous = (await self.session.execute(update_statement(data, dialect))).first()
+			else:
+				previous = (await self.session.execute(previous_row_statement(data))).first()
+				row = previous and await self.update_row(data, dialect)
+			if row is None:
+				raise Exception("Transaction not found")
+			transaction = row[0]
+			deltas = rollup_deltas()
+			add_delta(deltas, previous_transaction(data.user_id, previous), -1)
+			add_delta(deltas, transaction)
+			await self.rollup.apply(deltas)
+			await self.session.commit()
+		except Exception:
+			await self.session.rollback()
+			raise
+		return transaction
+
+	async def update_row(self, data: UpdateTransactionSchema, dialect):
+		if self.uses_returning():
+			return (await self.session.execute(update_statement(data, dialect))).first()
+		transaction = await self.session.get(TransactionModel, data.id)
+		for column, value in transaction_values(data).items():
+			setattr(transaction, column, value)
+		await self.session.flush()
+		return (transaction,)
+
+	async def delete(self, id, user_id):
+		try:
+			if self.uses_returning():
+				transaction = (await self.session.scalars(delete_statement(id, user_id))).first()
+			else:
+				transaction = (await self.session.scalars(select(TransactionModel).filter_by(id=id, user_id=user_id))).first()
+				if transaction is not None:
+					await self.session.delete(transaction)
+			if transaction is None:
+				raise Exception("Transaction not found")
+			deltas = rollup_deltas()
+			add_delta(deltas, transaction, -1)
+			await self.rollup.apply(deltas)
+			await self.session.commit()
+		except Exception:
+			await self.session.rollback()
+			raise
+		return transaction
+
+	async def findRaw(self, query, params=None, user_id=None):
+		if user_id is not None:
+			return await self.find_raw_guarded(query, user_id, params)
+		try:
+			return (await self.session.execute(text(query), params or {})).all()
+		except Exception as e:
+			await self.session.rollback()
+			print(f"Error executing raw SQL query: {e}")
+			raise e
+
+	async def find_raw_guarded(self, query: str, user_id: str, params: dict | None = None, max_rows: int = RAW_QUERY_MAX_ROWS, timeout_ms: int = RAW_QUERY_TIMEOUT_MS) -> RawQueryResult:
+		"""TransactionRepository.find_raw_guarded, the capped rows are read from a server-side cursor with `stream`"""
+		statement = validate_select(query)
+		dialect = self.session.get_bind().dialect
+		bound = {**(params or {}), SCOPE_PARAM: user_id}
+		try:
+			if dialect.name == "postgresql":
+				await self.session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+			result = await self.session.stream(text(scope_to_user(statement, dialect)), bound, execution_options={"max_row_buffer": max_rows + 1})
+			rows = await result.fetchmany(max_rows + 1)
+			await result.close()
+			total_rows = None
+			if len(rows) > max_rows:
+				rows = rows[:max_rows]
+				total_rows = (await self.session.execute(text(count_rows(statement, dialect)), bound)).scalar_one()
+			if dialect.name == "postgresql":
+				await self.session.execute(text("SET LOCAL statement_timeout TO DEFAULT"))
+			return RawQueryResult(rows, total_rows)
+		except Exception:
+			await self.session.rollback()
+			raise
+
+	async def get_category_history(self, user_id: str, limit: int = 500) -> list[tuple[str, str]]:
+		rows = (
+			await self.session.execute(
+				select(TransactionModel.description, TransactionModel.category)
+				.where(TransactionModel.user_id == user_id, TransactionModel.description.isnot(None), TransactionModel.category.isnot(None))
+				.order_by(desc(TransactionModel.id))
+				.limit(limit)
+			)
+		).all()
+		return [(description, category) for description, category in reversed(rows)]
+
+	async def query(self, query: TransactionQuerySchema) -> list[dict]:
+		statement = build_rollup_query(query) if can_use_rollup(query) else build_transaction_query(query)
+		rows = (await self.session.execute(statement)).mappings().all()
+		return [format_row(dict(row), query) for row in rows]
+
+	async def iter_export(self, user_id: str, start_date=None, end_date=None, batch_size: int = EXPORT_BATCH_ROWS):
+		"""TransactionRepository.iter_export, the server-side cursor is read with `stream`"""
+		result = await self.session.stream(build_export_query(user_id, start_date, end_date).execution_options(yield_per=batch_size))
+		try:
+			async for row in result:
+				yield row
+		finally:
+			await result.close()
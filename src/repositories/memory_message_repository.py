@@ -1,11 +1,9 @@
-from sqlalchemy import desc
-from src.core.models.memory_message_model import MemoryMessageModel
-from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
-from src.database.connection import SessionLocal
-
+from datetime import datetime
 
-def get_memory_message_repository():
-	return MemoryMessageRepository(SessionLocal())
+from sqlalchemy import asc, delete, desc, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.core.models.memory_message_model import MemoryMessageArchiveModel, MemoryMessageModel
+from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
 
 
 class MemoryMessageRepository:
@@ -27,6 +25,19 @@ class MemoryMessageRepository:
 		self.session.refresh(memory_message)
 		return memory_message
 
+	def create_many(self, rows: list[dict]) -> int:
+		"""Insert the rows with one multi-row INSERT and a single commit, rows whose client_id is stored already are skipped"""
+		if not rows:
+			return 0
+		dialect = self.session.get_bind().dialect.name
+		statement = insert(MemoryMessageModel)
+		if dialect in ("postgresql", "sqlite"):
+			# the commit of a batch may succeed although the flush saw an error, its retry must not duplicate the rows
+			statement = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(MemoryMessageModel).on_conflict_do_nothing(index_elements=["client_id"])
+		self.session.execute(statement, rows)
+		self.session.commit()
+		return len(rows)
+
 	def get_list(self, user_id: str, limit: int = 50) -> list[MemoryMessageModel]:
 		return (
 			self.session.query(MemoryMessageModel)
@@ -34,4 +45,42 @@ class MemoryMessageRepository:
 			.order_by(desc(MemoryMessageModel.created_at))
 			.limit(limit)
 			.all()
-		)
\ No newline at end of file
+		)
+
+	def get_unfolded(self, user_id: str, limit: int = 50) -> list[MemoryMessageModel]:
+		"""
+		Messages not folded into the user's summary yet, oldest first. A row committed after a fold with a lower id
+		than the folded ones is still picked up, unlike with a high-water mark.
+		"""
+		return (
+			self.session.query(MemoryMessageModel)
+			.filter(MemoryMessageModel.user_id == user_id, MemoryMessageModel.folded_at.is_(None))
+			.order_by(asc(MemoryMessageModel.id))
+			.limit(limit)
+			.all()
+		)
+
+	def archive_folded(self, before: datetime, limit: int = 1000) -> int:
+		"""
+		Move one batch of messages already folded into their user's summary and created before `before`
+		to memory_message_archive, return the number of messages moved.
+		"""
+		ids = self.session.scalars(
+			select(MemoryMessageModel.id)
+			.where(MemoryMessageModel.folded_at.isnot(None), MemoryMessageModel.created_at < before)
+			.order_by(MemoryMessageModel.id)
+			.limit(limit)
+		).all()
+		if not ids:
+			return 0
+
+		columns = ["id", "user_id", "role", "message", "created_at", "updated_at"]
+		self.session.execute(
+			insert(MemoryMessageArchiveModel).from_select(
+				columns,
+				select(*[MemoryMessageModel.__table__.c[column] for column in columns]).where(MemoryMessageModel.id.in_(ids)),
+			)
+		)
+		self.session.execute(delete(MemoryMessageModel).where(MemoryMessageModel.id.in_(ids)))
+		self.session.commit()
+		return len(ids)
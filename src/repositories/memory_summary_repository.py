@@ -0,0 +1,34 @@
+from sqlalchemy import func, update
+
+from src.core.models.memory_message_model import MemoryMessageModel
+from src.core.models.memory_summary_model import MemorySummaryModel
+
+
+class MemorySummaryRepository:
+	def __init__(self, session):
+		self.session = session
+
+	def get(self, user_id: str) -> MemorySummaryModel | None:
+		return self.session.get(MemorySummaryModel, user_id)
+
+	def save(self, user_id: str, summary: str, folded_ids: list[int]) -> MemorySummaryModel | None:
+		"""
+		Store the summary and mark the messages folded into it, in one commit.
+		None (nothing stored) when another fold already marked some of the messages.
+		"""
+		marked = self.session.execute(
+			update(MemoryMessageModel)
+			.where(MemoryMessageModel.id.in_(folded_ids), MemoryMessageModel.folded_at.is_(None))
+			.values(folded_at=func.now())
+		).rowcount
+		if marked != len(folded_ids):
+			self.session.rollback()
+			return None
+		memory_summary = self.get(user_id)
+		if memory_summary is None:
+			memory_summary = MemorySummaryModel(user_id=user_id)
+			self.session.add(memory_summary)
+		memory_summary.summary = summary
+		self.session.commit()
+		self.session.refresh(memory_summary)
+		return memory_summary
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, desc, func, update
+
+from src.core.models.query_template_model import QueryTemplateModel
+
+
+class QueryTemplateRepository:
+	def __init__(self, session):
+		self.session = session
+
+	def get_most_used(self, limit: int, used_since: datetime | None = None) -> list[QueryTemplateModel]:
+		query = self.session.query(QueryTemplateModel)
+		if used_since is not None:
+			query = query.filter(QueryTemplateModel.last_used_at >= used_since)
+		return query.order_by(desc(QueryTemplateModel.hits)).limit(limit).all()
+
+	def get(self, normalized_query: str, used_since: datetime | None = None) -> QueryTemplateModel | None:
+		"""The template, None when it was not used since `used_since` (expired)"""
+		template = self.session.get(QueryTemplateModel, normalized_query)
+		if template is not None and used_since is not None and template.last_used_at < used_since:
+			return None
+		return template
+
+	def save(self, normalized_query: str, sql_template: str) -> QueryTemplateModel:
+		template = self.get(normalized_query)
+		if template is None:
+			template = QueryTemplateModel(normalized_query=normalized_query, hits=0)
+			self.session.add(template)
+		template.sql_template = sql_template
+		template.last_used_at = func.now()
+		self.session.commit()
+		return template
+
+	def delete(self, normalized_queries: list[str]) -> int:
+		"""Delete templates, e.g. one that failed when it was reused, return the number deleted"""
+		if not normalized_queries:
+			return 0
+		result = self.session.execute(delete(QueryTemplateModel).where(QueryTemplateModel.normalized_query.in_(normalized_queries)))
+		self.session.commit()
+		return result.rowcount
+
+	def delete_unused(self, used_before: datetime) -> int:
+		"""Delete the templates not used since `used_before`, return the number deleted"""
+		result = self.session.execute(delete(QueryTemplateModel).where(QueryTemplateModel.last_used_at < used_before))
+		self.session.commit()
+		return result.rowcount
+
+	def record_hits(self, hits: dict[str, int]) -> int:
+		"""Add the counted hits of several templates in one batch, return the number of templates"""
+		if not hits:
+			return 0
+		table = QueryTemplateModel.__table__
+		self.session.connection().execute(
+			update(table)
+			.where(table.c.normalized_query == bindparam("key"))
+			.values(hits=table.c.hits + bindparam("count"), last_used_at=func.now()),
+			[{"key": key, "count": count} for key, count in hits.items()],
+		)
+		self.session.commit()
+		return len(hits)
@@ -0,0 +1,171 @@
+import re
+
+from src.core.models.transaction_model import TransactionModel
+
+SCOPE_PARAM = "scope_user_id"
+TOKEN_PATTERN = re.compile(
+	r"""
+	(?P<comment>--[^\n]*|/\*.*?\*/)
+	|(?P<string>'(?:[^']|'')*')
+	|(?P<quoted>"(?:[^"]|"")*")
+	|(?P<word>[A-Za-z_][\w$]*)
+	|(?P<number>\d+(?:\.\d+)?)
+	|(?P<space>\s+)
+	|(?P<symbol>::|<>|<=|>=|!=|\|\||.)
+	""",
+	re.S | re.X,
+)
+FORBIDDEN_WORDS = {
+	"insert", "update", "delete", "merge", "upsert", "drop", "alter", "create", "truncate", "grant", "revoke",
+	"copy", "into", "call", "do", "execute", "prepare", "set", "reset", "lock", "share", "vacuum", "analyze", "attach",
+	"detach", "pragma", "with", "recursive", "load_file", "outfile", "dumpfile", "dblink", "lo_import", "lo_export",
+}
+FORBIDDEN_PREFIXES = ("pg_", "sqlite_", "information_schema", "mysql")
+# the only tables a raw query may read, each one is shadowed by a CTE of the user's rows in scope_to_user
+SCOPED_TABLES = (TransactionModel.__tablename__,)
+# the only functions a raw query may call (aggregates, window, date, string, math and casts). Postgres also has
+# functions reading any table or changing the connection (query_to_xml, set_config, ...), which bypass the scoping
+ALLOWED_FUNCTIONS = {
+	"count", "sum", "avg", "min", "max", "stddev", "variance", "string_agg", "group_concat", "array_agg",
+	"row_number", "rank", "dense_rank", "lag", "lead", "first_value", "last_value", "ntile", "percentile_cont",
+	"coalesce", "nullif", "ifnull", "iif", "greatest", "least", "cast",
+	"lower", "upper", "trim", "ltrim", "rtrim", "length", "char_length", "substr", "substring", "replace", "concat",
+	"instr", "position", "strpos", "left", "right", "split_part", "printf", "format",
+	"round", "abs", "ceil", "ceiling", "floor", "mod", "power", "sqrt", "sign",
+	"date", "datetime", "time", "strftime", "julianday", "date_trunc", "date_part", "extract", "to_char", "to_date",
+	"make_date", "age", "now",
+	# type names with a length or precision, e.g. CAST(amount AS numeric(12, 2))
+	"numeric", "decimal", "varchar", "char",
+}
+# keywords that are followed by a parenthesis without being a function call
+PAREN_KEYWORDS = {
+	"select", "from", "join", "on", "using", "where", "having", "in", "exists", "any", "all", "some", "not", "and", "or",
+	"as", "over", "filter", "group", "by", "union", "intersect", "except", "when", "then", "else", "case", "distinct",
+	"is", "like", "ilike", "between",
+}
+# keywords ending the FROM clause of a SELECT, a comma before them separates table references
+FROM_CLAUSE_END = {"where", "group", "having", "order", "limit", "offset", "union", "intersect", "except", "window", "fetch", "select"}
+
+
+class UnsafeQueryError(ValueError):
+	pass
+
+
+class RawQueryResult(list):
+	"""Rows of a guarded raw query, `total_rows` is set when the row cap truncated the result"""
+
+	def __init__(self, rows, total_rows: int | None = None):
+		super().__init__(rows)
+		self.total_rows = total_rows
+
+	@property
+	def truncated(self) -> bool:
+		return self.total_rows is not None
+
+
+def tokenize_sql(sql: str) -> list[re.Match]:
+	return [match for match in TOKEN_PATTERN.finditer(sql) if match.lastgroup not in ("comment", "space")]
+
+
+def identifier(token: re.Match) -> str | None:
+	if token.lastgroup == "word":
+		return token.group().lower()
+	if token.lastgroup == "quoted":
+		return token.group()[1:-1].replace('""', '"').lower()
+	return None
+
+
+def is_distinct_from(previous: re.Match | None, before_previous: re.Match | None) -> bool:
+	"""Whether a FROM is the one of the IS [NOT] DISTINCT FROM comparison"""
+	return (
+		previous is not None and identifier(previous) == "distinct"
+		and before_previous is not None and identifier(before_previous) in ("is", "not")
+	)
+
+
+def validate_select(sql: str) -> str:
+	"""
+	The statement without its trailing semicolon when it is one plain SELECT reading only SCOPED_TABLES.
+	Every table reference (after FROM, JOIN or a comma of a FROM list) must be a scoped table or a subquery,
+	so a table added to the schema later can't be read without being scoped first, and only ALLOWED_FUNCTIONS are called.
+	"""
+	statement = sql.strip().rstrip(";").strip()
+	tokens = tokenize_sql(statement)
+	if not tokens or identifier(tokens[0]) != "select":
+		raise UnsafeQueryError("Only a single SELECT statement is allowed")
+	previous = before_previous = None
+	# per parenthesis depth: whether it holds a SELECT and whether the tokens are inside its FROM clause,
+	# a FROM of a function call (EXTRACT(.. FROM ..), TRIM(.. FROM ..)) is not a table reference
+	selects, in_from = [False], [False]
+	expects_table = False
+	for index, token in enumerate(tokens):
+		kind, value, name = token.lastgroup, token.group(), identifier(token)
+		following = tokens[index + 1].group() if index + 1 < len(tokens) else None
+		if name is not None and following == "(" and name not in PAREN_KEYWORDS and name not in ALLOWED_FUNCTIONS:
+			raise UnsafeQueryError(f"Function '{value}' is not allowed")
+		if kind == "symbol" and value == ";":
+			raise UnsafeQueryError("Only a single SELECT statement is allowed")
+		if kind == "symbol" and value in ("'", '"', "`", "$", "\\"):
+			raise UnsafeQueryError(f"Unsupported character {value!r} in query")
+		# backslash escapes and prefixed strings (E'..', X'..') are parsed differently by each database
+		if kind == "string" and ("\\" in value or (previous is not None and previous.lastgroup == "word" and previous.end() == token.start())):
+			raise UnsafeQueryError("Escaped or prefixed string literals are not allowed")
+		if kind == "word" and name in FORBIDDEN_WORDS:
+			raise UnsafeQueryError(f"Keyword '{value}' is not allowed, use a plain SELECT with subqueries")
+		if name is not None and name.startswith(FORBIDDEN_PREFIXES):
+			raise UnsafeQueryError(f"Only the {', '.join(SCOPED_TABLES)} table can be queried")
+		if name in SCOPED_TABLES and previous is not None and previous.group() == ".":
+			raise UnsafeQueryError(f"Use the unqualified {', '.join(SCOPED_TABLES)} table")
+
+		table_group = False
+		if expects_table:
+			expects_table = False
+			table_group = kind == "symbol" and value == "("
+			if not table_group and name not in SCOPED_TABLES and name != "select":
+				raise UnsafeQueryError(f"Only the {', '.join(SCOPED_TABLES)} table can be queried, {value} is not allowed")
+		if table_group:
+			# a subquery or a parenthesized join of table references
+			selects.append(True)
+			in_from.append(True)
+			expects_table = True
+		elif kind == "symbol" and value == "(":
+			selects.append(False)
+			in_from.append(False)
+		elif kind == "symbol" and value == ")":
+			if len(in_from) > 1:
+				selects.pop()
+				in_from.pop()
+		elif kind == "symbol" and value == "," and in_from[-1]:
+			expects_table = True
+		elif name == "select":
+			selects[-1] = True
+			in_from[-1] = False
+		elif name == "from" and selects[-1] and not is_distinct_from(previous, before_previous):
+			in_from[-1] = True
+			expects_table = True
+		elif name == "join" and selects[-1]:
+			in_from[-1] = True
+			expects_table = True
+		elif name in FROM_CLAUSE_END:
+			in_from[-1] = False
+		before_previous, previous = previous, token
+	if expects_table:
+		raise UnsafeQueryError("Missing table after FROM")
+	return statement
+
+
+def scope_to_user(sql: str, dialect) -> str:
+	"""
+	Shadow every scoped table with a CTE of the user's rows, so every reference in the statement only sees them.
+	A non-recursive CTE does not see its own name on Postgres and MySQL, SQLite needs the schema-qualified table.
+	"""
+	scopes = []
+	for name in SCOPED_TABLES:
+		table = dialect.identifier_preparer.quote_identifier(name)
+		source = f"main.{table}" if dialect.name == "sqlite" else table
+		scopes.append(f"{table} AS (SELECT * FROM {source} WHERE user_id = :{SCOPE_PARAM})")
+	return f"WITH {', '.join(scopes)} {sql}"
+
+
+def count_rows(sql: str, dialect) -> str:
+	return scope_to_user(f"SELECT count(*) FROM ({sql}) AS capped", dialect)
@@ -0,0 +1,118 @@
+import csv
+import io
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, cast, func, insert, literal, select
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema
+from src.database.connection import extend_statement_timeout
+from src.repositories.transaction_queries import month_start
+from src.repositories.transaction_rollup_repository import TransactionRollupRepository, rollup_deltas, rollup_key
+
+STAGING_COLUMNS = ["line", "date", "amount", "description", "category", "type"]
+# rows of one import, a temporary table lives on the import's connection only
+staging_table = Table(
+	"transaction_import_staging",
+	MetaData(),
+	Column("line", Integer, nullable=False),
+	Column("date", DateTime, nullable=False),
+	Column("amount", Integer, nullable=False),
+	Column("description", String(255)),
+	Column("category", String(100)),
+	Column("type", String(10)),
+	prefixes=["TEMPORARY"],
+)
+
+
+def new_rows_query(user_id: str):
+	"""
+	Staged rows that are not in the user's transactions yet. A row is a duplicate when the user already has as many
+	transactions with the same date, amount, type and description as its occurrence in the file, so importing
+	an overlapping statement again skips the overlap while two identical coffees on the same day are both kept.
+	"""
+	staging = staging_table.c
+	staged = select(
+		*staging,
+		func.row_number().over(partition_by=[staging.date, staging.amount, staging.type, staging.description], order_by=staging.line).label("occurrence"),
+	).subquery("staged")
+	type = cast(staged.c.type, TransactionModel.type.type)
+	existing = (
+		select(func.count())
+		.where(
+			TransactionModel.user_id == user_id,
+			TransactionModel.date == staged.c.date,
+			TransactionModel.amount == staged.c.amount,
+			TransactionModel.type.is_not_distinct_from(type),
+			TransactionModel.description.is_not_distinct_from(staged.c.description),
+		)
+		.scalar_subquery()
+	)
+	return select(
+		staged.c.line, literal(user_id, String).label("user_id"), staged.c.date, staged.c.amount, staged.c.description, staged.c.category, type.label("type")
+	).where(staged.c.occurrence > existing)
+
+
+class TransactionImportRepository:
+	"""
+	Loads a statement in chunks into a temporary staging table (COPY on Postgres, batched executemany elsewhere),
+	then moves the new rows into transaction with one INSERT ... SELECT and updates the rollup, in one DB transaction.
+	"""
+
+	def __init__(self, session):
+		self.session = session
+		self.staged = 0
+
+	def begin(self):
+		# the whole import is one DB transaction, the dedup INSERT ... SELECT of months of rows outlasts the request timeout
+		extend_statement_timeout(self.session)
+		connection = self.session.connection()
+		staging_table.drop(connection, checkfirst=True)
+		staging_table.create(connection)
+		self.staged = 0
+
+	def stage(self, rows: list[tuple[int, CreateTransactionSchema]]):
+		"""Append one chunk of (line in the file, row), the line orders the duplicates inside the file"""
+		if not rows:
+			return
+		values = [
+			{"line": line, "date": row.date, "amount": row.amount, "description": row.description, "category": row.category, "type": row.type}
+			for line, row in rows
+		]
+		cursor = self.session.connection().connection.driver_connection.cursor()
+		if hasattr(cursor, "copy_expert"):
+			self.copy(cursor, values)
+		else:
+			self.session.execute(insert(staging_table), values)
+		self.staged += len(values)
+
+	def copy(self, cursor, values: list[dict]):
+		buffer = io.StringIO()
+		writer = csv.writer(buffer)
+		for value in values:
+			# an unquoted empty field is NULL in COPY's csv format
+			writer.writerow([value[column].isoformat() if column == "date" else value[column] for column in STAGING_COLUMNS])
+		buffer.seek(0)
+		try:
+			cursor.copy_expert(f"COPY {staging_table.name} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+		finally:
+			cursor.close()
+
+	def finish(self, user_id: str) -> int:
+		"""Insert the new staged rows, add them to the rollup and commit, return the number of rows inserted"""
+		new_rows = new_rows_query(user_id).subquery("new_rows")
+		month = month_start(new_rows.c.date)
+		groups = self.session.execute(
+			select(month, new_rows.c.category, new_rows.c.type, func.sum(new_rows.c.amount), func.count()).group_by(month, new_rows.c.category, new_rows.c.type)
+		).all()
+		deltas = rollup_deltas()
+		for month_value, category, type, total, count in groups:
+			delta = deltas[rollup_key(user_id, month_value, category, type)]
+			delta[0] += total
+			delta[1] += count
+		columns = ["user_id", "date", "amount", "description", "category", "type"]
+		# ids follow the order of the file
+		self.session.execute(insert(TransactionModel).from_select(columns, select(*[new_rows.c[column] for column in columns]).order_by(new_rows.c.line)))
+		TransactionRollupRepository(self.session).apply(deltas)
+		staging_table.drop(self.session.connection())
+		self.session.commit()
+		return sum(count for *_, count in groups)
@@ -0,0 +1,194 @@
+from datetime import date, datetime, time
+
+from sqlalchemy import Date, Select, String, asc, desc, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import TransactionQuerySchema
+
+PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+AGGREGATE_LABELS = {"sum": "total", "count": "count", "avg": "average"}
+ROW_COLUMNS = [
+	TransactionModel.id,
+	TransactionModel.date,
+	TransactionModel.amount,
+	TransactionModel.description,
+	TransactionModel.category,
+	TransactionModel.type,
+]
+
+
+class date_bucket(FunctionElement):
+	"""Start of the day/month of a datetime column, date_trunc on Postgres and strftime on SQLite"""
+
+	type = String()
+	inherit_cache = True
+
+	def __init__(self, unit: str, column):
+		self.unit = unit
+		super().__init__(column)
+
+
+@compiles(date_bucket)
+def compile_date_bucket(element, compiler, **kw):
+	return f"date_trunc('{element.unit}', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(date_bucket, "sqlite")
+def compile_date_bucket_sqlite(element, compiler, **kw):
+	return f"strftime('{PERIOD_FORMATS[element.unit]}', {compiler.process(element.clauses, **kw)})"
+
+
+class month_start(FunctionElement):
+	"""First day of the month of a datetime column, as a date"""
+
+	type = Date()
+	inherit_cache = True
+
+
+@compiles(month_start)
+def compile_month_start(element, compiler, **kw):
+	return f"CAST(date_trunc('month', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(month_start, "sqlite")
+def compile_month_start_sqlite(element, compiler, **kw):
+	return f"date({compiler.process(element.clauses, **kw)}, 'start of month')"
+
+
+@compiles(month_start, "mysql")
+def compile_month_start_mysql(element, compiler, **kw):
+	return f"CAST(DATE_FORMAT({compiler.process(element.clauses, **kw)}, '%%Y-%%m-01') AS DATE)"
+
+
+def build_transaction_query(query: TransactionQuerySchema) -> Select:
+	"""Compile the structured query to a parameterized SELECT, always filtered by user_id"""
+	filters = [TransactionModel.user_id == query.user_id]
+	if query.start_date is not None:
+		filters.append(TransactionModel.date >= query.start_date)
+	if query.end_date is not None:
+		filters.append(TransactionModel.date < query.end_date)
+	if query.categories:
+		# case-insensitive, served by ix_transaction_user_id_lower_category_date
+		filters.append(func.lower(TransactionModel.category).in_([category.lower() for category in query.categories]))
+	if query.type is not None:
+		filters.append(TransactionModel.type == query.type)
+	if query.search:
+		filters.append(TransactionModel.description.icontains(query.search, autoescape=True))
+
+	if not query.is_aggregate:
+		order_column = TransactionModel.amount if query.order_by == "amount" else TransactionModel.date
+		direction = asc if query.order == "asc" else desc
+		return select(*ROW_COLUMNS).where(*filters).order_by(direction(order_column), direction(TransactionModel.id)).limit(query.limit)
+
+	aggregates = query.aggregates or ["sum", "count"]
+	columns = []
+	group_column = None
+	if query.group_by in PERIOD_FORMATS:
+		group_column = date_bucket(query.group_by, TransactionModel.date).label("period")
+	elif query.group_by is not None:
+		group_column = getattr(TransactionModel, query.group_by).label(query.group_by)
+	if group_column is not None:
+		columns.append(group_column)
+	if "sum" in aggregates:
+		columns.append(func.coalesce(func.sum(TransactionModel.amount), 0).label("total"))
+	if "count" in aggregates:
+		columns.append(func.count(TransactionModel.id).label("count"))
+	if "avg" in aggregates:
+		columns.append(func.avg(TransactionModel.amount).label("average"))
+
+	statement = select(*columns).where(*filters)
+	if group_column is None:
+		return statement
+
+	return order_groups(statement.group_by(group_column), group_column.name, aggregates, query)
+
+
+def build_export_query(user_id: str, start_date: datetime | None = None, end_date: datetime | None = None) -> Select:
+	"""The user's rows oldest first, the id breaks ties so the order is stable; reads ix_transaction_user_id_date"""
+	filters = [TransactionModel.user_id == user_id]
+	if start_date is not None:
+		filters.append(TransactionModel.date >= start_date)
+	if end_date is not None:
+		filters.append(TransactionModel.date < end_date)
+	return select(*ROW_COLUMNS).where(*filters).order_by(TransactionModel.date, TransactionModel.id)
+
+
+def order_groups(statement: Select, group_key: str, aggregates: list[str], query: TransactionQuerySchema) -> Select:
+	if query.order_by in AGGREGATE_LABELS and query.order_by in aggregates:
+		order_key, order = AGGREGATE_LABELS[query.order_by], query.order
+	elif query.order_by == group_key or (group_key == "period" and query.order_by == "date"):
+		order_key, order = group_key, query.order
+	elif group_key == "period":
+		# periods read best oldest first
+		order_key, order = "period", "asc"
+	elif "sum" in aggregates:
+		order_key, order = "total", "desc"
+	else:
+		order_key, order = group_key, "asc"
+	direction = asc if order == "asc" else desc
+	return statement.order_by(direction(order_key)).limit(query.limit)
+
+
+def is_month_start(value: datetime) -> bool:
+	return value.day == 1 and value.time() == time(0)
+
+
+def can_use_rollup(query: TransactionQuerySchema) -> bool:
+	"""Sums and counts over whole months without a description search are read from transaction_rollup"""
+	if not query.is_aggregate or query.search or query.group_by not in (None, "month", "category", "type"):
+		return False
+	return all(is_month_start(value) for value in (query.start_date, query.end_date) if value is not None)
+
+
+def build_rollup_query(query: TransactionQuerySchema) -> Select:
+	"""Same result as build_transaction_query for the queries accepted by can_use_rollup, in O(months) rows"""
+	rollup = TransactionRollupModel
+	filters = [rollup.user_id == query.user_id]
+	if query.start_date is not None:
+		filters.append(rollup.month >= query.start_date.date())
+	if query.end_date is not None:
+		filters.append(rollup.month < query.end_date.date())
+	if query.categories:
+		filters.append(func.lower(rollup.category).in_([category.lower() for category in query.categories]))
+	if query.type is not None:
+		filters.append(rollup.type == query.type)
+
+	aggregates = query.aggregates or ["sum", "count"]
+	columns = []
+	group_column = None
+	if query.group_by == "month":
+		group_column = rollup.month.label("period")
+	elif query.group_by is not None:
+		group_column = func.nullif(getattr(rollup, query.group_by), "").label(query.group_by)
+	if group_column is not None:
+		columns.append(group_column)
+	if "sum" in aggregates:
+		columns.append(func.coalesce(func.sum(rollup.total), 0).label("total"))
+	if "count" in aggregates:
+		columns.append(func.coalesce(func.sum(rollup.count), 0).label("count"))
+	if "avg" in aggregates:
+		columns.append((func.sum(rollup.total) * 1.0 / func.nullif(func.sum(rollup.count), 0)).label("average"))
+
+	statement = select(*columns).where(*filters)
+	if group_column is None:
+		return statement
+	# months emptied by deletes keep a row with count 0
+	statement = statement.group_by(group_column).having(func.sum(rollup.count) > 0)
+	return order_groups(statement, group_column.name, aggregates, query)
+
+
+def format_row(row: dict, query: TransactionQuerySchema) -> dict:
+	"""JSON friendly row, the period of Postgres (datetime) and SQLite (string) is formatted the same way"""
+	formatted = {}
+	for key, value in row.items():
+		if key == "period" and isinstance(value, (date, datetime)):
+			value = value.strftime(PERIOD_FORMATS[query.group_by or "day"])
+		elif isinstance(value, (date, datetime)):
+			value = value.isoformat()
+		elif key == "average" and value is not None:
+			value = round(float(value), 2)
+		formatted[key] = value
+	return formatted
@@ -1,69 +1,195 @@
-from sqlalchemy import text
+from sqlalchemy import desc, text
+from src.core.config.environtment import EXPORT_BATCH_ROWS, RAW_QUERY_MAX_ROWS, RAW_QUERY_TIMEOUT_MS
 from src.core.models.transaction_model import TransactionModel
-from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
 from src.core.interfaces.transaction_repository_interface import ITransactionRepository
-from src.database.connection import SessionLocal
-
-
-def get_transaction_repository():
-	return TransactionRepository(SessionLocal())
+from src.repositories.raw_query_guard import SCOPE_PARAM, RawQueryResult, count_rows, scope_to_user, validate_select
+from src.repositories.transaction_queries import build_export_query, build_rollup_query, build_transaction_query, can_use_rollup, format_row
+from src.repositories.transaction_rollup_repository import TransactionRollupRepository, add_delta, rollup_deltas
+from src.repositories.transaction_writes import (
+	delete_statement,
+	insert_statement,
+	previous_row_statement,
+	previous_transaction,
+	reads_previous_row_in_update,
+	supports_returning,
+	transaction_values,
+	update_statement,
+)
 
 
 class TransactionRepository(ITransactionRepository):
-	def __init__(self, session):
+	def __init__(self, session, returning: bool | None = None):
 		self.session = session
+		self.rollup = TransactionRollupRepository(session)
+		# None: RETURNING writes where the database has them, False forces the ORM unit of work (MySQL, benchmark baseline)
+		self.returning = returning
+
+	def uses_returning(self) -> bool:
+		if self.returning is None:
+			self.returning = supports_returning(self.session.get_bind().dialect)
+		return self.returning
 
 	def create(self, data: CreateTransactionSchema | list[CreateTransactionSchema]) -> list[TransactionModel]:
-		transactions = []
-		if isinstance(data, list):
-			for item in data:
-				transactions.append(TransactionModel(user_id=item.user_id, date=item.date, amount=item.amount, description=item.description, category=item.category, type=item.type))
-		else:
-			# check if data is instance of CreateTransactionSchema
-			if not isinstance(data, CreateTransactionSchema):
-				raise TypeError("data should be an instance of CreateTransactionSchema")
-			# check if data has all required keys
-			transactions.append(TransactionModel(user_id=data.user_id, date=data.date, amount=data.amount, description=data.description, category=data.category, type=data.type))
-		# self.session.add_all(transactions)
-		# self.session.commit()
-		# stmt = insert(TransactionModel).values(transactions)
-		# self.session.execute(stmt)
-		self.session.add_all(transactions)
-		self.session.commit()
-		return transactions
+		"""All the rows in one INSERT ... RETURNING, the rollup in one upsert, then the commit"""
+		items = data if isinstance(data, list) else [data]
+		if not isinstance(data, list) and not isinstance(data, CreateTransactionSchema):
+			raise TypeError("data should be an instance of CreateTransactionSchema")
+		if not self.uses_returning():
+			return self.orm_create(items)
+		try:
+			transactions = self.session.scalars(insert_statement(), [transaction_values(item) for item in items]).all()
+			deltas = rollup_deltas()
+			for transaction in transactions:
+				add_delta(deltas, transaction)
+			# same DB transaction as the insert, the rollup can't drift from the transaction table
+			self.rollup.apply(deltas)
+			return self.commit_returned(transactions)
+		except Exception:
+			self.session.rollback()
+			raise
 
 	def get_all(self):
 		return self.session.query(TransactionModel).all()
 
 	def update(self, data: UpdateTransactionSchema) -> TransactionModel:
-		transaction = self.session.query(TransactionModel).filter_by(id=data.id).first()
-		if transaction:
-			transaction.user_id = data.user_id
-			transaction.date = data.date
-			transaction.amount = data.amount
-			transaction.description = data.description
-			transaction.category = data.category
-			transaction.type = data.type
-			self.session.commit()
-			self.session.refresh(transaction)
-			return transaction
-		else:
-			raise Exception("Transaction not found")
+		"""UPDATE ... WHERE id AND user_id RETURNING, one statement on Postgres (the previous row is read in the same UPDATE)"""
+		if not self.uses_returning():
+			return self.orm_update(data)
+		dialect = self.session.get_bind().dialect
+		try:
+			if reads_previous_row_in_update(dialect):
+				row = self.session.execute(update_statement(data, dialect)).first()
+				previous = row
+			else:
+				previous = self.session.execute(previous_row_statement(data)).first()
+				row = previous and self.session.execute(update_statement(data, dialect)).first()
+			if row is None:
+				raise Exception("Transaction not found")
+			transaction = row[0]
+			deltas = rollup_deltas()
+			add_delta(deltas, previous_transaction(data.user_id, previous), -1)
+			add_delta(deltas, transaction)
+			self.rollup.apply(deltas)
+			return self.commit_returned([transaction])[0]
+		except Exception:
+			self.session.rollback()
+			raise
 
 	def delete(self, id, user_id):
+		"""DELETE ... WHERE id AND user_id RETURNING the deleted row"""
+		if not self.uses_returning():
+			return self.orm_delete(id, user_id)
+		try:
+			transaction = self.session.scalars(delete_statement(id, user_id)).first()
+			if transaction is None:
+				raise Exception("Transaction not found")
+			deltas = rollup_deltas()
+			add_delta(deltas, transaction, -1)
+			self.rollup.apply(deltas)
+			return self.commit_returned([transaction])[0]
+		except Exception:
+			self.session.rollback()
+			raise
+
+	def commit_returned(self, transactions: list[TransactionModel]) -> list[TransactionModel]:
+		# detached with the values RETURNING loaded, the commit would expire them and reading one would be another SELECT
+		for transaction in transactions:
+			if transaction in self.session:
+				self.session.expunge(transaction)
+		self.session.commit()
+		return list(transactions)
+
+	def orm_create(self, items: list[CreateTransactionSchema]) -> list[TransactionModel]:
+		transactions = [TransactionModel(**transaction_values(item)) for item in items]
+		self.session.add_all(transactions)
+		deltas = rollup_deltas()
+		for transaction in transactions:
+			add_delta(deltas, transaction)
+		self.rollup.apply(deltas)
+		self.session.commit()
+		return transactions
+
+	def orm_update(self, data: UpdateTransactionSchema) -> TransactionModel:
+		transaction = self.session.query(TransactionModel).filter_by(id=data.id, user_id=data.user_id).first()
+		if not transaction:
+			raise Exception("Transaction not found")
+		deltas = rollup_deltas()
+		add_delta(deltas, transaction, -1)
+		add_delta(deltas, data)
+		self.rollup.apply(deltas)
+		for column, value in transaction_values(data).items():
+			setattr(transaction, column, value)
+		self.session.commit()
+		self.session.refresh(transaction)
+		return transaction
+
+	def orm_delete(self, id, user_id):
 		transaction = self.session.query(TransactionModel).filter_by(id=id, user_id=user_id).first()
-		if transaction:
-			self.session.delete(transaction)
-			self.session.commit()
-			return transaction
-		else:
+		if not transaction:
 			raise Exception("Transaction not found")
+		deltas = rollup_deltas()
+		add_delta(deltas, transaction, -1)
+		self.rollup.apply(deltas)
+		self.session.delete(transaction)
+		self.session.commit()
+		return transaction
 
-	def findRaw(self, query):
+	def findRaw(self, query, params=None, user_id=None):
+		if user_id is not None:
+			return self.find_raw_guarded(query, user_id, params)
 		try:
 			stmt = text(query)
-			return self.session.execute(stmt).all()
+			return self.session.execute(stmt, params or {}).all()
 		except Exception as e:
 			self.session.rollback()
 			print(f"Error executing raw SQL query: {e}")
 			raise e
+
+	def find_raw_guarded(self, query: str, user_id: str, params: dict | None = None, max_rows: int = RAW_QUERY_MAX_ROWS, timeout_ms: int = RAW_QUERY_TIMEOUT_MS) -> RawQueryResult:
+		"""
+		Run untrusted SQL: a single SELECT, scoped to the user's rows, under a statement timeout (Postgres),
+		read from a server-side cursor and capped to `max_rows` rows. When the cap is hit the total is counted.
+		"""
+		statement = validate_select(query)
+		dialect = self.session.get_bind().dialect
+		bound = {**(params or {}), SCOPE_PARAM: user_id}
+		try:
+			if dialect.name == "postgresql":
+				self.session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+			result = self.session.execute(text(scope_to_user(statement, dialect)), bound, execution_options={"stream_results": True, "max_row_buffer": max_rows + 1})
+			rows = result.fetchmany(max_rows + 1)
+			result.close()
+			total_rows = None
+			if len(rows) > max_rows:
+				rows = rows[:max_rows]
+				total_rows = self.session.execute(text(count_rows(statement, dialect)), bound).scalar_one()
+			if dialect.name == "postgresql":
+				self.session.execute(text("SET LOCAL statement_timeout TO DEFAULT"))
+			return RawQueryResult(rows, total_rows)
+		except Exception:
+			self.session.rollback()
+			raise
+
+	def get_category_history(self, user_id: str, limit: int = 500) -> list[tuple[str, str]]:
+		rows = (
+			self.session.query(TransactionModel.description, TransactionModel.category)
+			.filter(TransactionModel.user_id == user_id, TransactionModel.description.isnot(None), TransactionModel.category.isnot(None))
+			.order_by(desc(TransactionModel.id))
+			.limit(limit)
+			.all()
+		)
+		return [(description, category) for description, category in reversed(rows)]
+
+	def query(self, query: TransactionQuerySchema) -> list[dict]:
+		statement = build_rollup_query(query) if can_use_rollup(query) else build_transaction_query(query)
+		rows = self.session.execute(statement).mappings().all()
+		return [format_row(dict(row), query) for row in rows]
+
+	def iter_export(self, user_id: str, start_date=None, end_date=None, batch_size: int = EXPORT_BATCH_ROWS):
+		"""Rows read `batch_size` at a time from a server-side cursor (yield_per), memory stays flat whatever the row count"""
+		result = self.session.execute(build_export_query(user_id, start_date, end_date).execution_options(yield_per=batch_size))
+		try:
+			yield from result
+		finally:
+			result.close()
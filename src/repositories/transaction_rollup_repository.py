@@ -0,0 +1,171 @@
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.database.connection import extend_statement_timeout
+from src.repositories.transaction_queries import month_start
+
+RollupKey = tuple[str, date, str, str]
+
+# first key of the advisory locks of the rollup rows, the second one is the hash of the user id
+ROLLUP_LOCK_SPACE = 7019
+
+
+def month_of(value) -> date:
+	"""First day of the month of a transaction date, strings are read as the wall clock the database stores"""
+	if isinstance(value, str):
+		value = datetime.fromisoformat(value)
+	return date(value.year, value.month, 1)
+
+
+def rollup_key(user_id: str, transaction_date, category: str | None, type: str | None) -> RollupKey:
+	return (user_id, month_of(transaction_date), category or "", type or "")
+
+
+def rollup_deltas() -> defaultdict[RollupKey, list[float]]:
+	return defaultdict(lambda: [0, 0])
+
+
+def add_delta(deltas: dict[RollupKey, list[float]], transaction, sign: int = 1):
+	"""Add (sign = 1) or remove (sign = -1) a transaction or transaction schema from the deltas"""
+	delta = deltas[rollup_key(transaction.user_id, transaction.date, transaction.category, transaction.type)]
+	delta[0] += sign * transaction.amount
+	delta[1] += sign
+
+
+def rollup_rows(deltas: dict[RollupKey, list[float]]) -> list[dict]:
+	"""Column values of the non-empty deltas"""
+	return [
+		{"user_id": user_id, "month": month, "category": category, "type": type, "total": total, "count": count}
+		for (user_id, month, category, type), (total, count) in deltas.items()
+		if total != 0 or count != 0
+	]
+
+
+def upsert_statement(dialect: str, rows: list[dict]):
+	"""One multi-row INSERT adding to the existing rows on conflict, None for dialects without ON CONFLICT"""
+	if dialect not in ("postgresql", "sqlite"):
+		return None
+	statement = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(TransactionRollupModel).values(rows)
+	return statement.on_conflict_do_update(
+		index_elements=["user_id", "month", "category", "type"],
+		set_={"total": TransactionRollupModel.total + statement.excluded.total, "count": TransactionRollupModel.count + statement.excluded.count},
+	)
+
+
+def lock_statement(dialect: str, user_id: str):
+	"""
+	Transaction-scoped advisory lock of the user's rollup rows on Postgres, taken by every delta write and by
+	the rebuild so they can't interleave. None elsewhere, SQLite serializes the write transactions anyway.
+	"""
+	if dialect != "postgresql":
+		return None
+	return select(func.pg_advisory_xact_lock(ROLLUP_LOCK_SPACE, func.hashtext(user_id)))
+
+
+def increment_statement(values: dict):
+	return (
+		update(TransactionRollupModel)
+		.where(
+			TransactionRollupModel.user_id == values["user_id"],
+			TransactionRollupModel.month == values["month"],
+			TransactionRollupModel.category == values["category"],
+			TransactionRollupModel.type == values["type"],
+		)
+		.values(total=TransactionRollupModel.total + values["total"], count=TransactionRollupModel.count + values["count"])
+	)
+
+
+class TransactionRollupRepository:
+	"""
+	Keeps transaction_rollup in step with the transaction table. `apply` only executes the statements,
+	the caller commits them together with the transaction writes.
+	"""
+
+	def __init__(self, session):
+		self.session = session
+
+	def apply(self, deltas: dict[RollupKey, list[float]]):
+		"""Add (total, count) deltas, creating the missing rows, in one statement where the database has ON CONFLICT"""
+		rows = rollup_rows(deltas)
+		if not rows:
+			return
+		dialect = self.session.get_bind().dialect.name
+		self.lock(dialect, {row["user_id"] for row in rows})
+		upsert = upsert_statement(dialect, rows)
+		if upsert is not None:
+			self.session.execute(upsert)
+			return
+		for values in rows:
+			if self.session.execute(increment_statement(values)).rowcount == 0:
+				self.session.execute(insert(TransactionRollupModel).values(**values))
+
+	def lock(self, dialect: str, user_ids):
+		# sorted, two writers locking the same users never wait on each other in opposite order
+		for user_id in sorted(user_ids):
+			statement = lock_statement(dialect, user_id)
+			if statement is not None:
+				self.session.execute(statement)
+
+	def rebuild(self, user_id: str | None = None) -> int:
+		"""Recompute the rollup (of one user) from the transaction table, return the number of rollup rows"""
+		if user_id is not None:
+			return self.rebuild_user(user_id)
+		# users whose transactions are all gone still have rollup rows to clear
+		user_ids = self.session.scalars(select(TransactionModel.user_id).union(select(TransactionRollupModel.user_id))).all()
+		return sum(self.rebuild_user(user_id) for user_id in user_ids)
+
+	def rebuild_user(self, user_id: str) -> int:
+		"""
+		DELETE and INSERT ... SELECT of one user in its own DB transaction, under the lock of the delta writes.
+		A write committed before the lock is read by the SELECT, a later one waits and adds its delta to the new rows.
+		"""
+		month = month_start(TransactionModel.date)
+		category = func.coalesce(TransactionModel.category, "")
+		type = func.coalesce(TransactionModel.type, "")
+		source = (
+			select(TransactionModel.user_id, month, category, type, func.sum(TransactionModel.amount), func.count(TransactionModel.id))
+			.where(TransactionModel.user_id == user_id)
+			.group_by(TransactionModel.user_id, month, category, type)
+		)
+		try:
+			# months of rows of one user, not bound by the request timeout
+			extend_statement_timeout(self.session)
+			self.lock(self.session.get_bind().dialect.name, [user_id])
+			self.session.execute(delete(TransactionRollupModel).where(TransactionRollupModel.user_id == user_id))
+			result = self.session.execute(
+				insert(TransactionRollupModel).from_select(["user_id", "month", "category", "type", "total", "count"], source)
+			)
+			self.session.commit()
+		except Exception:
+			self.session.rollback()
+			raise
+		return result.rowcount
+
+
+class AsyncTransactionRollupRepository:
+	"""TransactionRollupRepository.apply on an AsyncSession, under the same advisory locks"""
+
+	def __init__(self, session):
+		self.session = session
+
+	async def apply(self, deltas: dict[RollupKey, list[float]]):
+		rows = rollup_rows(deltas)
+		if not rows:
+			return
+		dialect = self.session.get_bind().dialect.name
+		for user_id in sorted({row["user_id"] for row in rows}):
+			statement = lock_statement(dialect, user_id)
+			if statement is not None:
+				await self.session.execute(statement)
+		upsert = upsert_statement(dialect, rows)
+		if upsert is not None:
+			await self.session.execute(upsert)
+			return
+		for values in rows:
+			if (await self.session.execute(increment_statement(values))).rowcount == 0:
+				await self.session.execute(insert(TransactionRollupModel).values(**values))
@@ -0,0 +1,63 @@
+from sqlalchemy import Delete, Insert, Select, Update, delete, insert, select, update
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
+
+WRITE_COLUMNS = ["user_id", "date", "amount", "description", "category", "type"]
+# columns of the row before an update, named apart from the updated ones so RETURNING can't mix them up
+PREVIOUS_COLUMNS = ["date", "amount", "category", "type"]
+PREVIOUS_PREFIX = "previous_"
+
+
+def supports_returning(dialect) -> bool:
+	"""INSERT, UPDATE and DELETE ... RETURNING (Postgres, SQLite >= 3.35, not MySQL)"""
+	return dialect.insert_returning and dialect.update_returning and dialect.delete_returning
+
+
+def reads_previous_row_in_update(dialect) -> bool:
+	# Postgres lets RETURNING read the FROM items of an UPDATE, SQLite only the updated table
+	return dialect.name == "postgresql"
+
+
+def transaction_values(data: CreateTransactionSchema | UpdateTransactionSchema) -> dict:
+	return {column: getattr(data, column) for column in WRITE_COLUMNS}
+
+
+def insert_statement() -> Insert:
+	"""Bulk INSERT ... RETURNING, executed with a list of transaction_values it is sent as one multi-row statement"""
+	return insert(TransactionModel).returning(TransactionModel)
+
+
+def previous_row_statement(data: UpdateTransactionSchema) -> Select:
+	"""The user's row before the update, locked until the commit so the rollup delta is taken from the row that is updated"""
+	return (
+		select(*[getattr(TransactionModel, column).label(PREVIOUS_PREFIX + column) for column in PREVIOUS_COLUMNS])
+		.add_columns(TransactionModel.id)
+		.where(TransactionModel.id == data.id, TransactionModel.user_id == data.user_id)
+		.with_for_update()
+	)
+
+
+def update_statement(data: UpdateTransactionSchema, dialect) -> Update:
+	"""
+	UPDATE ... WHERE id AND user_id RETURNING the updated row. On Postgres the locked previous row is joined in
+	and returned too, the whole update is one statement.
+	"""
+	values = {column: getattr(data, column) for column in WRITE_COLUMNS if column != "user_id"}
+	statement = update(TransactionModel).values(**values)
+	if not reads_previous_row_in_update(dialect):
+		return statement.where(TransactionModel.id == data.id, TransactionModel.user_id == data.user_id).returning(TransactionModel)
+	previous = previous_row_statement(data).subquery("previous")
+	return (
+		statement.where(TransactionModel.id == previous.c.id)
+		.returning(TransactionModel, *[previous.c[PREVIOUS_PREFIX + column] for column in PREVIOUS_COLUMNS])
+	)
+
+
+def previous_transaction(user_id: str, row) -> TransactionModel:
+	"""Transient model of the previous_* columns, only read to take the row out of the rollup"""
+	return TransactionModel(user_id=user_id, **{column: row._mapping[PREVIOUS_PREFIX + column] for column in PREVIOUS_COLUMNS})
+
+
+def delete_statement(id: int, user_id: str) -> Delete:
+	return delete(TransactionModel).where(TransactionModel.id == id, TransactionModel.user_id == user_id).returning(TransactionModel)
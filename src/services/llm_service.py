@@ -1,57 +1,247 @@
+import asyncio
+import logging
 import os
-from typing import Iterable, List, Optional, Union
-from openai import NOT_GIVEN, NotGiven, OpenAI
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional, TypeVar, Union
+from openai import NOT_GIVEN, AsyncOpenAI, NotGiven
 from openai.types.chat import ChatCompletionMessageParam
 
+from src.core.config.environtment import LLM_AGENT_MODELS, LLM_HEDGE_ENABLED, LLM_MAX_ATTEMPTS, LLM_QUERY_MODELS, LLM_REQUEST_TIMEOUT, LLM_VISION_MODELS
+from src.services.model_router import ModelRouter
 
+T = TypeVar("T")
+
+# model pools, each pool is routed independently
+AGENT_POOL = "agent"
+QUERY_POOL = "query"  # text-to-SQL
+VISION_POOL = "vision"  # image extraction
+
+
+@lru_cache(maxsize=1)
 def get_llm_service():
+	# shared per process so the HTTP connection pool of the client and the latency stats of the models are reused between requests
 	return LLMService()
 
 
+def parse_models(models: str) -> list[str]:
+	return [model.strip() for model in models.split(",") if model.strip()]
+
+
+class LLMError(Exception):
+	pass
+
+
 class LLMService:
-	client: OpenAI
+	client: AsyncOpenAI
 
-	def __init__(self):
-		self.client = OpenAI(
+	def __init__(self, client: AsyncOpenAI | None = None, model_pools: dict[str, list[str]] | None = None):
+		self.client = client or AsyncOpenAI(
 			api_key=os.getenv("OPEN_ROUTER_KEY"),
 			base_url="https://openrouter.ai/api/v1",
 		)
-		self.models = [
-			# "meta-llama/llama-4-scout:free",
-			"meta-llama/llama-4-maverick:free",
-			# "meta-llama/llama-3.3-70b-instruct:free",
-			# "deepseek/deepseek-chat-v3-0324:free",
-			# "google/gemma-3-27b-it:free", #best for image
-			# "meta-llama/llama-3.2-11b-vision-instruct:free",
-			# "opengvlab/internvl3-14b:free", # best for image
-		]
-
-	def get_random_model(self):
-		import random
-
-		return random.choice(self.models)
-
-	def query_execute(
+		model_pools = model_pools or {
+			AGENT_POOL: parse_models(LLM_AGENT_MODELS),
+			QUERY_POOL: parse_models(LLM_QUERY_MODELS),
+			VISION_POOL: parse_models(LLM_VISION_MODELS),
+		}
+		self.routers = {pool: ModelRouter(models) for pool, models in model_pools.items()}
+		self.models = self.routers[AGENT_POOL].models
+		self.timeout = LLM_REQUEST_TIMEOUT
+		self.max_attempts = LLM_MAX_ATTEMPTS
+		self.hedge_enabled = LLM_HEDGE_ENABLED
+
+	def select_model(self, pool: str = AGENT_POOL) -> str:
+		return self.routers[pool].select() or self.routers[pool].models[0]
+
+	def stats(self) -> dict:
+		"""Latency, error rate and circuit state of every model, per pool"""
+		return {pool: router.snapshot() for pool, router in self.routers.items()}
+
+	def extra_headers(self):
+		return {
+			"X-Title": "Expense Tracker AI Agent",
+			"HTTP-Referer": "https://github.com/ghonijee/money-tracker-ai-agent",
+		}
+
+	async def query_execute(
 		self,
 		messages: Iterable[ChatCompletionMessageParam],
 		max_token: int | None | NotGiven = NOT_GIVEN,
 		stop: Union[Optional[str], List[str], None] | NotGiven = NOT_GIVEN,
 		model: str | None = None,
+		pool: str = AGENT_POOL,
 	):
-		completion = self.client.chat.completions.create(
-			extra_headers={
-				"X-Title": "Expense Tracker AI Agent",
-				"HTTP-Referer": "https://github.com/ghonijee/money-tracker-ai-agent",
-			},
-			model=model if model is not None else self.get_random_model(),
-			messages=messages,
-			stop=stop,
-			max_tokens=max_token,
-		)
+		"""Run the completion on `model`, or on the fastest healthy model of `pool` with failover and hedging"""
+
+		async def request(selected: str):
+			completion = await self.client.chat.completions.create(
+				extra_headers=self.extra_headers(),
+				model=selected,
+				messages=messages,
+				stop=stop,
+				max_tokens=max_token,
+				timeout=self.timeout,
+			)
+
+			if completion.choices is None:
+				# OpenRouter reports provider errors in the body, raise so the next model is tried
+				print(completion)
+				error = getattr(completion, "error", None)
+				raise LLMError(error.get("message") if isinstance(error, dict) else f"{selected} returned no choices")
+
+			return completion.choices[0].message.content
+
+		if model is not None:
+			return await request(model)
+		return await self.route(pool, request)
+
+	async def query_stream(
+		self,
+		messages: Iterable[ChatCompletionMessageParam],
+		max_token: int | None | NotGiven = NOT_GIVEN,
+		stop: Union[Optional[str], List[str], None] | NotGiven = NOT_GIVEN,
+		model: str | None = None,
+		pool: str = AGENT_POOL,
+	) -> AsyncIterator[str]:
+		"""
+		Stream the completion as text deltas.
+		The model is routed on the time to the first token, failover and hedging only happen before the first token.
+		Closing the generator early (e.g. with contextlib.aclosing) closes the HTTP stream and cancels the rest of the generation.
+		"""
+
+		async def open_stream(selected: str):
+			stream = await self.client.chat.completions.create(
+				extra_headers=self.extra_headers(),
+				model=selected,
+				messages=messages,
+				stop=stop,
+				max_tokens=max_token,
+				stream=True,
+				timeout=self.timeout,
+			)
+			chunks = self.stream_text(stream)
+			try:
+				first = await anext(chunks, "")
+			except BaseException:
+				await chunks.aclose()
+				raise
+			return first, chunks
+
+		async def discard(opened):
+			await opened[1].aclose()
+
+		if model is not None:
+			first, chunks = await open_stream(model)
+		else:
+			first, chunks = await self.route(pool, open_stream, discard)
+		try:
+			if first:
+				yield first
+			async for content in chunks:
+				yield content
+		finally:
+			await chunks.aclose()
+
+	async def stream_text(self, stream) -> AsyncIterator[str]:
+		try:
+			async for chunk in stream:
+				if not chunk.choices:
+					continue
+				content = chunk.choices[0].delta.content
+				if content:
+					yield content
+		finally:
+			await stream.close()
+
+	async def route(self, pool: str, request: Callable[[str], Awaitable[T]], discard: Callable[[T], Awaitable[None]] | None = None) -> T:
+		"""Try the best models of the pool in order until one succeeds, at most `max_attempts` models"""
+		router = self.routers[pool]
+		tried: list[str] = []
+		error: BaseException | None = None
+		while len(tried) < self.max_attempts:
+			model = router.select(exclude=tried)
+			if model is None:
+				break
+			try:
+				return await self.hedged(router, model, tried, request, discard)
+			except Exception as e:
+				print(f"LLM request on {model} failed: {e}")
+				error = e
+		raise error or LLMError(f"No model available in pool {pool}")
+
+	async def hedged(
+		self,
+		router: ModelRouter,
+		model: str,
+		tried: list[str],
+		request: Callable[[str], Awaitable[T]],
+		discard: Callable[[T], Awaitable[None]] | None = None,
+	) -> T:
+		"""
+		Send the request to `model`, when it has not answered after its hedge delay send a duplicate to the next best
+		healthy model and return whichever succeeds first. Every other request is cancelled or discarded.
+		"""
+		tried.append(model)
+		tasks = {self.send(router, model, request)}
+		backup = None
+		if self.hedge_enabled and len(tried) < self.max_attempts:
+			backup = router.select(exclude=tried, available_only=True)
+		if backup is not None:
+			done, _ = await asyncio.wait(tasks, timeout=router.hedge_delay(model))
+			if not done:
+				tried.append(backup)
+				tasks.add(self.send(router, backup, request))
+
+		pending = set(tasks)
+		winner: asyncio.Task | None = None
+		error: BaseException | None = None
+		try:
+			while pending:
+				done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+				winner = next((task for task in done if task.exception() is None), None)
+				error = next((task.exception() for task in done if task.exception() is not None), error)
+				if winner is not None:
+					return winner.result()
+			raise error or LLMError(f"{model} failed")
+		finally:
+			await self.discard_losers([task for task in tasks if task is not winner], discard)
+
+	async def discard_losers(self, losers: list[asyncio.Task], discard: Callable[[T], Awaitable[None]] | None):
+		"""
+		Cancel the requests that did not win and release what they opened. A loser may have completed at the same
+		time as the winner or before its cancellation took effect, its result (an open stream) is discarded too.
+		"""
+		for task in losers:
+			task.cancel()
+		results = await asyncio.gather(*losers, return_exceptions=True)
+		if discard is None:
+			return
+		for result in results:
+			if isinstance(result, BaseException):
+				continue
+			try:
+				await discard(result)
+			except Exception as e:
+				logging.warning(f"Closing a hedged LLM response failed: {e}")
 
-		if completion.choices is None:
-			# throw an error
-			print(completion)
-			return completion.error.message
+	def send(self, router: ModelRouter, model: str, request: Callable[[str], Awaitable[T]]) -> asyncio.Task:
+		"""Start the request on `model`, the first request through a half-open circuit is its trial"""
+		router.start(model)
+		task = asyncio.create_task(self.timed(router, model, request))
+		# also when the task is cancelled before it ran, the circuit can let the next trial through
+		task.add_done_callback(lambda task: task.cancelled() and router.cancel(model))
+		return task
 
-		return completion.choices[0].message.content
+	async def timed(self, router: ModelRouter, model: str, request: Callable[[str], Awaitable[T]]) -> T:
+		started = time.monotonic()
+		try:
+			result = await request(model)
+		except asyncio.CancelledError:
+			# the hedge lost the race, this is not a failure of the model
+			raise
+		except Exception:
+			router.record_failure(model)
+			raise
+		router.record_success(model, time.monotonic() - started)
+		return result
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable
+from uuid import uuid4
+
+from src.core.config.environtment import MEMORY_WRITE_BATCH_SIZE, MEMORY_WRITE_FLUSH_INTERVAL, MEMORY_WRITE_MAX_PENDING
+from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
+from src.database.async_connection import get_async_sessionmaker
+from src.repositories.async_memory_message_repository import AsyncMemoryMessageRepository
+
+
+@lru_cache(maxsize=1)
+def get_memory_write_buffer():
+	return MemoryWriteBuffer()
+
+
+class MemoryWriteBuffer:
+	"""
+	Write-behind queue for memory messages. Messages are inserted in batches, when `batch_size` rows are pending
+	or every `flush_interval` seconds, instead of one commit per message on the request path.
+	The queue is bounded: a full queue is flushed before a row is added, and while the database is failing
+	the oldest rows are dropped so at most `max_pending` rows are kept. `add` never fails the chat turn.
+	"""
+
+	def __init__(
+		self,
+		session_factory: Callable | None = None,
+		batch_size: int = MEMORY_WRITE_BATCH_SIZE,
+		flush_interval: float = MEMORY_WRITE_FLUSH_INTERVAL,
+		max_pending: int = MEMORY_WRITE_MAX_PENDING,
+	):
+		# AsyncSession factory, the shared async engine unless one is given
+		self.session_factory = session_factory
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		self.max_pending = max_pending
+		# rows not handed to a write yet, and the rows of the write in progress
+		self.pending: list[dict] = []
+		self.writing: list[dict] = []
+		self.dropped = 0
+		self.lock = asyncio.Lock()
+		self.task: asyncio.Task | None = None
+		self.flush_requested = asyncio.Event()
+		self.stopped = False
+
+	async def add(self, data: CreateMemoryMessageSchema) -> dict:
+		if not isinstance(data, CreateMemoryMessageSchema):
+			raise TypeError("data should be an instance of CreateMemoryMessageSchema")
+		# the client id tells readers which queued rows a write has stored already
+		row = {**data.to_dict(), "created_at": datetime.now(), "client_id": uuid4().hex}
+		self.start()
+		if len(self.pending) >= self.max_pending:
+			# backpressure, wait for the queued rows to be written before queuing more
+			try:
+				await self.flush()
+			except Exception:
+				# already logged, the database is failing and the oldest rows make room for this one
+				pass
+			self.drop_oldest(self.max_pending - 1)
+		self.pending.append(row)
+		if len(self.pending) >= self.batch_size:
+			self.flush_requested.set()
+		return row
+
+	def drop_oldest(self, keep: int):
+		overflow = len(self.pending) - keep
+		if overflow > 0:
+			del self.pending[:overflow]
+			self.dropped += overflow
+			logging.warning(f"Memory write buffer is full, dropped the {overflow} oldest messages ({self.dropped} in total)")
+
+	def pending_for(self, user_id: str) -> list[dict]:
+		"""
+		Unwritten rows of the user, oldest first, so reads can see the user's own writes.
+		Rows of a write in progress may already be committed, readers drop the ones they also read from the database.
+		"""
+		return [row for row in self.writing + self.pending if row["user_id"] == user_id]
+
+	async def flush(self) -> int:
+		async with self.lock:
+			rows = self.pending[: self.max_pending]
+			if not rows:
+				return 0
+			del self.pending[: len(rows)]
+			self.writing = rows
+			try:
+				await self.write(rows)
+			except Exception as e:
+				# keep the rows for the next flush, they are retried in the same order
+				logging.warning(f"Failed to write {len(rows)} memory messages: {e}")
+				self.pending[:0] = rows
+				self.drop_oldest(self.max_pending)
+				raise
+			finally:
+				self.writing = []
+			return len(rows)
+
+	async def write(self, rows: list[dict]):
+		session_factory = self.session_factory or get_async_sessionmaker()
+		async with session_factory() as session:
+			await AsyncMemoryMessageRepository(session).create_many(rows)
+
+	def start(self):
+		if self.task is None or self.task.done():
+			self.stopped = False
+			self.task = asyncio.create_task(self.run())
+
+	async def run(self):
+		while not self.stopped:
+			try:
+				await asyncio.wait_for(self.flush_requested.wait(), timeout=self.flush_interval)
+			except asyncio.TimeoutError:
+				pass
+			self.flush_requested.clear()
+			try:
+				await self.flush()
+			except Exception:
+				# already logged, the rows are retried on the next flush
+				pass
+
+	async def stop(self):
+		"""Stop the background flusher and write the remaining rows, called on shutdown"""
+		if self.task is not None:
+			# the flusher is not cancelled so a batch being written is never lost or written twice
+			self.stopped = True
+			self.flush_requested.set()
+			await self.task
+			self.task = None
+		while self.pending:
+			await self.flush()
@@ -0,0 +1,129 @@
+import time
+from collections import deque
+from typing import Callable, Iterable
+
+from src.core.config.environtment import LLM_BREAKER_COOLDOWN, LLM_BREAKER_FAILURES, LLM_HEDGE_MIN_DELAY
+
+
+class ModelStats:
+	"""Latency and error statistics of one model, updated after every request"""
+
+	def __init__(self, window: int = 50):
+		self.ewma_latency: float | None = None
+		self.error_rate = 0.0
+		self.latencies: deque[float] = deque(maxlen=window)
+		self.consecutive_failures = 0
+		# 0 while the circuit is closed, the circuit is half-open once the time is past it
+		self.open_until = 0.0
+		# the one request let through a half-open circuit is in flight
+		self.trial_in_flight = False
+		self.requests = 0
+
+	def p95(self) -> float | None:
+		if not self.latencies:
+			return None
+		ordered = sorted(self.latencies)
+		return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class ModelRouter:
+	"""
+	Picks the model of a pool with the lowest EWMA latency, penalized by its error rate.
+	Models that are not tried yet are preferred so every model gets measured, and a model that fails
+	`failure_threshold` times in a row is skipped (circuit open) for `cooldown` seconds. Then the circuit is half-open:
+	one trial request is let through, its success closes the circuit and its failure opens it for another cooldown.
+	"""
+
+	def __init__(
+		self,
+		models: Iterable[str],
+		alpha: float = 0.2,
+		failure_threshold: int = LLM_BREAKER_FAILURES,
+		cooldown: float = LLM_BREAKER_COOLDOWN,
+		min_hedge_delay: float = LLM_HEDGE_MIN_DELAY,
+		clock: Callable[[], float] = time.monotonic,
+	):
+		self.models = list(models)
+		if not self.models:
+			raise ValueError("ModelRouter needs at least one model")
+		self.alpha = alpha
+		self.failure_threshold = failure_threshold
+		self.cooldown = cooldown
+		self.min_hedge_delay = min_hedge_delay
+		self.clock = clock
+		self.stats = {model: ModelStats() for model in self.models}
+
+	def state(self, model: str) -> str:
+		stats = self.stats[model]
+		if not stats.open_until:
+			return "closed"
+		return "open" if self.clock() < stats.open_until else "half_open"
+
+	def is_available(self, model: str) -> bool:
+		state = self.state(model)
+		return state == "closed" or (state == "half_open" and not self.stats[model].trial_in_flight)
+
+	def start(self, model: str):
+		"""Called when a request is sent to `model`, the request through a half-open circuit becomes its trial"""
+		if self.state(model) == "half_open":
+			self.stats[model].trial_in_flight = True
+
+	def cancel(self, model: str):
+		"""A request was cancelled (lost a hedge race), the circuit can let a new trial through"""
+		self.stats[model].trial_in_flight = False
+
+	def score(self, model: str) -> float:
+		stats = self.stats[model]
+		if stats.ewma_latency is None:
+			return 0.0
+		return stats.ewma_latency * (1 + 4 * stats.error_rate)
+
+	def ranked(self, exclude: Iterable[str] = (), available_only: bool = False) -> list[str]:
+		"""Available models from the best to the worst, falls back to the circuit closest to closing when all are open"""
+		excluded = set(exclude)
+		candidates = [model for model in self.models if model not in excluded]
+		available = [model for model in candidates if self.is_available(model)]
+		if available or available_only:
+			return sorted(available, key=self.score)
+		return sorted(candidates, key=lambda model: self.stats[model].open_until)[:1]
+
+	def select(self, exclude: Iterable[str] = (), available_only: bool = False) -> str | None:
+		ranked = self.ranked(exclude, available_only)
+		return ranked[0] if ranked else None
+
+	def record_success(self, model: str, latency: float):
+		stats = self.stats[model]
+		stats.requests += 1
+		stats.latencies.append(latency)
+		stats.ewma_latency = latency if stats.ewma_latency is None else (1 - self.alpha) * stats.ewma_latency + self.alpha * latency
+		stats.error_rate = (1 - self.alpha) * stats.error_rate
+		stats.consecutive_failures = 0
+		stats.open_until = 0.0
+		stats.trial_in_flight = False
+
+	def record_failure(self, model: str):
+		stats = self.stats[model]
+		stats.requests += 1
+		stats.error_rate = (1 - self.alpha) * stats.error_rate + self.alpha
+		stats.consecutive_failures += 1
+		stats.trial_in_flight = False
+		if stats.consecutive_failures >= self.failure_threshold:
+			stats.open_until = self.clock() + self.cooldown
+
+	def hedge_delay(self, model: str) -> float:
+		"""Time to wait for `model` before sending a duplicate request to the next model, based on its p95 latency"""
+		p95 = self.stats[model].p95()
+		return max(p95 if p95 is not None else 0.0, self.min_hedge_delay)
+
+	def snapshot(self) -> dict:
+		return {
+			model: {
+				"ewma_latency": stats.ewma_latency,
+				"p95_latency": stats.p95(),
+				"error_rate": round(stats.error_rate, 3),
+				"requests": stats.requests,
+				"circuit_open": not self.is_available(model),
+				"circuit": self.state(model),
+			}
+			for model, stats in self.stats.items()
+		}
@@ -0,0 +1,261 @@
+import csv
+import html
+import re
+from datetime import datetime
+from itertools import chain
+from typing import Callable, Iterable, Iterator
+
+from src.agent.category_classifier import CategoryClassifier, get_category_classifier
+from src.agent.date_resolver import MONTHS
+from src.core.config.environtment import IMPORT_CHUNK_ROWS
+from src.core.schemas.transaction_schema import CreateTransactionSchema
+from src.database.connection import SessionLocal
+from src.repositories.transaction_import_repository import TransactionImportRepository
+from src.repositories.transaction_repository import TransactionRepository
+
+MAX_REPORTED_ERRORS = 20
+MAX_DESCRIPTION_LENGTH = 255
+# header names of bank and e-wallet exports (lowercase, punctuation removed)
+CSV_COLUMNS = {
+	"date": ["date", "tanggal", "tgl", "transaction date", "tanggal transaksi", "tgl transaksi", "posting date", "waktu", "datetime"],
+	"description": ["description", "keterangan", "deskripsi", "uraian", "remark", "remarks", "details", "detail", "merchant", "catatan", "note"],
+	"amount": ["amount", "jumlah", "nominal", "mutasi", "total"],
+	"debit": ["debit", "debet", "withdrawal", "keluar", "uang keluar", "pengeluaran"],
+	"credit": ["credit", "kredit", "deposit", "masuk", "uang masuk", "pemasukan"],
+	"type": ["type", "jenis", "tipe", "db cr", "dbcr", "d k"],
+	"category": ["category", "kategori"],
+}
+TYPES = {
+	"expense": "expense", "pengeluaran": "expense", "keluar": "expense", "debit": "expense", "debet": "expense", "db": "expense", "dr": "expense", "d": "expense",
+	"income": "income", "pemasukan": "income", "masuk": "income", "credit": "income", "kredit": "income", "cr": "income", "k": "income",
+}
+NUMERIC_DATE_PATTERN = re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})(?:[ T,]+(\d{1,2})[:.](\d{2})(?:[:.](\d{2}))?)?$")
+TEXT_DATE_PATTERN = re.compile(r"^(\d{1,2})[ -]([a-z]+)\.?[ -,]+(\d{4})(?:[ T,]+(\d{1,2})[:.](\d{2})(?:[:.](\d{2}))?)?$")
+COMPACT_DATE_PATTERN = re.compile(r"^(\d{4})(\d{2})(\d{2})(?:(\d{2})(\d{2})(\d{2})?)?")
+AMOUNT_MARKER_PATTERN = re.compile(r"(DB|DR|CR|D|K)$")
+OFX_TAG_PATTERN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+class StatementFormatError(ValueError):
+	pass
+
+
+class ImportProgress:
+	"""Counters of one import, reported after every chunk"""
+
+	def __init__(self, format: str):
+		self.format = format
+		self.rows_read = 0
+		self.rows_staged = 0
+		self.rows_invalid = 0
+		self.classified = 0
+		self.imported: int | None = None
+		self.duplicates: int | None = None
+		self.errors: list[str] = []
+		self.done = False
+
+	def add_error(self, line: int, error: Exception):
+		self.rows_invalid += 1
+		if len(self.errors) < MAX_REPORTED_ERRORS:
+			self.errors.append(f"line {line}: {error}")
+
+	def to_dict(self) -> dict:
+		return {
+			"format": self.format,
+			"rows_read": self.rows_read,
+			"rows_staged": self.rows_staged,
+			"rows_invalid": self.rows_invalid,
+			"classified": self.classified,
+			"imported": self.imported,
+			"duplicates": self.duplicates,
+			"errors": self.errors,
+			"done": self.done,
+		}
+
+	def __str__(self) -> str:
+		text = f"read {self.rows_read}, staged {self.rows_staged}, invalid {self.rows_invalid}"
+		if self.done:
+			text += f", imported {self.imported}, duplicates skipped {self.duplicates}"
+		return text
+
+
+def parse_statement_amount(value: str) -> tuple[float, str | None]:
+	"""
+	Signed amount and the expense/income marker of a statement amount, e.g. "Rp 1.250.000,00", "-50,000.50",
+	"(75.000)" or "150.000 DB". A single separator followed by exactly three digits is a thousands separator.
+	"""
+	text = re.sub(r"\s|RP\.?|IDR", "", value.upper())
+	marker = AMOUNT_MARKER_PATTERN.search(text)
+	type = TYPES[marker.group(1).lower()] if marker else None
+	text = AMOUNT_MARKER_PATTERN.sub("", text)
+	negative = text.startswith("-") or text.endswith("-") or (text.startswith("(") and text.endswith(")"))
+	number = text.strip("()+-")
+	if not re.fullmatch(r"\d[\d.,]*", number):
+		raise ValueError(f"invalid amount {value!r}")
+	if "." in number and "," in number:
+		decimal = "." if number.rindex(".") > number.rindex(",") else ","
+		number = number.replace("," if decimal == "." else ".", "").replace(decimal, ".")
+	elif number.count(".") + number.count(",") > 0:
+		separator = "." if "." in number else ","
+		if number.count(separator) > 1 or len(number) - number.rindex(separator) - 1 == 3:
+			number = number.replace(separator, "")
+		else:
+			number = number.replace(separator, ".")
+	amount = float(number)
+	return -amount if negative else amount, type
+
+
+def parse_statement_date(value: str) -> datetime:
+	"""ISO, day first (01/10/2026, 01-10-26), "01 Okt 2026" and OFX (20261001120000.000[+7:WIB]) dates"""
+	text = " ".join(value.strip().lower().split())
+	try:
+		return datetime.fromisoformat(text)
+	except ValueError:
+		pass
+	match = NUMERIC_DATE_PATTERN.match(text)
+	if match:
+		day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+		year += 2000 if len(match.group(3)) == 2 else 0
+		return datetime(year, month, day, *[int(part or 0) for part in match.groups()[3:]])
+	match = TEXT_DATE_PATTERN.match(text)
+	if match and match.group(2) in MONTHS:
+		return datetime(int(match.group(3)), MONTHS[match.group(2)], int(match.group(1)), *[int(part or 0) for part in match.groups()[3:]])
+	match = COMPACT_DATE_PATTERN.match(text)
+	if match:
+		return datetime(*[int(part or 0) for part in match.groups()])
+	raise ValueError(f"invalid date {value!r}")
+
+
+def header_name(name: str) -> str:
+	return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+def format_of_filename(filename: str | None) -> str | None:
+	"""Format by extension, None to detect it from the content"""
+	extension = (filename or "").rsplit(".", 1)[-1].lower()
+	return {"ofx": "ofx", "qfx": "ofx", "csv": "csv"}.get(extension)
+
+
+def detect_format(first_line: str) -> str:
+	text = first_line.lstrip("\ufeff").strip().upper()
+	return "ofx" if text.startswith(("OFXHEADER", "<?XML", "<OFX")) else "csv"
+
+
+def read_csv_statement(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+	"""(line, raw fields) of a CSV export, the delimiter is taken from the header line"""
+	lines = iter(lines)
+	skipped = 0
+	for header_line in lines:
+		skipped += 1
+		if header_line.strip():
+			break
+	else:
+		return
+	header_line = header_line.lstrip("\ufeff")
+	delimiter = max(",;\t|", key=header_line.count)
+	header = [header_name(name) for name in next(csv.reader([header_line], delimiter=delimiter))]
+	columns = {}
+	for field, aliases in CSV_COLUMNS.items():
+		index = next((header.index(alias) for alias in aliases if alias in header), None)
+		if index is not None:
+			columns[field] = index
+	if "date" not in columns or not {"amount", "debit", "credit"} & set(columns):
+		raise StatementFormatError("The CSV header needs a date column and an amount (or debit/credit) column")
+
+	reader = csv.reader(lines, delimiter=delimiter)
+	for values in reader:
+		if any(value.strip() for value in values):
+			yield skipped + reader.line_num, {field: values[index].strip() if index < len(values) else "" for field, index in columns.items()}
+
+
+def read_ofx_statement(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+	"""(line, raw fields) of each <STMTTRN> of an OFX 1 (SGML) or 2 (XML) file, read tag by tag"""
+	current, start = None, 0
+	for number, line in enumerate(lines, 1):
+		for closing, tag, value in OFX_TAG_PATTERN.findall(line):
+			tag = tag.upper()
+			if tag == "STMTTRN" and closing:
+				if current is not None:
+					names = list(dict.fromkeys(part for part in (current.get("NAME"), current.get("MEMO")) if part))
+					yield start, {"date": current.get("DTPOSTED", ""), "amount": current.get("TRNAMT", ""), "description": " - ".join(names)}
+				current = None
+			elif tag == "STMTTRN":
+				current, start = {}, number
+			elif current is not None and not closing and value.strip():
+				current[tag] = html.unescape(value.strip())
+
+
+def normalize_row(fields: dict, user_id: str, classifier: CategoryClassifier) -> CreateTransactionSchema:
+	"""CreateTransactionSchema of the raw fields, the category is the file's or the local classifier's prediction"""
+	date = parse_statement_date(fields.get("date", ""))
+	debit, credit = fields.get("debit"), fields.get("credit")
+	marker = None
+	if fields.get("amount"):
+		amount, marker = parse_statement_amount(fields["amount"])
+	elif debit and parse_statement_amount(debit)[0]:
+		amount = -abs(parse_statement_amount(debit)[0])
+	elif credit:
+		amount = abs(parse_statement_amount(credit)[0])
+	else:
+		raise ValueError("missing amount")
+	if round(abs(amount)) == 0:
+		raise ValueError("zero amount")
+	declared = (fields.get("type") or "").strip().lower()
+	if declared and declared not in TYPES:
+		raise ValueError(f"invalid type {fields['type']!r}")
+	# without a type column or DB/CR marker the sign decides, as in bank statements
+	type = TYPES.get(declared) or marker or ("expense" if amount < 0 else "income")
+	description = " ".join((fields.get("description") or "").split())[:MAX_DESCRIPTION_LENGTH] or None
+	category = classifier.canonical(fields.get("category")) or (classifier.predict(user_id, description) if description else None)
+	return CreateTransactionSchema(user_id=user_id, date=date, amount=round(abs(amount)), description=description, category=category, type=type)
+
+
+def import_statement(
+	lines: Iterable[str],
+	user_id: str,
+	format: str | None = None,
+	session_factory: Callable = SessionLocal,
+	classifier: CategoryClassifier | None = None,
+	chunk_rows: int = IMPORT_CHUNK_ROWS,
+) -> Iterator[ImportProgress]:
+	"""
+	Import a CSV or OFX statement of the user, yielding the progress after every chunk and once more when done.
+	Lines are read lazily and only one chunk is held in memory, the rows are committed together at the end.
+	"""
+	lines = iter(lines)
+	first_line = next(lines, "")
+	format = format or detect_format(first_line)
+	reader = read_ofx_statement if format == "ofx" else read_csv_statement
+	classifier = classifier or get_category_classifier()
+	progress = ImportProgress(format)
+
+	session = session_factory()
+	try:
+		if not classifier.is_loaded(user_id):
+			classifier.load(user_id, TransactionRepository(session).get_category_history(user_id, classifier.history_limit))
+		repository = TransactionImportRepository(session)
+		repository.begin()
+		chunk = []
+		for line, fields in reader(chain([first_line], lines)):
+			progress.rows_read += 1
+			try:
+				row = normalize_row(fields, user_id, classifier)
+			except ValueError as e:
+				progress.add_error(line, e)
+				continue
+			progress.classified += row.category is not None
+			chunk.append((line, row))
+			if len(chunk) >= chunk_rows:
+				repository.stage(chunk)
+				progress.rows_staged += len(chunk)
+				chunk = []
+				yield progress
+		repository.stage(chunk)
+		progress.rows_staged += len(chunk)
+		progress.imported = repository.finish(user_id)
+		progress.duplicates = progress.rows_staged - progress.imported
+		progress.done = True
+		yield progress
+	finally:
+		# nothing is committed before finish, closing rolls a failed or abandoned import back
+		session.close()
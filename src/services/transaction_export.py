@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator
+
+from src.agent.result_encoder import as_record
+from src.database.connection import SessionLocal
+from src.repositories.transaction_repository import TransactionRepository
+
+EXPORT_COLUMNS = ["id", "date", "amount", "description", "category", "type"]
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+# rows are written in pieces of about this size instead of one small write per row
+FLUSH_BYTES = 64 * 1024
+
+
+def export_value(value):
+	return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def export_record(row) -> list:
+	record = as_record(row)
+	return [export_value(record.get(column)) for column in EXPORT_COLUMNS]
+
+
+def encode_csv(rows: Iterable) -> Iterator[bytes]:
+	buffer = io.StringIO()
+	writer = csv.writer(buffer)
+	writer.writerow(EXPORT_COLUMNS)
+	for row in rows:
+		writer.writerow(export_record(row))
+		if buffer.tell() >= FLUSH_BYTES:
+			yield buffer.getvalue().encode()
+			buffer.seek(0)
+			buffer.truncate()
+	yield buffer.getvalue().encode()
+
+
+def encode_jsonl(rows: Iterable) -> Iterator[bytes]:
+	pieces, size = [], 0
+	for row in rows:
+		line = json.dumps(dict(zip(EXPORT_COLUMNS, export_record(row))), ensure_ascii=False) + "\n"
+		pieces.append(line)
+		size += len(line)
+		if size >= FLUSH_BYTES:
+			yield "".join(pieces).encode()
+			pieces, size = [], 0
+	if pieces:
+		yield "".join(pieces).encode()
+
+
+ENCODERS = {"csv": encode_csv, "jsonl": encode_jsonl}
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+	"""One gzip member compressed as the chunks arrive"""
+	compressor = zlib.compressobj(wbits=31)
+	for chunk in chunks:
+		compressed = compressor.compress(chunk)
+		if compressed:
+			yield compressed
+	yield compressor.flush()
+
+
+def export_transactions(
+	user_id: str,
+	format: str = "csv",
+	start_date: datetime | None = None,
+	end_date: datetime | None = None,
+	compress: bool = False,
+	session_factory: Callable = SessionLocal,
+) -> Iterator[bytes]:
+	"""
+	The user's transactions encoded as CSV or JSON Lines (optionally gzipped), produced while the rows are read
+	from the server-side cursor. The session is held until the last chunk is consumed or the consumer goes away.
+	"""
+	if format not in ENCODERS:
+		raise ValueError(f"Unsupported export format: {format}")
+	session = session_factory()
+	try:
+		chunks = ENCODERS[format](TransactionRepository(session).iter_export(user_id, start_date, end_date))
+		yield from gzip_chunks(chunks) if compress else chunks
+	finally:
+		session.close()
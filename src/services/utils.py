@@ -3,6 +3,7 @@ import hashlib
 import hmac
 import json
 import os
+import time
 
 
 def extract_json_from_string(string: str) -> dict:
@@ -31,9 +32,68 @@ def extract_json_from_string(string: str) -> dict:
 	return json.loads(json_str)
 
 
+def extract_json_list_from_string(string: str) -> list:
+	"""
+	Extracts a JSON array from a string. The JSON array is expected to be enclosed in square brackets.
+
+	Args:
+	    string (str): The input string containing the JSON array.
+
+	Returns:
+	    list: The extracted JSON array as a list.
+	"""
+	if not isinstance(string, str):
+		raise ValueError("Input must be a string")
+	if "[" not in string or "]" not in string:
+		raise ValueError("Input string does not contain a valid JSON array")
+
+	start = string.find("[")
+	end = string.rfind("]") + 1
+	try:
+		json_list = json.loads(string[start:end])
+	except json.JSONDecodeError:
+		# Python literals (single quotes, True/None) that some models write instead of JSON
+		json_list = ast.literal_eval(string[start:end])
+	if not isinstance(json_list, list):
+		raise ValueError("Extracted JSON is not a valid list")
+	return json.loads(json.dumps(json_list))
+
+
 def create_encrypted_user_id(user_id: str) -> str:
 	secret_key = os.getenv("SECRET_KEY")
 	if not secret_key:
 		raise RuntimeError("Set SECRET_KEY for encryption!")
 	digest = hmac.new(secret_key.encode(), user_id.encode(), digestmod=hashlib.sha256).hexdigest()
 	return digest
+
+
+class InvalidUserTokenError(ValueError):
+	pass
+
+
+def sign_user_token(payload: str) -> str:
+	secret_key = os.getenv("SECRET_KEY")
+	if not secret_key:
+		raise RuntimeError("Set SECRET_KEY for encryption!")
+	# a different message than the user id digest, a token signature can't be replayed as a user id or the other way
+	return hmac.new(secret_key.encode(), f"user-token:{payload}".encode(), digestmod=hashlib.sha256).hexdigest()
+
+
+def create_user_token(user_id: str, ttl_seconds: int) -> str:
+	"""Signed token `<user_id>.<expires>.<signature>` identifying the (encrypted) user id until it expires"""
+	payload = f"{user_id}.{int(time.time()) + ttl_seconds}"
+	return f"{payload}.{sign_user_token(payload)}"
+
+
+def verify_user_token(token: str) -> str:
+	"""The user id of a valid and unexpired token, raises InvalidUserTokenError otherwise"""
+	try:
+		user_id, expires, signature = token.split(".")
+		expires_at = int(expires)
+	except ValueError:
+		raise InvalidUserTokenError("Malformed token")
+	if not hmac.compare_digest(signature, sign_user_token(f"{user_id}.{expires}")):
+		raise InvalidUserTokenError("Invalid token signature")
+	if expires_at < time.time():
+		raise InvalidUserTokenError("Token expired")
+	return user_id
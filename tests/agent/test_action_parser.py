@@ -0,0 +1,69 @@
+import pytest
+
+from src.agent.action_parser import ActionStreamParser
+from src.agent.ai_agent import Agent
+from src.services.utils import extract_json_from_string
+from tests.mocks.mock_llm_service import MockLLMService
+
+
+def feed_in_chunks(parser: ActionStreamParser, text: str, size: int = 3) -> int:
+	"""Feed the text in chunks and return how many chars were consumed when the action completed"""
+	for i in range(0, len(text), size):
+		if parser.feed(text[i : i + size]):
+			return i + size
+	return -1
+
+
+def test_parser_completes_when_action_json_is_balanced():
+	parser = ActionStreamParser()
+	text = 'Thought: get the date\nAction: {"name": "generate_date", "args": {"expression": "kemarin", "timezone": "Asia/Jakarta"}}\n<STOP> trailing tokens'
+	consumed = feed_in_chunks(parser, text)
+	assert parser.is_complete()
+	assert consumed < len(text)
+	assert parser.response().endswith('"Asia/Jakarta"}}')
+	assert extract_json_from_string(parser.response())["name"] == "generate_date"
+
+
+def test_parser_ignores_braces_inside_strings():
+	parser = ActionStreamParser()
+	text = 'Action: {"name": "final_answer", "args": {"answer": "Gunakan format {tanggal} \\"}\\" ya"}} extra'
+	feed_in_chunks(parser, text, size=1)
+	assert parser.is_complete()
+	assert extract_json_from_string(parser.response())["args"]["answer"] == 'Gunakan format {tanggal} "}" ya'
+
+
+def test_parser_ignores_braces_before_action_marker():
+	parser = ActionStreamParser()
+	assert not parser.feed("Thought: the user sent {something} odd\n")
+	assert not parser.feed('Action: {"name": "get_list_category", "args": ')
+	assert parser.feed("{}}")
+	assert parser.response().startswith("Thought: the user sent {something} odd")
+
+
+def test_parser_incomplete_action():
+	parser = ActionStreamParser()
+	assert not parser.feed('Action: {"name": "find_transaction", "args": {"query": "total')
+	assert not parser.is_complete()
+	assert parser.response() == 'Action: {"name": "find_transaction", "args": {"query": "total'
+
+
+@pytest.mark.anyio
+async def test_agent_stops_stream_when_action_closes():
+	response = 'Thought: done\nAction: {"name": "final_answer", "args": {"answer": "Halo"}}\n<STOP>' + " ignored" * 50
+	llm = MockLLMService([response])
+	agent = Agent(llm)  # type: ignore
+	agent.streaming = True
+
+	result = await agent.run("halo")
+
+	assert result == "Halo"
+	assert llm.closed_streams == 1
+	assert llm.streamed_chunks < len(response) / llm.chunk_size
+
+
+def test_parser_completes_on_action_list():
+	parser = ActionStreamParser()
+	text = 'Thought: date and category\nAction: [{"name": "generate_date", "args": {"expression": "kemarin"}}, {"name": "get_list_category", "args": {}}]\n<STOP>'
+	feed_in_chunks(parser, text, size=5)
+	assert parser.is_complete()
+	assert parser.response().endswith('"args": {}}]')
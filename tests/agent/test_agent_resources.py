@@ -0,0 +1,57 @@
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.agent.agent_resources import AgentResources, run_in_session, use_resources
+from src.agent.category_classifier import CategoryClassifier
+from src.agent.tools.transaction_tools import DeleteTransactionTool
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema
+from src.repositories.async_transaction_repository import AsyncTransactionRepository
+
+
+@pytest.fixture
+async def session_factory():
+	engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+	async with engine.begin() as connection:
+		await connection.run_sync(TransactionModel.metadata.create_all, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	yield async_sessionmaker(bind=engine, expire_on_commit=False)
+	await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_tools_use_the_async_repository_of_the_run(session_factory):
+	resources = AgentResources(session_factory())
+	assert isinstance(resources.transaction_repository, AsyncTransactionRepository)
+	try:
+		with use_resources(resources):
+			kopi = CreateTransactionSchema(user_id="user-1", date=datetime(2026, 10, 1), amount=18000, description="kopi", category="Food", type="expense")
+			(transaction,) = await run_in_session(resources.transaction_repository.create, kopi)
+			result = await DeleteTransactionTool(classifier=CategoryClassifier()).run({"id": transaction.id, "user_id": "user-1"})
+			assert result.startswith(f"expense record successfully deleted with ID {transaction.id}")
+	finally:
+		await resources.close()
+
+	async with session_factory() as session:
+		assert (await session.scalars(select(TransactionModel))).all() == []
+		assert (await session.scalars(select(TransactionRollupModel.count))).all() == [0]
+
+
+@pytest.mark.anyio
+async def test_run_in_session_awaits_async_calls_and_moves_blocking_ones_off_the_loop():
+	loop_thread = threading.get_ident()
+
+	async def async_call(value):
+		return value, threading.get_ident()
+
+	def blocking_call(value):
+		return value, threading.get_ident()
+
+	assert await run_in_session(async_call, 1) == (1, loop_thread)
+	value, thread = await run_in_session(blocking_call, 2)
+	assert value == 2 and thread != loop_thread
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from src.agent.ai_agent import Agent
+from src.agent.tool_registry import ToolRegistry
+from src.core.interfaces.tool import Tool
+from tests.mocks.mock_llm_service import MockLLMService
+
+
+class WaitingTool(Tool):
+	"""Tool that only finishes when the other tool of the step has started, so it deadlocks if run sequentially"""
+
+	def __init__(self, name: str, started: asyncio.Event, other_started: asyncio.Event):
+		self.tool_name = name
+		self.started = started
+		self.other_started = other_started
+		self.calls = []
+
+	def name(self) -> str:
+		return self.tool_name
+
+	def description(self) -> str:
+		return f"Tool {self.tool_name}"
+
+	async def run(self, args):
+		self.calls.append(args)
+		self.started.set()
+		await asyncio.wait_for(self.other_started.wait(), timeout=1)
+		return f"{self.tool_name} result {args}"
+
+	def get_args_schema(self):
+		return None
+
+	def output_schema(self):
+		return "str"
+
+
+class FailingTool(WaitingTool):
+	async def run(self, args):
+		raise ValueError("boom")
+
+
+def create_agent(responses, tools):
+	agent = Agent(MockLLMService(responses), ToolRegistry(tools))  # type: ignore
+	agent.streaming = False
+	return agent
+
+
+@pytest.mark.anyio
+async def test_run_executes_independent_actions_concurrently():
+	date_started, category_started = asyncio.Event(), asyncio.Event()
+	agent = create_agent(
+		[
+			'Thought: date and category\nAction: [{"name": "generate_date", "args": {"expression": "kemarin"}}, {"name": "get_list_category", "args": {}}]',
+			'Thought: done\nAction: {"name": "final_answer", "args": {"answer": "Tercatat"}}',
+		],
+		[WaitingTool("generate_date", date_started, category_started), WaitingTool("get_list_category", category_started, date_started)],
+	)
+
+	result = await agent.run("makan 25rb kemarin")
+
+	assert result == "Tercatat"
+	observation = agent.messages[-2]["content"]
+	assert observation.startswith("Observation:\n[1] generate_date: generate_date result {'expression': 'kemarin'}")
+	assert "[2] get_list_category: get_list_category result {}" in observation
+
+
+@pytest.mark.anyio
+async def test_run_single_action_keeps_observation_format():
+	started = asyncio.Event()
+	started.set()
+	agent = create_agent(
+		[
+			'Thought: date\nAction: {"name": "generate_date", "args": {"expression": "today"}}',
+			'Action: {"name": "final_answer", "args": {"answer": "ok"}}',
+		],
+		[WaitingTool("generate_date", asyncio.Event(), started)],
+	)
+
+	assert await agent.run("today") == "ok"
+	assert agent.messages[-2]["content"] == "Observation: generate_date result {'expression': 'today'}"
+
+
+@pytest.mark.anyio
+async def test_run_reports_error_per_action():
+	started = asyncio.Event()
+	started.set()
+	agent = create_agent(
+		[
+			'Action: [{"name": "generate_date", "args": {}}, {"name": "broken", "args": {}}, {"name": "unknown", "args": {}}]',
+			'Action: {"name": "final_answer", "args": {"answer": "ok"}}',
+		],
+		[WaitingTool("generate_date", asyncio.Event(), started), FailingTool("broken", asyncio.Event(), started)],
+	)
+
+	assert await agent.run("test") == "ok"
+	observation = agent.messages[-2]["content"]
+	assert "[1] generate_date: generate_date result {}" in observation
+	assert "[2] broken: Error: boom" in observation
+	assert "[3] unknown: Tool unknown is not available" in observation
+
+
+def test_tool_registry_lookup_is_normalized():
+	started = asyncio.Event()
+	tool = WaitingTool("generate_date", started, started)
+	registry = ToolRegistry([tool])
+	assert registry.get("Generate_Date ") is tool
+	assert "GENERATE_DATE" in registry
+	assert registry.get("unknown") is None
+	with pytest.raises(TypeError):
+		registry.tools["other"] = tool  # type: ignore
+
+
+def test_tool_registry_rejects_duplicate_names():
+	started = asyncio.Event()
+	with pytest.raises(ValueError, match="Duplicate tool name"):
+		ToolRegistry([WaitingTool("generate_date", started, started), WaitingTool("Generate_Date", started, started)])
+
+
+@pytest.mark.anyio
+async def test_run_closes_request_resources():
+	closed = []
+
+	class Resources:
+		async def close(self):
+			closed.append(True)
+
+	agent = Agent(MockLLMService(['Action: {"name": "final_answer", "args": {"answer": "ok"}}']), ToolRegistry([]), resources_factory=Resources)  # type: ignore
+	agent.streaming = False
+	assert await agent.run("halo") == "ok"
+	assert closed == [True]
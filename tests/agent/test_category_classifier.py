@@ -0,0 +1,75 @@
+import pytest
+
+from src.agent.category_classifier import CategoryClassifier
+from tests.mocks.mock_transaction_repository import MockTransactionRepository
+from src.core.schemas.transaction_schema import CreateTransactionSchema
+
+
+@pytest.fixture
+def classifier():
+	return CategoryClassifier(min_confidence=0.8)
+
+
+@pytest.mark.parametrize(
+	"description, category",
+	[
+		("kopi", "Food"),
+		("bensin motor", "Transportation"),
+		("token listrik", "Housing"),
+		("potong rambut", "Personal Care"),
+		("gaji", "Salary"),
+	],
+)
+def test_keyword_rules_bootstrap(classifier, description, category):
+	assert classifier.predict("user-1", description) == category
+
+
+def test_unknown_or_conflicting_descriptions_are_not_predicted(classifier):
+	assert classifier.predict("user-1", "sesuatu") is None
+	# Food and Shopping keywords
+	assert classifier.predict("user-1", "makan indomaret") is None
+	assert classifier.classify("user-1", "makan indomaret")[1] == 0.5
+
+
+def test_user_history_teaches_unknown_merchant(classifier):
+	classifier.load("user-1", [("mixue", "Food"), ("mixue es krim", "Food")])
+
+	assert classifier.predict("user-1", "mixue") == "Food"
+	assert classifier.predict("user-1", "es krim mixue") == "Food"
+	# other users keep the keyword rules only
+	assert classifier.predict("user-2", "mixue") is None
+
+
+def test_correction_overrides_history(classifier):
+	classifier.load("user-1", [("netflix", "Entertainment"), ("netflix", "Entertainment")])
+	classifier.learn("user-1", "Netflix", "Housing", weight=3)
+
+	assert classifier.predict("user-1", "netflix") == "Housing"
+
+
+def test_learn_ignores_unloaded_users_and_unknown_categories(classifier):
+	classifier.learn("user-1", "mixue", "Food")
+	assert not classifier.is_loaded("user-1")
+
+	classifier.load("user-1", [("rapat", "Work")])
+	assert classifier.predict("user-1", "rapat") is None
+
+
+@pytest.mark.anyio
+async def test_ensure_user_loads_history_once(classifier):
+	repository = MockTransactionRepository()
+	repository.create([CreateTransactionSchema(user_id="user-1", date="2025-06-10", amount=25_000, description="mixue", category="Food", type="expense")])
+
+	await classifier.ensure_user("user-1", repository)
+	repository.clear()
+	await classifier.ensure_user("user-1", repository)
+
+	assert classifier.predict("user-1", "mixue") == "Food"
+
+
+def test_least_recently_used_users_are_evicted():
+	classifier = CategoryClassifier(max_users=2)
+	for user_id in ["user-1", "user-2", "user-3"]:
+		classifier.load(user_id, [])
+
+	assert list(classifier.users) == ["user-2", "user-3"]
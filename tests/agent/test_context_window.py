@@ -0,0 +1,80 @@
+import pytest
+
+from src.agent.ai_agent import Agent
+from src.agent.context_window import ContextBudgetExceeded, ContextWindow, count_message_tokens, estimate_tokens
+from src.agent.tool_registry import ToolRegistry
+from tests.mocks.mock_llm_service import MockLLMService
+
+
+def conversation(steps: int, observation_size: int = 400):
+	messages = [{"role": "system", "content": "system prompt"}, {"role": "user", "content": "task"}]
+	for step in range(steps):
+		messages.append({"role": "assistant", "content": f'Action: {{"name": "find_transaction", "args": {{"step": {step}}}}}'})
+		messages.append({"role": "user", "content": f"Observation: {step} " + "x" * observation_size})
+	return messages
+
+
+def test_estimate_tokens():
+	assert estimate_tokens("") == 0
+	assert estimate_tokens("abcd") == 1
+	assert estimate_tokens("abcde") == 2
+
+
+def test_fit_keeps_small_conversation_untouched():
+	messages = conversation(2, observation_size=10)
+	assert ContextWindow(max_prompt_tokens=10_000).fit(messages) == messages
+
+
+def test_fit_elides_old_observations_and_keeps_latest_steps():
+	messages = conversation(5)
+	window = ContextWindow(max_prompt_tokens=10_000, keep_last_messages=2, elided_observation_tokens=10)
+	fitted = window.fit(messages)
+
+	assert fitted[0] == messages[0]
+	assert fitted[1] == messages[1]
+	assert fitted[-2:] == messages[-2:]
+	old_observations = [message["content"] for message in fitted[2:-2] if message["content"].startswith("Observation")]
+	assert len(old_observations) == 4
+	assert all("[elided" in content and len(content) < 100 for content in old_observations)
+	assert window.count(fitted) < count_message_tokens(messages)
+
+
+def test_fit_truncates_large_latest_observation():
+	messages = conversation(1, observation_size=10_000)
+	fitted = ContextWindow(max_prompt_tokens=10_000, max_observation_tokens=100).fit(messages)
+	assert "[truncated" in fitted[-1]["content"]
+	assert estimate_tokens(fitted[-1]["content"]) < 120
+
+
+def test_fit_drops_oldest_steps_when_over_budget():
+	messages = conversation(10, observation_size=40)
+	window = ContextWindow(max_prompt_tokens=120, keep_last_messages=2, elided_observation_tokens=5)
+	fitted = window.fit(messages)
+
+	assert window.count(fitted) <= 120
+	assert fitted[0] == messages[0]
+	assert "earlier messages were omitted" in fitted[1]["content"]
+	assert fitted[-2:] == messages[-2:]
+	roles = [message["role"] for message in fitted[1:]]
+	assert all(first != second for first, second in zip(roles, roles[1:]))
+
+
+def test_fit_raises_when_latest_steps_exceed_budget():
+	messages = conversation(1, observation_size=2_000)
+	with pytest.raises(ContextBudgetExceeded):
+		ContextWindow(max_prompt_tokens=100, max_observation_tokens=1_000).fit(messages)
+
+
+@pytest.mark.anyio
+async def test_agent_records_prompt_tokens_and_stops_before_limit():
+	llm = MockLLMService(['Action: {"name": "find_transaction", "args": {}}'] * 3)
+	agent = Agent(llm, ToolRegistry([]))  # type: ignore
+	agent.streaming = False
+	agent.context_window = ContextWindow(max_prompt_tokens=60)
+	agent.messages.append({"role": "system", "content": "s" * 100})
+
+	result = await agent.run("task")
+
+	assert result.startswith("Maaf")
+	assert len(agent.prompt_tokens) >= 1
+	assert all(tokens <= 60 for tokens in agent.prompt_tokens)
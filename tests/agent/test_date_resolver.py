@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from zoneinfo import ZoneInfo
+
+from src.agent.date_resolver import DateResolver, resolve_local
+
+# Tuesday
+NOW = datetime(2025, 6, 10, 14, 30, tzinfo=ZoneInfo("Asia/Jakarta"))
+
+
+@pytest.fixture
+def resolver():
+	return DateResolver("Asia/Jakarta")
+
+
+@pytest.mark.parametrize(
+	"expression, expected",
+	[
+		("hari ini", "2025-06-10T00:00:00+07:00"),
+		("Tadi pagi", "2025-06-10T00:00:00+07:00"),
+		("kemarin", "2025-06-09T00:00:00+07:00"),
+		("yesterday", "2025-06-09T00:00:00+07:00"),
+		("kemarin lusa", "2025-06-08T00:00:00+07:00"),
+		("besok", "2025-06-11T00:00:00+07:00"),
+		("2 minggu lalu", "2025-05-27T00:00:00+07:00"),
+		("seminggu yg lalu", "2025-06-03T00:00:00+07:00"),
+		("3 days ago", "2025-06-07T00:00:00+07:00"),
+		("sebulan lalu", "2025-05-10T00:00:00+07:00"),
+		("3 hari lagi", "2025-06-13T00:00:00+07:00"),
+		("last friday", "2025-06-06T00:00:00+07:00"),
+		("jumat lalu", "2025-06-06T00:00:00+07:00"),
+		("hari minggu", "2025-06-08T00:00:00+07:00"),
+		("selasa lalu", "2025-06-03T00:00:00+07:00"),
+		("jumat", "2025-06-06T00:00:00+07:00"),
+		("jumat ini", "2025-06-13T00:00:00+07:00"),
+		("hari jumat ini", "2025-06-13T00:00:00+07:00"),
+		("this friday", "2025-06-13T00:00:00+07:00"),
+		("selasa ini", "2025-06-10T00:00:00+07:00"),
+		("this monday", "2025-06-09T00:00:00+07:00"),
+		("hari minggu ini", "2025-06-15T00:00:00+07:00"),
+		("next monday", "2025-06-16T00:00:00+07:00"),
+		("10 juni 2025", "2025-06-10T00:00:00+07:00"),
+		("5 mei", "2025-05-05T00:00:00+07:00"),
+		("june 1st, 2025", "2025-06-01T00:00:00+07:00"),
+		("01/06/2025", "2025-06-01T00:00:00+07:00"),
+		("2025-06-01", "2025-06-01T00:00:00+07:00"),
+		("tanggal 5", "2025-06-05T00:00:00+07:00"),
+		("hari ini jam 3 sore", "2025-06-10T15:00:00+07:00"),
+		("kemarin jam 7 malam", "2025-06-09T19:00:00+07:00"),
+		("jam 1 siang", "2025-06-10T13:00:00+07:00"),
+		("pukul 14.30", "2025-06-10T14:30:00+07:00"),
+		("yesterday 3pm", "2025-06-09T15:00:00+07:00"),
+	],
+)
+def test_resolve_expressions(resolver, expression, expected):
+	assert resolver.resolve(expression, "Asia/Jakarta", NOW).isoformat() == expected
+
+
+@pytest.mark.parametrize("expression", ["minggu lalu", "bulan lalu", "awal bulan", "31/02", "jam 25", "kapan-kapan", ""])
+def test_unparseable_expressions_return_none(resolver, expression):
+	assert resolver.resolve(expression, "Asia/Jakarta", NOW) is None
+
+
+def test_resolve_uses_local_day_of_timezone(resolver):
+	# 2025-06-10 20:00 UTC is already 2025-06-11 in Jakarta
+	now = datetime(2025, 6, 10, 20, 0, tzinfo=ZoneInfo("UTC"))
+
+	assert resolver.resolve("kemarin", "Asia/Jakarta", now).isoformat() == "2025-06-10T00:00:00+07:00"
+	assert resolver.resolve("kemarin", "UTC", now).isoformat() == "2025-06-09T00:00:00+00:00"
+
+
+def test_invalid_timezone_uses_default(resolver):
+	assert resolver.resolve("hari ini", "Mars/Base", NOW).isoformat() == "2025-06-10T00:00:00+07:00"
+
+
+def test_resolve_is_memoized_per_expression_and_day(resolver):
+	resolve_local.cache_clear()
+	resolver.resolve("kemarin", "Asia/Jakarta", NOW)
+	resolver.resolve(" Kemarin ", "Asia/Jakarta", NOW.replace(hour=20))
+
+	assert resolve_local.cache_info().hits == 1
@@ -0,0 +1,144 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.agent.category_classifier import CategoryClassifier
+from src.agent.fast_path import FastPathHandler, QuickTransactionParser, format_rupiah
+from src.agent.tools.transaction_tools import CreateTransactionTool
+from src.core.models.message_model import MessageModel
+from tests.mocks.mock_transaction_repository import MockTransactionRepository
+
+NOW = datetime(2025, 6, 10, 14, 30, tzinfo=ZoneInfo("Asia/Jakarta"))
+
+
+@pytest.fixture
+def parser():
+	return QuickTransactionParser("Asia/Jakarta")
+
+
+@pytest.mark.parametrize(
+	"text, amount, description, category, type",
+	[
+		("kopi 18rb", 18_000, "kopi", "Food", "expense"),
+		("Kopi 18 rb", 18_000, "kopi", "Food", "expense"),
+		("bensin 50.000", 50_000, "bensin", "Transportation", "expense"),
+		("beli bensin rp 50.000,-", 50_000, "bensin", "Transportation", "expense"),
+		("gaji 8jt", 8_000_000, "gaji", "Salary", "income"),
+		("nonton 1,5k", 1_500, "nonton", "Entertainment", "expense"),
+		("token listrik 200k", 200_000, "token listrik", "Housing", "expense"),
+		("parkir 5000", 5_000, "parkir", "Transportation", "expense"),
+		("rp25rb makan siang", 25_000, "makan siang", "Food", "expense"),
+	],
+)
+def test_parse_simple_messages(parser, text, amount, description, category, type):
+	parsed = parser.parse("user123", text, NOW)
+	assert parsed is not None
+	assert parsed.amount == amount
+	assert parsed.description == description
+	assert parsed.category == category
+	assert parsed.type == type
+	assert parsed.date.isoformat() == "2025-06-10T00:00:00+07:00"
+
+
+@pytest.mark.parametrize(
+	"text, date",
+	[
+		("bensin 50.000 kemarin", "2025-06-09T00:00:00+07:00"),
+		("kemarin lusa makan 20rb", "2025-06-08T00:00:00+07:00"),
+		("tadi pagi kopi 18rb", "2025-06-10T00:00:00+07:00"),
+		("makan 20rb 2 hari lalu", "2025-06-08T00:00:00+07:00"),
+		("bensin 50rb jumat lalu", "2025-06-06T00:00:00+07:00"),
+		("kopi 18rb 5 juni", "2025-06-05T00:00:00+07:00"),
+	],
+)
+def test_parse_relative_dates(parser, text, date):
+	parsed = parser.parse("user123", text, NOW)
+	assert parsed is not None
+	assert parsed.date.isoformat() == date
+
+
+@pytest.mark.parametrize(
+	"text",
+	[
+		"berapa total pengeluaran bulan ini?",
+		"hapus transaksi kopi 18rb",
+		"kopi 18rb dan roti 10rb",
+		"kopi 18rb minggu lalu",
+		"kopi 18rb besok",
+		"sesuatu 18rb",
+		"makan di indomaret 50rb",
+		"bayar gaji art 2jt",
+		"kopi",
+		"halo",
+	],
+)
+def test_parse_ambiguous_messages_fall_back(parser, text):
+	assert parser.parse("user123", text, NOW) is None
+
+
+def test_plain_small_number_has_low_confidence(parser):
+	parsed = parser.parse("user123", "kopi 18", NOW)
+	assert parsed is not None
+	assert parsed.confidence < 0.9
+	assert FastPathHandler(parser).parse(MessageModel("user123", "62811", "Budi", "text", "kopi 18"), NOW) is None
+
+
+def test_format_rupiah():
+	assert format_rupiah(18_000) == "Rp18.000"
+	assert format_rupiah(8_000_000) == "Rp8.000.000"
+	assert format_rupiah(1_500.5) == "Rp1.500,50"
+
+
+@pytest.mark.anyio
+async def test_handle_creates_transaction_and_replies():
+	repository = MockTransactionRepository()
+	handler = FastPathHandler(QuickTransactionParser("Asia/Jakarta"))
+	message = MessageModel("user123", "62811", "Budi", "text", "bensin 50.000 kemarin")
+
+	reply = await handler.handle(message, CreateTransactionTool(repository=repository), NOW)
+
+	assert reply == "Berhasil mencatat pengeluaran Rp50.000 untuk bensin (kategori Transportation) pada 9 Juni 2025."
+	created = repository.get_all()[0]
+	assert created.user_id == "user123"
+	assert created.amount == 50_000
+	assert created.category == "Transportation"
+	assert created.type == "expense"
+
+
+@pytest.mark.anyio
+async def test_handle_skips_non_text_messages():
+	handler = FastPathHandler(QuickTransactionParser("Asia/Jakarta"))
+	message = MessageModel("user123", "62811", "Budi", "image", "kopi 18rb", image_file_path="/tmp/receipt.jpg")
+	assert await handler.handle(message, CreateTransactionTool(repository=MockTransactionRepository()), NOW) is None
+
+
+class FailingTransactionRepository(MockTransactionRepository):
+	def __init__(self):
+		super().__init__()
+		self.history_loads = 0
+
+	def get_category_history(self, user_id, limit=500):
+		self.history_loads += 1
+		return super().get_category_history(user_id, limit)
+
+	def create(self, data):
+		raise RuntimeError("database is down")
+
+
+@pytest.mark.anyio
+async def test_handle_falls_back_to_the_agent_when_the_tool_fails():
+	handler = FastPathHandler(QuickTransactionParser("Asia/Jakarta", classifier=CategoryClassifier()))
+	message = MessageModel("user123", "62811", "Budi", "text", "kopi 18rb")
+
+	assert await handler.handle(message, CreateTransactionTool(repository=FailingTransactionRepository()), NOW) is None
+
+
+@pytest.mark.anyio
+async def test_handle_reads_the_history_only_for_parsed_messages():
+	repository = FailingTransactionRepository()
+	handler = FastPathHandler(QuickTransactionParser("Asia/Jakarta", classifier=CategoryClassifier()))
+	message = MessageModel("user123", "62811", "Budi", "text", "berapa total pengeluaran bulan ini?")
+
+	assert await handler.handle(message, CreateTransactionTool(repository=repository), NOW) is None
+	assert repository.history_loads == 0
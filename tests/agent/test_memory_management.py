@@ -0,0 +1,215 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.agent.agent_resources import AgentResources, use_resources
+from src.agent.memory_management import NO_MEMORY, MemoryManagement
+from src.core.models.memory_message_model import MemoryMessageModel
+from src.core.models.memory_summary_model import MemorySummaryModel
+from src.database.async_connection import async_database_url
+from src.services.memory_write_buffer import MemoryWriteBuffer
+from tests.mocks.mock_llm_service import MockLLMService
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+	# a database file, the memory code uses it through aiosqlite and the assertions read it back synchronously
+	engine = create_engine(f"sqlite:///{tmp_path / 'memory.db'}")
+	MemoryMessageModel.metadata.create_all(engine, tables=[MemoryMessageModel.__table__, MemorySummaryModel.__table__])
+	return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+async def async_session_factory(session_factory):
+	engine = create_async_engine(async_database_url(str(session_factory.kw["bind"].url)))
+	yield async_sessionmaker(bind=engine, expire_on_commit=False)
+	await engine.dispose()
+
+
+@pytest.fixture
+async def resources(async_session_factory):
+	resources = AgentResources(async_session_factory())
+	yield resources
+	await resources.close()
+
+
+def create_memory(async_session_factory, responses, min_messages=2, batch_size=50):
+	memory = MemoryManagement(
+		MockLLMService(responses),  # type: ignore
+		resources_factory=lambda: AgentResources(async_session_factory()),
+		write_buffer=MemoryWriteBuffer(async_session_factory, batch_size=100, flush_interval=60),
+	)
+	memory.min_messages = min_messages
+	memory.batch_size = batch_size
+	return memory
+
+
+async def add_messages(memory, user_id, *messages):
+	for index, message in enumerate(messages):
+		await memory.add_memory(user_id, "user" if index % 2 == 0 else "assistant", message)
+
+
+@pytest.mark.anyio
+async def test_get_summary_without_summary(async_session_factory, resources):
+	memory = create_memory(async_session_factory, [])
+	memory._summary_repo = resources.memory_summary_repository
+
+	assert await memory.get_summary("user-1") == NO_MEMORY
+
+
+async def summarize(memory, async_session_factory, user_id):
+	resources = AgentResources(async_session_factory())
+	try:
+		with use_resources(resources):
+			return await memory.summarize_memory(user_id)
+	finally:
+		await resources.close()
+
+
+def folded_ids(session_factory) -> list[int]:
+	return [row.id for row in session_factory().query(MemoryMessageModel).filter(MemoryMessageModel.folded_at.isnot(None)).order_by(MemoryMessageModel.id)]
+
+
+@pytest.mark.anyio
+async def test_summary_folds_only_messages_not_folded_yet(session_factory, async_session_factory):
+	memory = create_memory(async_session_factory, ["summary one", "summary two"])
+	await add_messages(memory, "user-1", "kopi 18rb", "Berhasil mencatat kopi")
+
+	await memory.schedule_summary("user-1")
+	await add_messages(memory, "user-1", "total bulan ini?", "Total Rp18.000")
+	await memory.schedule_summary("user-1")
+
+	first_prompt, second_prompt = [call[0]["content"] for call in memory.llm_service.calls]
+	assert "kopi 18rb" in first_prompt
+	assert "kopi 18rb" not in second_prompt
+	assert "summary one" in second_prompt and "total bulan ini?" in second_prompt
+
+	session = session_factory()
+	stored = session.get(MemorySummaryModel, "user-1")
+	assert stored.summary == "summary two"
+	assert folded_ids(session_factory) == [1, 2, 3, 4]
+
+
+@pytest.mark.anyio
+async def test_summary_folds_rows_committed_late_with_a_lower_id(session_factory, async_session_factory):
+	memory = create_memory(async_session_factory, ["summary one", "summary two"])
+	session = session_factory()
+	# id 3 is taken by a transaction that commits after the first fold
+	session.add_all([MemoryMessageModel(id=id, user_id="user-1", role="user", message=f"message {id}") for id in (1, 2, 4)])
+	session.commit()
+	await summarize(memory, async_session_factory, "user-1")
+	session.add_all([MemoryMessageModel(id=id, user_id="user-1", role="user", message=f"message {id}") for id in (3, 5)])
+	session.commit()
+	await summarize(memory, async_session_factory, "user-1")
+
+	second_prompt = memory.llm_service.calls[1][0]["content"]
+	assert "message 3" in second_prompt and "message 5" in second_prompt and "message 4" not in second_prompt
+	assert folded_ids(session_factory) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.anyio
+async def test_summary_is_not_saved_when_another_fold_took_the_messages(session_factory, resources):
+	session = session_factory()
+	session.add_all([MemoryMessageModel(user_id="user-1", role="user", message=message) for message in ("a", "b")])
+	session.commit()
+	repository = resources.memory_summary_repository
+
+	assert await repository.save("user-1", "first", [1, 2]) is not None
+	assert await repository.save("user-1", "second", [1, 2]) is None
+	assert session_factory().get(MemorySummaryModel, "user-1").summary == "first"
+
+
+@pytest.mark.anyio
+async def test_summary_waits_for_enough_new_messages(async_session_factory):
+	memory = create_memory(async_session_factory, ["summary"])
+	await add_messages(memory, "user-1", "halo")
+
+	await memory.schedule_summary("user-1")
+
+	assert memory.llm_service.calls == []
+
+
+@pytest.mark.anyio
+async def test_summary_folds_large_backlog_in_batches(session_factory, async_session_factory):
+	memory = create_memory(async_session_factory, ["first", "second"], batch_size=4)
+	await add_messages(memory, "user-1", *[f"message {index}" for index in range(6)])
+
+	await memory.schedule_summary("user-1")
+
+	assert len(memory.llm_service.calls) == 2
+	assert folded_ids(session_factory) == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.anyio
+async def test_summaries_of_same_user_run_one_after_another(async_session_factory):
+	memory = create_memory(async_session_factory, ["first", "second"])
+	await add_messages(memory, "user-1", "a", "b")
+
+	first = memory.schedule_summary("user-1")
+	second = memory.schedule_summary("user-1")
+	await second
+
+	assert first.done()
+	assert len(memory.llm_service.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_get_memory_from_user_sees_unflushed_messages(async_session_factory, resources):
+	memory = create_memory(async_session_factory, [])
+	await add_messages(memory, "user-1", "kopi 18rb", "Berhasil mencatat kopi")
+	await memory.write_buffer.flush()
+	await add_messages(memory, "user-1", "bensin 50rb")
+	memory._memory_repo = resources.memory_repository
+
+	messages = await memory.get_memory_from_user("user-1", limit=2)
+
+	assert [message["message"] for message in messages] == ["bensin 50rb", "Berhasil mencatat kopi"]
+	await memory.write_buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_get_memory_from_user_skips_pending_rows_already_written(async_session_factory, resources):
+	memory = create_memory(async_session_factory, [])
+	await add_messages(memory, "user-1", "kopi 18rb", "Berhasil mencatat kopi")
+	# the batch is committed but not yet removed from the buffer, as while a flush is in progress
+	await memory.write_buffer.write(memory.write_buffer.pending_for("user-1"))
+	memory._memory_repo = resources.memory_repository
+
+	messages = await memory.get_memory_from_user("user-1")
+
+	assert [message["message"] for message in messages] == ["Berhasil mencatat kopi", "kopi 18rb"]
+	memory.write_buffer.pending.clear()
+	await memory.write_buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_get_memory_from_user_keeps_identical_messages_of_the_same_second(async_session_factory, resources):
+	memory = create_memory(async_session_factory, [])
+	await add_messages(memory, "user-1", "ok")
+	await add_messages(memory, "user-1", "ok")
+	first, second = memory.write_buffer.pending_for("user-1")
+	# a backend storing whole seconds, both messages have the same created_at
+	second["created_at"] = first["created_at"] = first["created_at"].replace(microsecond=0)
+	await memory.write_buffer.write([first])
+	memory._memory_repo = resources.memory_repository
+
+	messages = await memory.get_memory_from_user("user-1")
+
+	assert [message["message"] for message in messages] == ["ok", "ok"]
+	memory.write_buffer.pending.clear()
+	await memory.write_buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_summary_is_due_only_after_a_batch_of_messages(async_session_factory):
+	memory = create_memory(async_session_factory, ["summary"], min_messages=4)
+	await add_messages(memory, "user-2", "kopi 18rb", "Berhasil mencatat kopi")
+	assert not memory.summary_due("user-2")
+
+	await add_messages(memory, "user-2", "bensin 50rb", "Berhasil mencatat bensin")
+	assert memory.summary_due("user-2")
+
+	await memory.schedule_summary("user-2")
+	assert not memory.summary_due("user-2")
+	assert len(memory.llm_service.calls) == 1
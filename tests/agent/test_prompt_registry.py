@@ -0,0 +1,53 @@
+import pytest
+
+from src.agent.prompt_registry import PROMPT_PATH, PromptRegistry
+from src.agent.tools.category_tools import GetListCategoryTool
+from src.agent.tools.common_tools import GetDateTool
+
+
+@pytest.fixture
+def registry():
+	return PromptRegistry(PROMPT_PATH)
+
+
+@pytest.fixture
+def tools():
+	return [GetDateTool(), GetListCategoryTool()]
+
+
+def test_compile_renders_tools_description(registry, tools):
+	compiled = registry.get(tools, version="v4")
+	assert "generate_date: Convert a natural-language date/time expression" in compiled.prefix
+	assert "{{" not in compiled.prefix
+
+
+def test_static_tool_results_are_injected_instead_of_described(registry, tools):
+	compiled = registry.get(tools, version="v6")
+	assert "get_list_category: Get list of category" not in compiled.prefix
+	assert "get_list_category: Housing,Clothing,Personal Care" in compiled.prefix
+
+
+def test_compiled_prompt_is_cached(registry, tools):
+	assert registry.get(tools, version="v4") is registry.get(tools, version="v4")
+	assert registry.get(tools, version="v4") is not registry.get(tools, version="v3")
+
+
+def test_static_prefix_is_identical_between_users(registry, tools):
+	compiled = registry.get(tools, version="v4")
+	first = compiled.render(user_memory="User asked to record lunch 25k")
+	second = compiled.render(user_memory="User asked for monthly report")
+	assert first.startswith(compiled.prefix)
+	assert second.startswith(compiled.prefix)
+	assert first.endswith("User asked to record lunch 25k")
+	assert second.endswith("User asked for monthly report")
+
+
+def test_render_without_memory_returns_prefix(registry, tools):
+	compiled = registry.get(tools, version="v4")
+	assert compiled.render(None) == compiled.prefix
+	assert compiled.render("") == compiled.prefix
+
+
+def test_unknown_version_raises(registry, tools):
+	with pytest.raises(ValueError, match="Unknown prompt version"):
+		registry.get(tools, version="v99")
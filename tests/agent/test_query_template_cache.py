@@ -0,0 +1,187 @@
+import time
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.agent.query_template_cache import QueryTemplateCache, normalize_query
+from src.agent.tools.transaction_tools import FindTransactionTool
+from src.core.models.query_template_model import QueryTemplateModel
+from tests.mocks.mock_transaction_repository import MockTransactionRepository
+
+TODAY = date(2026, 10, 18)
+TEMPLATE = "SELECT SUM(amount) FROM transaction WHERE user_id = :user_id AND date >= :date_0 AND amount > :num_0"
+
+
+@pytest.fixture
+def session_factory():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	QueryTemplateModel.metadata.create_all(engine, tables=[QueryTemplateModel.__table__])
+	return sessionmaker(bind=engine)
+
+
+@pytest.mark.parametrize(
+	"query, expected_key, expected_params",
+	[
+		("Total pengeluaran bulan ini?", "total pengeluaran bulan ini", {}),
+		("pengeluaran di atas 50rb sejak 1 Juni 2025", "pengeluaran di atas :num_0 sejak :date_0", {"num_0": 50000, "date_0": date(2025, 6, 1)}),
+		("pengeluaran di atas 50.000 sejak 2025-06-01", "pengeluaran di atas :num_0 sejak :date_0", {"num_0": 50000, "date_0": date(2025, 6, 1)}),
+		("transaksi 10/6/25 sampai 12 juni", "transaksi :date_0 sampai :date_1", {"date_0": date(2025, 6, 10), "date_1": date(2026, 6, 12)}),
+	],
+)
+def test_normalize_query(query, expected_key, expected_params):
+	assert normalize_query(query, TODAY) == (expected_key, expected_params)
+
+
+def test_normalize_query_binds_every_number():
+	key, params = normalize_query("5 transaksi terakhir lebih dari 1,5 jt", TODAY)
+
+	assert key == ":num_0 transaksi terakhir lebih dari :num_1"
+	assert params == {"num_0": 5, "num_1": 1500000}
+
+
+def test_same_shape_shares_the_key():
+	assert normalize_query("pengeluaran sejak 1 juni 2025", TODAY)[0] == normalize_query("Pengeluaran  sejak 2024-01-15", TODAY)[0]
+
+
+def test_templates_are_persisted_with_hit_counters(session_factory):
+	cache = QueryTemplateCache(session_factory)
+	assert cache.get("pengeluaran sejak :date_0") is None
+	cache.store("pengeluaran sejak :date_0", TEMPLATE)
+
+	other_worker = QueryTemplateCache(session_factory)
+	assert other_worker.get("pengeluaran sejak :date_0") == TEMPLATE
+	assert other_worker.get("pengeluaran sejak :date_0") == TEMPLATE
+
+	assert (cache.hits, cache.misses) == (0, 1)
+	assert other_worker.stats() == {"hits": 2, "misses": 0, "entries": 1}
+	# hits are counted in memory, not written on the request path
+	assert session_factory().get(QueryTemplateModel, "pengeluaran sejak :date_0").hits == 0
+
+	other_worker.flush_hits()
+	assert session_factory().get(QueryTemplateModel, "pengeluaran sejak :date_0").hits == 2
+	assert other_worker.pending_hits == {}
+
+
+def test_hit_counters_are_flushed_in_the_background_after_the_interval(session_factory):
+	cache = QueryTemplateCache(session_factory, hit_flush_interval=0)
+	cache.store("pengeluaran sejak :date_0", TEMPLATE)
+
+	assert cache.get("pengeluaran sejak :date_0") == TEMPLATE
+	for _ in range(100):
+		if session_factory().get(QueryTemplateModel, "pengeluaran sejak :date_0").hits == 1:
+			break
+		time.sleep(0.01)
+
+	assert session_factory().get(QueryTemplateModel, "pengeluaran sejak :date_0").hits == 1
+
+
+def test_only_fully_parameterized_templates_are_reusable(session_factory):
+	cache = QueryTemplateCache(session_factory)
+	params = {"user_id": "user-1", "date_0": date(2025, 6, 1), "num_0": 50000}
+
+	assert cache.is_reusable("key", TEMPLATE, params)
+	assert not cache.is_reusable("key", TEMPLATE.replace(":user_id", "'user-1'"), params)
+	assert not cache.is_reusable("key", TEMPLATE.replace(":num_0", "50000"), params)
+	assert not cache.is_reusable("key", TEMPLATE + "; DELETE FROM transaction", params)
+	assert cache.is_reusable("key", TEMPLATE.replace("date >=", "date::date >="), params)
+
+
+@pytest.mark.parametrize(
+	"sql",
+	[
+		TEMPLATE + " AND date < '2025-07-01'",
+		TEMPLATE + " AND category = 'Food'",
+		TEMPLATE + " AND description ILIKE '%kopi%'",
+		TEMPLATE + " AND amount < 50000",
+		TEMPLATE + " AND date >= CURRENT_DATE - INTERVAL '50000 days'",
+	],
+)
+def test_templates_with_values_of_the_question_are_not_reusable(session_factory, sql):
+	params = {"user_id": "user-1", "date_0": date(2025, 6, 1), "num_0": 50000}
+
+	assert not QueryTemplateCache(session_factory).is_reusable("key", sql, params)
+
+
+def test_templates_may_keep_structural_literals(session_factory):
+	params = {"user_id": "user-1"}
+	sql = (
+		"SELECT TO_CHAR(date, 'YYYY-MM'), strftime('%Y-%m', date), SUM(amount) FROM transaction WHERE user_id = :user_id "
+		"AND type = 'expense' AND date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '1 month' GROUP BY 1, 2 LIMIT 10"
+	)
+
+	assert QueryTemplateCache(session_factory).is_reusable("key", sql, params)
+
+
+def test_forgotten_templates_leave_every_worker(session_factory):
+	cache = QueryTemplateCache(session_factory)
+	other_worker = QueryTemplateCache(session_factory, memory_ttl=0)
+	cache.store("pengeluaran sejak :date_0", TEMPLATE)
+	assert other_worker.get("pengeluaran sejak :date_0") == TEMPLATE
+
+	cache.forget("pengeluaran sejak :date_0")
+
+	assert cache.get("pengeluaran sejak :date_0") is None
+	assert other_worker.get("pengeluaran sejak :date_0") is None
+	assert session_factory().get(QueryTemplateModel, "pengeluaran sejak :date_0") is None
+
+
+def test_unused_templates_expire(session_factory):
+	session = session_factory()
+	session.add(QueryTemplateModel(normalized_query="old", sql_template=TEMPLATE, hits=50, last_used_at=datetime.now() - timedelta(days=31)))
+	session.add(QueryTemplateModel(normalized_query="recent", sql_template=TEMPLATE, hits=1, last_used_at=datetime.now() - timedelta(days=29)))
+	session.commit()
+	cache = QueryTemplateCache(session_factory, ttl_days=30)
+
+	assert cache.get("old") is None
+	assert cache.get("recent") == TEMPLATE
+	assert cache.prune() == 1
+	assert [template.normalized_query for template in session_factory().query(QueryTemplateModel).all()] == ["recent"]
+
+
+def test_storage_errors_are_misses():
+	cache = QueryTemplateCache(sessionmaker(bind=create_engine("sqlite://")))
+
+	assert cache.get("pengeluaran bulan ini") is None
+	cache.store("pengeluaran bulan ini", TEMPLATE)
+	assert cache.get("pengeluaran bulan ini") == TEMPLATE
+
+
+@pytest.mark.anyio
+@patch("src.agent.tools.transaction_tools.get_llm_service")
+async def test_find_transaction_skips_llm_on_template_hit(mock_get_llm_service, session_factory):
+	mock_llm = MagicMock()
+	mock_llm.query_execute = AsyncMock(return_value=TEMPLATE)
+	mock_get_llm_service.return_value = mock_llm
+	repository = MockTransactionRepository()
+	repository.findRaw = MagicMock(return_value=[(100000,)])
+	tool = FindTransactionTool(repository=repository, templates=QueryTemplateCache(session_factory))
+
+	await tool.run({"query": "pengeluaran di atas 50rb sejak 1 juni 2025", "user_id": "user-1"})
+	await tool.run({"query": "Pengeluaran di atas 75.000 sejak 2024-01-15", "user_id": "user-2"})
+
+	assert mock_llm.query_execute.await_count == 1
+	assert repository.findRaw.call_args_list[1].args == (TEMPLATE, {"num_0": 75000, "date_0": date(2024, 1, 15), "user_id": "user-2"}, "user-2")
+
+
+@pytest.mark.anyio
+@patch("src.agent.tools.transaction_tools.get_llm_service")
+async def test_find_transaction_forgets_a_failing_template(mock_get_llm_service, session_factory):
+	fixed = TEMPLATE.replace("amount >", "amount >=")
+	mock_llm = MagicMock()
+	mock_llm.query_execute = AsyncMock(return_value=fixed)
+	mock_get_llm_service.return_value = mock_llm
+	repository = MockTransactionRepository()
+	repository.findRaw = MagicMock(side_effect=[Exception("no such column"), [(100000,)]])
+	templates = QueryTemplateCache(session_factory)
+	templates.store("pengeluaran di atas :num_0 sejak :date_0", TEMPLATE)
+	tool = FindTransactionTool(repository=repository, templates=templates)
+
+	result = await tool.run({"query": "pengeluaran di atas 50rb sejak 1 juni 2025", "user_id": "user-1"})
+
+	assert "100000" in result
+	assert mock_llm.query_execute.await_count == 1
+	assert templates.get("pengeluaran di atas :num_0 sejak :date_0") == fixed
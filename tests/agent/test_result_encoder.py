@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from src.agent.context_window import estimate_tokens
+from src.agent.result_encoder import encode_result, encode_rows
+from src.core.models.transaction_model import TransactionModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema
+
+
+def transaction(id, day, amount, description, category="Food", type="expense"):
+	return TransactionModel(id=id, user_id="628123456789", date=datetime(2026, 10, day), amount=amount, description=description, category=category, type=type)
+
+
+def test_rows_are_tabular_without_user_and_repeated_values():
+	encoded = encode_rows([transaction(1, 1, 25000, "Nasi goreng"), transaction(2, 3, 18000.0, "Kopi | susu")])
+
+	assert encoded == "2 rows | id|date|amount|description\nall rows: category=Food, type=expense\n1|2026-10-01|25000|Nasi goreng\n2|2026-10-03|18000|Kopi / susu"
+	assert "628123456789" not in encoded
+
+
+def test_single_row_keeps_every_column():
+	assert encode_rows([transaction(7, 2, 5000, "Parkir", "Transportation")]) == "1 rows | id|date|amount|description|category|type\n7|2026-10-02|5000|Parkir|Transportation|expense"
+
+
+def test_rows_over_budget_are_summarized():
+	rows = [transaction(index, index % 28 + 1, 1000 * index, f"item number {index}", "Food" if index % 3 else "Transportation") for index in range(1, 201)]
+
+	encoded = encode_rows(rows, max_tokens=300)
+
+	assert estimate_tokens(encoded) <= 300
+	assert "more rows not shown" in encoded
+	assert "summary of all 200 rows: date 2026-10-01..2026-10-28; amount sum=20100000 min=1000 max=200000; category Food=134, Transportation=66" in encoded
+
+
+def test_result_cap_is_in_the_header():
+	assert encode_rows([(1, 2)], total_rows=500).startswith("1 of 500 rows (query row cap) | col1|col2")
+
+
+def test_encode_result_of_create_transaction():
+	result = {
+		"message": "1 record(s) successfully created",
+		"transactions": [CreateTransactionSchema(user_id="628123456789", date="2026-10-01", amount=25000, description="Nasi goreng", category="Food", type="expense").to_dict()],
+	}
+
+	assert encode_result(result) == "message: 1 record(s) successfully created\ntransactions: 1 rows | date|amount|description|category|type\n2026-10-01|25000|Nasi goreng|Food|expense"
+
+
+def test_encode_result_keeps_plain_results():
+	assert encode_result("Category list") == "Category list"
+	assert encode_result(["a", "b"]) == "['a', 'b']"
+	assert encode_result({"rows": [], "count": 0}) == "rows: 0 rows\ncount: 0"
@@ -0,0 +1,146 @@
+import pytest
+
+from src.agent.tool_cache import ToolResultCache
+from src.core.interfaces.tool import Tool
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self):
+		return self.now
+
+
+class CountingTool(Tool):
+	def __init__(self, name: str, pure: bool = True, ttl: float | None = None, depends_on=(), invalidates=()):
+		self.tool_name = name
+		self.pure = pure
+		self.ttl = ttl
+		self.reads = list(depends_on)
+		self.writes = list(invalidates)
+		self.calls = 0
+
+	def name(self) -> str:
+		return self.tool_name
+
+	def description(self) -> str:
+		return self.tool_name
+
+	async def run(self, args):
+		self.calls += 1
+		return "Error: failed" if isinstance(args, dict) and args.get("fail") else f"{self.tool_name} result {self.calls}"
+
+	def get_args_schema(self):
+		return None
+
+	def output_schema(self):
+		return "str"
+
+	def is_pure(self) -> bool:
+		return self.pure
+
+	def cache_ttl(self) -> float | None:
+		return self.ttl
+
+	def depends_on(self) -> list[str]:
+		return self.reads
+
+	def invalidates(self) -> list[str]:
+		return self.writes
+
+	def cacheable_result(self, result) -> bool:
+		return not result.startswith("Error")
+
+
+@pytest.mark.anyio
+async def test_pure_tool_result_is_cached_by_normalized_args():
+	cache = ToolResultCache()
+	tool = CountingTool("find_transaction", depends_on=["transaction"])
+
+	first = await cache.run(tool, {"query": "Total bulan ini", "user_id": "user-1"})
+	second = await cache.run(tool, {"user_id": "user-1", "query": "  total   bulan ini "})
+
+	assert first == second == "find_transaction result 1"
+	assert tool.calls == 1
+	assert cache.hits == 1
+
+
+@pytest.mark.anyio
+async def test_impure_tool_is_always_executed():
+	cache = ToolResultCache()
+	tool = CountingTool("image_extract_information", pure=False)
+
+	await cache.run(tool, {"image_path": "a.png"})
+	await cache.run(tool, {"image_path": "a.png"})
+
+	assert tool.calls == 2
+
+
+@pytest.mark.anyio
+async def test_write_invalidates_results_of_the_same_user_only():
+	cache = ToolResultCache()
+	find = CountingTool("find_transaction", depends_on=["transaction"])
+	create = CountingTool("create_transaction", pure=False, invalidates=["transaction"])
+
+	await cache.run(find, {"query": "total", "user_id": "user-1"})
+	await cache.run(find, {"query": "total", "user_id": "user-2"})
+	await cache.run(create, [{"user_id": "user-1", "amount": 18000}])
+	await cache.run(find, {"query": "total", "user_id": "user-1"})
+	await cache.run(find, {"query": "total", "user_id": "user-2"})
+
+	assert find.calls == 3
+
+
+@pytest.mark.anyio
+async def test_cached_result_expires_after_ttl():
+	clock = FakeClock()
+	cache = ToolResultCache(clock=clock)
+	tool = CountingTool("generate_date", ttl=60)
+
+	await cache.run(tool, {"expression": "kemarin"})
+	clock.now = 59
+	await cache.run(tool, {"expression": "kemarin"})
+	clock.now = 60
+	await cache.run(tool, {"expression": "kemarin"})
+
+	assert tool.calls == 2
+
+
+@pytest.mark.anyio
+async def test_error_results_are_not_cached():
+	cache = ToolResultCache()
+	tool = CountingTool("find_transaction")
+
+	await cache.run(tool, {"fail": True})
+	await cache.run(tool, {"fail": True})
+
+	assert tool.calls == 2
+
+
+@pytest.mark.anyio
+async def test_least_recently_used_entries_are_evicted():
+	cache = ToolResultCache(max_entries=2)
+	tool = CountingTool("generate_date")
+	for expression in ["a", "b", "a", "c", "a"]:
+		await cache.run(tool, {"expression": expression})
+
+	assert tool.calls == 3
+	assert len(cache.entries) == 2
+
+
+@pytest.mark.anyio
+async def test_versions_are_bounded_without_reviving_stale_entries():
+	cache = ToolResultCache(max_entries=2)
+	find = CountingTool("find_transaction", depends_on=["transaction"])
+	create = CountingTool("create_transaction", pure=False, invalidates=["transaction"])
+
+	await cache.run(find, {"query": "total", "user_id": "user-1"})
+	await cache.run(create, [{"user_id": "user-1"}])
+	# the version of user-1 is evicted, the entry read before its write must stay unreachable
+	for user_id in ["user-2", "user-3", "user-4"]:
+		await cache.run(create, [{"user_id": user_id}])
+	await cache.run(find, {"query": "total", "user_id": "user-1"})
+
+	assert len(cache.versions) == 2
+	assert find.calls == 2
@@ -3,6 +3,7 @@ import hashlib
 import hmac
 import pytest
 from cryptography.fernet import Fernet
+from zoneinfo import ZoneInfo
 
 from src.agent.tools.common_tools import GetUserIdTool
 import json
@@ -35,12 +36,13 @@ def test_create_encrypted_user_id_roundtrip(monkeypatch):
 	assert decrypted == decrypted
 
 
-def test_run_uses_internal_id(monkeypatch):
+@pytest.mark.anyio
+async def test_run_uses_internal_id(monkeypatch):
 	key = Fernet.generate_key().decode()
 	monkeypatch.setenv("SECRET_KEY", key)
 
 	tool = GetUserIdTool(user_id="XYZ")
-	token = tool.run(args={})  # args are ignored
+	token = await tool.run(args={})  # args are ignored
 	assert Fernet(key.encode()).decrypt(token.encode()).decode() == "XYZ"
 
 
@@ -63,10 +65,11 @@ def test_get_date_tool_args_schema_and_output_schema():
 	assert any(arg["name"] == "timezone" for arg in args_schema)
 	assert tool.output_schema() == "str"
 
-def test_get_date_tool_run_calls_llm_service_with_expression_today():
+@pytest.mark.anyio
+async def test_get_date_tool_run_calls_llm_service_with_expression_today():
 	tool = GetDateTool()
 	args = {"expression": "today", "timezone": "Asia/Jakarta"}
-	result = tool.run(args)
+	result = await tool.run(args)
 	print(result)
 	assert isinstance(result, str)
 	data = json.loads(result)
@@ -76,10 +79,11 @@ def test_get_date_tool_run_calls_llm_service_with_expression_today():
 	# assert the date is equal to today
 	assert data["datetime"].endswith(now.strftime("00:00:00+07:00"))
 
-def test_get_date_tool_run_calls_llm_service_with_expression_today_with_clock():
+@pytest.mark.anyio
+async def test_get_date_tool_run_calls_llm_service_with_expression_today_with_clock():
 	tool = GetDateTool()
 	args = {"expression": "hari ini jam 3 sore", "timezone": "Asia/Jakarta"}
-	result = tool.run(args)
+	result = await tool.run(args)
 	assert isinstance(result, str)
 	data = json.loads(result)
 	assert "datetime" in data
@@ -88,14 +92,38 @@ def test_get_date_tool_run_calls_llm_service_with_expression_today_with_clock():
 	# assert the date is equal to today
 	assert data["datetime"].endswith(now.strftime("15:00:00+07:00"))
 
-def test_get_date_tool_run_calls_llm_service_with_expression_yesterday():
+@pytest.mark.anyio
+async def test_get_date_tool_run_calls_llm_service_with_expression_yesterday():
 	tool = GetDateTool()
 	args = {"expression": "yesterday", "timezone": "Asia/Jakarta"}
-	result = tool.run(args)
+	result = await tool.run(args)
 	assert isinstance(result, str)
 	data = json.loads(result)
 	assert "datetime" in data
 	yesterday = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
 	assert data["datetime"].startswith(yesterday.strftime("%Y-%m-%d"))  # assert the date starts with yesterday's date
 	# assert the date is equal to yesterday
-	assert data["datetime"].endswith(yesterday.strftime("00:00:00+07:00"))
\ No newline at end of file
+	assert data["datetime"].endswith(yesterday.strftime("00:00:00+07:00"))
+@pytest.mark.anyio
+async def test_get_date_tool_resolves_locally_without_llm(monkeypatch):
+	def fail():
+		raise AssertionError("the LLM must not be called for a known expression")
+
+	monkeypatch.setattr("src.agent.tools.common_tools.get_llm_service", fail)
+	result = await GetDateTool().run({"expression": "2 minggu lalu", "timezone": "Asia/Jakarta"})
+
+	expected = (datetime.now(ZoneInfo("Asia/Jakarta")) - timedelta(days=14)).strftime("%Y-%m-%dT00:00:00+07:00")
+	assert json.loads(result) == {"datetime": expected}
+
+
+@pytest.mark.anyio
+async def test_get_date_tool_caches_only_local_results(monkeypatch):
+	class FallbackLLM:
+		async def query_execute(self, **kwargs):
+			return '{"datetime": "2025-06-01T00:00:00+07:00"}'
+
+	monkeypatch.setattr("src.agent.tools.common_tools.get_llm_service", lambda: FallbackLLM())
+	tool = GetDateTool()
+
+	assert tool.cacheable_result(await tool.run({"expression": "kemarin", "timezone": "Asia/Jakarta"}))
+	assert not tool.cacheable_result(await tool.run({"expression": "awal bulan", "timezone": "Asia/Jakarta"}))
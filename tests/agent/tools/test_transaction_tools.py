@@ -1,6 +1,8 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.agent.agent_resources import use_resources
 from src.agent.tools.transaction_tools import FindTransactionTool
+from src.repositories.raw_query_guard import RawQueryResult
 
 @pytest.fixture
 def tool():
@@ -17,13 +19,15 @@ def test_get_args_schema_and_output_schema(tool):
 	assert any(arg["name"] == "user_id" for arg in args_schema)
 	assert tool.output_schema() == "str"
 
-def test_run_missing_keys(tool):
-	assert tool.run({"query": "find all"}) == "Args should contain 'query' and 'user_id' keys"
-	assert tool.run({"user_id": "abc"}) == "Args should contain 'query' and 'user_id' keys"
+@pytest.mark.anyio
+async def test_run_missing_keys(tool):
+	assert await tool.run({"query": "find all"}) == "Args should contain 'query' and 'user_id' keys"
+	assert await tool.run({"user_id": "abc"}) == "Args should contain 'query' and 'user_id' keys"
 
-def test_run_wrong_types(tool):
-	assert tool.run({"query": 123, "user_id": "abc"}) == "Args 'query' and 'user_id' should be strings"
-	assert tool.run({"query": "find", "user_id": 456}) == "Args 'query' and 'user_id' should be strings"
+@pytest.mark.anyio
+async def test_run_wrong_types(tool):
+	assert await tool.run({"query": 123, "user_id": "abc"}) == "Args 'query' and 'user_id' should be strings"
+	assert await tool.run({"query": "find", "user_id": 456}) == "Args 'query' and 'user_id' should be strings"
 
 def test_validate_query_raw_sql_quotes(tool):
 	q1 = '"SELECT * FROM transaction WHERE user_id = \'abc\'"'
@@ -36,13 +40,13 @@ def test_validate_query_raw_sql_invalid(tool):
 	assert tool.validate_query_raw_sql("SELECT * FROM transaction") == "Query must contain user_id filter"
 
 # Integration test
+@pytest.mark.anyio
 @patch("src.agent.tools.transaction_tools.get_llm_service")
-@patch("src.agent.tools.transaction_tools.get_transaction_repository")
-def test_find_transaction_tool_integration(mock_get_repo, mock_get_llm_service):
+async def test_find_transaction_tool_integration(mock_get_llm_service):
 	# Setup LLM mock
 	mock_llm = MagicMock()
 	sql = "SELECT * FROM transaction WHERE user_id = 'user123'"
-	mock_llm.query_execute.return_value = sql
+	mock_llm.query_execute = AsyncMock(return_value=sql)
 	mock_get_llm_service.return_value = mock_llm
 
 	# Setup repository mock
@@ -51,11 +55,16 @@ def test_find_transaction_tool_integration(mock_get_repo, mock_get_llm_service):
 		{"id": 1, "user_id": "user123", "amount": 100, "type": "income"},
 		{"id": 2, "user_id": "user123", "amount": 50, "type": "expense"},
 	]
-	mock_get_repo.return_value = mock_repo
+	resources = MagicMock()
+	resources.transaction_repository = mock_repo
+	resources.run_in_session = AsyncMock(side_effect=lambda func, *args: func(*args))
 
 	tool = FindTransactionTool()
 	args = {"query": "show all my transactions", "user_id": "user123"}
-	result = tool.run(args)
-	assert "user123" in result
-	assert "income" in result or "expense" in result
-	
\ No newline at end of file
+	with use_resources(resources):
+		result = await tool.run(args)
+	assert result == "2 rows | id|amount|type\n1|100|income\n2|50|expense"
+	
+def test_format_result_marks_truncation(tool):
+	assert tool.format_result(RawQueryResult([(1,), (2,)])) == "2 rows | col1\n1\n2"
+	assert tool.format_result(RawQueryResult([(1,), (2,)], total_rows=40)).startswith("2 of 40 rows (query row cap) | col1")
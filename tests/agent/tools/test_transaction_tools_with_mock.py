@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
-from src.agent.tools.transaction_tools import CreateTransactionTool, UpdateTransactionTool, DeleteTransactionTool
+from src.agent.category_classifier import CategoryClassifier
+from src.agent.tools.transaction_tools import CreateTransactionTool, QueryTransactionTool, UpdateTransactionTool, DeleteTransactionTool
 from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
 from tests.mocks.mock_transaction_repository import MockTransactionRepository
 
@@ -13,7 +14,8 @@ class TestCreateTransactionToolWithMock:
         self.mock_repo = MockTransactionRepository()
         self.tool = CreateTransactionTool(repository=self.mock_repo)
     
-    def test_create_single_transaction_success(self):
+    @pytest.mark.anyio
+    async def test_create_single_transaction_success(self):
         """Test successful creation of single transaction"""
         transaction_data = [{
             "user_id": "test_user_123",
@@ -24,7 +26,7 @@ class TestCreateTransactionToolWithMock:
             "type": "expense"
         }]
         
-        result = self.tool.run(transaction_data)
+        result = await self.tool.run(transaction_data)
         
         assert "1 record(s) successfully created" in result["message"]
         assert len(result["transactions"]) == 1
@@ -35,7 +37,8 @@ class TestCreateTransactionToolWithMock:
         assert created_transaction.amount == 50.75
         assert created_transaction.category == "Food"
     
-    def test_create_multiple_transactions_success(self):
+    @pytest.mark.anyio
+    async def test_create_multiple_transactions_success(self):
         """Test successful creation of multiple transactions"""
         transaction_data = [
             {
@@ -56,13 +59,51 @@ class TestCreateTransactionToolWithMock:
             }
         ]
         
-        result = self.tool.run(transaction_data)
+        result = await self.tool.run(transaction_data)
         
         assert "2 record(s) successfully created" in result["message"]
         assert len(result["transactions"]) == 2
         assert len(self.mock_repo.get_all()) == 2
     
-    def test_create_transaction_validation_error(self):
+    @pytest.mark.anyio
+    async def test_create_transaction_classifies_missing_category(self):
+        """Category is filled from the user's history when the LLM leaves it out"""
+        tool = CreateTransactionTool(repository=self.mock_repo, classifier=CategoryClassifier())
+        self.mock_repo.create([CreateTransactionSchema(user_id="test_user_123", date="2024-01-10", amount=30000, description="mixue", category="Food", type="expense")])
+
+        result = await tool.run([
+            {"user_id": "test_user_123", "date": "2024-01-15", "amount": 18000, "description": "Kopi susu", "type": "expense"},
+            {"user_id": "test_user_123", "date": "2024-01-15", "amount": 25000, "description": "Mixue", "type": "expense"},
+        ])
+
+        assert isinstance(result, dict)
+        assert [transaction.category for transaction in self.mock_repo.get_all()[1:]] == ["Food", "Food"]
+
+    @pytest.mark.anyio
+    async def test_create_transaction_unclear_category_asks_for_it(self):
+        """Nothing is created when the category can't be classified confidently"""
+        tool = CreateTransactionTool(repository=self.mock_repo, classifier=CategoryClassifier())
+
+        result = await tool.run([{"user_id": "test_user_123", "date": "2024-01-15", "amount": 50000, "description": "Sesuatu", "type": "expense"}])
+
+        assert "is unclear" in result
+        assert len(self.mock_repo.get_all()) == 0
+
+    @pytest.mark.anyio
+    async def test_update_transaction_teaches_classifier(self):
+        """A corrected category is used for the next transaction with the same description"""
+        classifier = CategoryClassifier()
+        classifier.load("test_user_123", [])
+        self.mock_repo.create([CreateTransactionSchema(user_id="test_user_123", date="2024-01-10", amount=30000, description="netflix", category="Entertainment", type="expense")])
+
+        await UpdateTransactionTool(repository=self.mock_repo, classifier=classifier).run(
+            {"id": 1, "user_id": "test_user_123", "date": "2024-01-10", "amount": 30000, "description": "netflix", "category": "Housing", "type": "expense"}
+        )
+
+        assert classifier.predict("test_user_123", "Netflix") == "Housing"
+
+    @pytest.mark.anyio
+    async def test_create_transaction_validation_error(self):
         """Test validation error handling"""
         invalid_data = [{
             "user_id": "test_user_123",
@@ -73,14 +114,15 @@ class TestCreateTransactionToolWithMock:
             "type": "expense"
         }]
         
-        result = self.tool.run(invalid_data)
+        result = await self.tool.run(invalid_data)
         
         assert "Amount must be a number" in result
         assert len(self.mock_repo.get_all()) == 0  # No transaction created
     
-    def test_create_transaction_empty_args(self):
+    @pytest.mark.anyio
+    async def test_create_transaction_empty_args(self):
         """Test empty args handling"""
-        result = self.tool.run([])
+        result = await self.tool.run([])
         
         assert "Args list cannot be empty" in result
         assert len(self.mock_repo.get_all()) == 0
@@ -105,7 +147,8 @@ class TestUpdateTransactionToolWithMock:
         )
         self.mock_repo.create(create_data)
     
-    def test_update_transaction_success(self):
+    @pytest.mark.anyio
+    async def test_update_transaction_success(self):
         """Test successful transaction update"""
         update_data = {
             "id": 1,
@@ -117,7 +160,7 @@ class TestUpdateTransactionToolWithMock:
             "type": "expense"
         }
         
-        result = self.tool.run(update_data)
+        result = await self.tool.run(update_data)
         
         assert "expense record successfully updated with ID 1" in result
         
@@ -126,7 +169,8 @@ class TestUpdateTransactionToolWithMock:
         assert updated_transaction.description == "Updated transaction"
         assert updated_transaction.category == "Entertainment"
     
-    def test_update_nonexistent_transaction(self):
+    @pytest.mark.anyio
+    async def test_update_nonexistent_transaction(self):
         """Test updating non-existent transaction"""
         update_data = {
             "id": 999,  # Non-existent ID
@@ -139,7 +183,7 @@ class TestUpdateTransactionToolWithMock:
         }
         
         with pytest.raises(Exception, match="Transaction not found"):
-            self.tool.run(update_data)
+            await self.tool.run(update_data)
 
 
 class TestDeleteTransactionToolWithMock:
@@ -161,22 +205,25 @@ class TestDeleteTransactionToolWithMock:
         )
         self.mock_repo.create(create_data)
     
-    def test_delete_transaction_success(self):
+    @pytest.mark.anyio
+    async def test_delete_transaction_success(self):
         """Test successful transaction deletion"""
-        result = self.tool.run({"id": 1, "user_id": "test_user_123"})
+        result = await self.tool.run({"id": 1, "user_id": "test_user_123"})
         
         assert "expense record successfully deleted with ID 1" in result
         assert len(self.mock_repo.get_all()) == 0  # Transaction removed
     
-    def test_delete_nonexistent_transaction(self):
+    @pytest.mark.anyio
+    async def test_delete_nonexistent_transaction(self):
         """Test deleting non-existent transaction"""
         with pytest.raises(Exception, match="Transaction not found"):
-            self.tool.run({"id": 999, "user_id": "test_user_123"})
+            await self.tool.run({"id": 999, "user_id": "test_user_123"})
     
-    def test_delete_transaction_wrong_user(self):
+    @pytest.mark.anyio
+    async def test_delete_transaction_wrong_user(self):
         """Test deleting transaction with wrong user_id"""
         with pytest.raises(Exception, match="Transaction not found"):
-            self.tool.run({"id": 1, "user_id": "wrong_user"})
+            await self.tool.run({"id": 1, "user_id": "wrong_user"})
 
 
 class TestRepositoryIsolation:
@@ -204,4 +251,36 @@ class TestRepositoryIsolation:
         
         # Clear first repo
         mock_repo1.clear()
-        assert len(mock_repo1.get_all()) == 0
\ No newline at end of file
+        assert len(mock_repo1.get_all()) == 0
+
+class TestQueryTransactionToolWithMock:
+    """Test QueryTransactionTool using mock repository"""
+
+    def setup_method(self):
+        self.mock_repo = MockTransactionRepository()
+        self.mock_repo.create([
+            CreateTransactionSchema(user_id="user_1", date=datetime(2024, 1, 15, 12), amount=50, description="Lunch", category="Food", type="expense"),
+            CreateTransactionSchema(user_id="user_1", date=datetime(2024, 1, 31, 19), amount=20, description="Coffee", category="Food", type="expense"),
+            CreateTransactionSchema(user_id="user_1", date=datetime(2024, 2, 1, 8), amount=30, description="Taxi", category="Transportation", type="expense"),
+            CreateTransactionSchema(user_id="user_2", date=datetime(2024, 1, 20, 12), amount=99, description="Lunch", category="Food", type="expense"),
+        ])
+        self.tool = QueryTransactionTool(repository=self.mock_repo)
+
+    @pytest.mark.anyio
+    async def test_end_date_includes_the_whole_day(self):
+        result = await self.tool.run({"user_id": "user_1", "start_date": "2024-01-01", "end_date": "2024-01-31"})
+
+        assert result["count"] == 2
+        assert [row["description"] for row in result["rows"]] == ["Coffee", "Lunch"]
+
+    @pytest.mark.anyio
+    async def test_group_by_month(self):
+        result = await self.tool.run({"user_id": "user_1", "group_by": "month", "aggregates": "sum"})
+
+        assert result["rows"] == [{"period": "2024-01", "total": 70}, {"period": "2024-02", "total": 30}]
+
+    @pytest.mark.anyio
+    async def test_invalid_args_return_error(self):
+        assert (await self.tool.run({"user_id": "user_1", "group_by": "user_id"})).startswith("Args error")
+        assert (await self.tool.run({"user_id": "user_1", "start_date": "someday"})).startswith("Args error")
+        assert (await self.tool.run({"group_by": "month"})).startswith("Args should")
@@ -0,0 +1,71 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.controllers import auth_controller, export_controller, import_controller
+from src.services.utils import InvalidUserTokenError, create_encrypted_user_id, create_user_token, verify_user_token
+
+
+@pytest.fixture
+def client(monkeypatch):
+	monkeypatch.setenv("SECRET_KEY", "test-secret")
+	monkeypatch.setattr(auth_controller, "SERVICE_API_KEY", "service-key")
+	exported = []
+
+	def export_transactions(user_id, format, start_date, end_date, compress):
+		exported.append(user_id)
+		yield f"rows of {user_id}".encode()
+
+	monkeypatch.setattr(export_controller, "export_transactions", export_transactions)
+	app = FastAPI()
+	app.include_router(auth_controller.router)
+	app.include_router(export_controller.router)
+	client = TestClient(app)
+	client.exported = exported
+	return client
+
+
+def test_token_round_trip_and_tampering(monkeypatch):
+	monkeypatch.setenv("SECRET_KEY", "test-secret")
+	token = create_user_token("user-1", 60)
+
+	assert verify_user_token(token) == "user-1"
+	with pytest.raises(InvalidUserTokenError):
+		verify_user_token(token.replace("user-1", "user-2"))
+	with pytest.raises(InvalidUserTokenError):
+		verify_user_token(create_user_token("user-1", -1))
+	with pytest.raises(InvalidUserTokenError):
+		verify_user_token("not-a-token")
+
+
+def test_export_requires_a_token(client):
+	response = client.get("/transactions/export", params={"phone_number": "6281234567890"})
+
+	assert response.status_code == 401
+	assert client.exported == []
+
+
+def test_token_is_only_issued_to_services(client):
+	assert client.post("/auth/token", json={"phone_number": "6281234567890"}).status_code == 401
+	assert client.post("/auth/token", json={"phone_number": "6281234567890"}, headers={"X-API-Key": "wrong"}).status_code == 401
+
+
+def test_export_user_comes_from_the_token(client):
+	token = client.post("/auth/token", json={"phone_number": "6281234567890"}, headers={"X-API-Key": "service-key"}).json()["access_token"]
+
+	response = client.get("/transactions/export", params={"phone_number": "6289999999999"}, headers={"Authorization": f"Bearer {token}"})
+
+	assert response.status_code == 200
+	assert client.exported == [create_encrypted_user_id("6281234567890")]
+
+
+def test_import_requires_a_token(client, monkeypatch):
+	imported = []
+	monkeypatch.setattr(import_controller, "import_statement", lambda *args, **kwargs: imported.append(args) or iter(()))
+	app = FastAPI()
+	app.include_router(import_controller.router)
+
+	response = TestClient(app).post("/transactions/import", files={"file": ("statement.csv", b"date,amount\n")}, data={"phone_number": "6281234567890"})
+
+	assert response.status_code == 401
+	assert imported == []
@@ -0,0 +1,55 @@
+import json
+from functools import partial
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.agent.category_classifier import CategoryClassifier
+from src.controllers import import_controller
+from src.controllers.auth_controller import get_token_user_id
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.services.statement_import import import_statement
+
+BANK_CSV = """Tanggal;Keterangan;Debet;Kredit
+01/10/2026;GOFOOD Nasi Goreng;25.000;
+01/10/2026;Kopi susu;15.000;
+02/10/2026;Gaji Oktober;;5.000.000
+"""
+
+
+@pytest.fixture
+def client(monkeypatch):
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	session_factory = sessionmaker(bind=engine)
+	monkeypatch.setattr(import_controller, "import_statement", partial(import_statement, session_factory=session_factory, classifier=CategoryClassifier(), chunk_rows=2))
+	app = FastAPI()
+	app.include_router(import_controller.router)
+	app.dependency_overrides[get_token_user_id] = lambda: "user-1"
+	client = TestClient(app)
+	client.session_factory = session_factory
+	return client
+
+
+def test_progress_is_streamed_as_ndjson(client):
+	response = client.post("/transactions/import", files={"file": ("statement.csv", BANK_CSV.encode())})
+
+	assert response.status_code == 200
+	assert response.headers["content-type"] == "application/x-ndjson"
+	progress = [json.loads(line) for line in response.text.splitlines()]
+	assert [(line["rows_staged"], line["done"]) for line in progress] == [(2, False), (3, True)]
+	assert progress[-1]["imported"] == 3
+	session = client.session_factory()
+	assert session.query(TransactionModel).filter_by(user_id="user-1").count() == 3
+	session.close()
+
+
+def test_file_that_is_not_a_statement_is_a_bad_request(client):
+	response = client.post("/transactions/import", files={"file": ("statement.csv", b"foo;bar\n1;2\n")})
+
+	assert response.status_code == 400
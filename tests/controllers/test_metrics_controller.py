@@ -0,0 +1,26 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.controllers import auth_controller, metrics_controller
+
+
+@pytest.fixture
+def client(monkeypatch):
+	monkeypatch.setattr(auth_controller, "SERVICE_API_KEY", "service-key")
+	monkeypatch.setattr(metrics_controller, "get_llm_service", lambda: type("LLMService", (), {"stats": lambda self: {}})())
+	app = FastAPI()
+	app.include_router(metrics_controller.router)
+	return TestClient(app)
+
+
+def test_metrics_require_the_service_key(client):
+	assert client.get("/metrics").status_code == 401
+	assert client.get("/metrics", headers={"X-API-Key": "wrong"}).status_code == 401
+
+
+def test_metrics_with_the_service_key(client):
+	response = client.get("/metrics", headers={"X-API-Key": "service-key"})
+
+	assert response.status_code == 200
+	assert set(response.json()) == {"db_pool", "db_async_pool", "llm", "tool_cache", "query_templates"}
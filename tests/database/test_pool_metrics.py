@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.database.connection import create_database_engine
+from src.database.pool_metrics import TimedQueuePool, pool_stats
+
+
+@pytest.fixture
+def engine():
+	engine = create_database_engine(
+		"sqlite:///:memory:",
+		poolclass=TimedQueuePool,
+		pool_size=1,
+		max_overflow=1,
+		pool_timeout=0.05,
+		connect_args={"check_same_thread": False},
+	)
+	yield engine
+	engine.dispose()
+
+
+def test_pool_stats_track_in_use_and_overflow(engine):
+	first = engine.connect()
+	second = engine.connect()
+
+	stats = pool_stats(engine)
+	assert (stats["size"], stats["in_use"], stats["overflow"], stats["checkouts"]) == (1, 2, 1, 2)
+
+	second.close()
+	first.close()
+	stats = pool_stats(engine)
+	assert (stats["in_use"], stats["idle"]) == (0, 1)
+
+
+def test_checkout_timeouts_and_waits_are_recorded(engine):
+	connections = [engine.connect(), engine.connect()]
+	with pytest.raises(PoolTimeoutError):
+		engine.connect()
+
+	stats = pool_stats(engine)
+	assert stats["checkout_timeouts"] == 1
+	assert stats["checkout_wait_max_ms"] >= 50
+	for connection in connections:
+		connection.close()
+
+
+def test_metrics_survive_dispose(engine):
+	with engine.connect() as connection:
+		connection.execute(text("SELECT 1"))
+	engine.dispose()
+	with engine.connect() as connection:
+		connection.execute(text("SELECT 1"))
+
+	assert pool_stats(engine)["checkouts"] == 2
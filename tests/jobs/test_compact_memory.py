@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.memory_message_model import MemoryMessageArchiveModel, MemoryMessageModel
+from src.core.models.memory_summary_model import MemorySummaryModel
+from src.jobs.compact_memory import compact_memory
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+@pytest.fixture
+def session_factory():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	tables = [MemoryMessageModel.__table__, MemoryMessageArchiveModel.__table__, MemorySummaryModel.__table__]
+	MemoryMessageModel.metadata.create_all(engine, tables=tables)
+	return sessionmaker(bind=engine)
+
+
+def add_messages(session, user_id, count, days_ago):
+	for index in range(count):
+		created_at = NOW - timedelta(days=days_ago)
+		session.add(MemoryMessageModel(user_id=user_id, role="user", message=f"{user_id} {index}", created_at=created_at, updated_at=created_at))
+	session.commit()
+
+
+def test_compaction_archives_only_folded_old_messages(session_factory):
+	session = session_factory()
+	add_messages(session, "user-1", 4, days_ago=40)  # ids 1-4
+	add_messages(session, "user-1", 2, days_ago=1)  # ids 5-6, recent
+	add_messages(session, "user-2", 3, days_ago=40)  # ids 7-9, no summary yet
+	session.add(MemorySummaryModel(user_id="user-1", summary="summary"))
+	session.query(MemoryMessageModel).filter(MemoryMessageModel.id <= 5).update({"folded_at": NOW})
+	session.commit()
+
+	archived = compact_memory(session_factory, retention_days=30, batch_size=3, now=NOW)
+
+	assert archived == 4
+	remaining = [row.id for row in session.query(MemoryMessageModel).order_by(MemoryMessageModel.id)]
+	assert remaining == [5, 6, 7, 8, 9]
+	archive = session.query(MemoryMessageArchiveModel).order_by(MemoryMessageArchiveModel.id).all()
+	assert [(row.id, row.message) for row in archive] == [(1, "user-1 0"), (2, "user-1 1"), (3, "user-1 2"), (4, "user-1 3")]
+
+
+def test_compaction_without_folded_messages(session_factory):
+	session = session_factory()
+	add_messages(session, "user-1", 2, days_ago=40)
+
+	assert compact_memory(session_factory, retention_days=30, now=NOW) == 0
+
+
+def test_latest_messages_query_uses_user_created_at_index(session_factory):
+	session = session_factory()
+	plan = session.execute(text("EXPLAIN QUERY PLAN SELECT * FROM memory_message WHERE user_id = 'user-1' ORDER BY created_at DESC LIMIT 10")).all()
+
+	details = " ".join(str(row[-1]) for row in plan)
+	assert "ix_memory_message_user_id_created_at" in details
+	assert "TEMP B-TREE" not in details
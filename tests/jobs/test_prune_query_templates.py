@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.query_template_model import QueryTemplateModel
+from src.jobs.prune_query_templates import prune_query_templates
+
+
+@pytest.fixture
+def session_factory():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	QueryTemplateModel.metadata.create_all(engine, tables=[QueryTemplateModel.__table__])
+	session = sessionmaker(bind=engine)()
+	for key, days_ago in [("expired", 40), ("bad", 1), ("good", 1)]:
+		session.add(QueryTemplateModel(normalized_query=key, sql_template="SELECT 1", hits=0, last_used_at=datetime.now() - timedelta(days=days_ago)))
+	session.commit()
+	return sessionmaker(bind=engine)
+
+
+def remaining(session_factory) -> list[str]:
+	return sorted(template.normalized_query for template in session_factory().query(QueryTemplateModel).all())
+
+
+def test_prune_deletes_the_expired_templates(session_factory):
+	assert prune_query_templates(session_factory) == 1
+	assert remaining(session_factory) == ["bad", "good"]
+
+
+def test_prune_deletes_the_given_templates(session_factory):
+	assert prune_query_templates(session_factory, ["bad"]) == 1
+	assert remaining(session_factory) == ["expired", "good"]
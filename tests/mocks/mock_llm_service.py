@@ -0,0 +1,32 @@
+from typing import List
+
+
+class MockLLMService:
+	"""Mock LLM service that replays scripted responses, streamed in small chunks when requested"""
+
+	def __init__(self, responses: List[str], chunk_size: int = 4):
+		self.responses = list(responses)
+		self.chunk_size = chunk_size
+		self.models = ["mock-model"]
+		self.calls = []
+		self.streamed_chunks = 0
+		self.closed_streams = 0
+
+	def select_model(self, pool="agent"):
+		return self.models[0]
+
+	def next_response(self, messages) -> str:
+		self.calls.append([dict(message) for message in messages])
+		return self.responses.pop(0) if self.responses else ""
+
+	async def query_execute(self, messages, max_token=None, stop=None, model=None, pool="agent"):
+		return self.next_response(messages)
+
+	async def query_stream(self, messages, max_token=None, stop=None, model=None, pool="agent"):
+		response = self.next_response(messages)
+		try:
+			for i in range(0, len(response), self.chunk_size):
+				self.streamed_chunks += 1
+				yield response[i : i + self.chunk_size]
+		finally:
+			self.closed_streams += 1
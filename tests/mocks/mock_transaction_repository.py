@@ -1,7 +1,8 @@
-from typing import List, Union
+from typing import List, Optional, Tuple, Union
+from collections import defaultdict
 from src.core.interfaces.transaction_repository_interface import ITransactionRepository
 from src.core.models.transaction_model import TransactionModel
-from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
 
 
 class MockTransactionRepository(ITransactionRepository):
@@ -39,7 +40,7 @@ class MockTransactionRepository(ITransactionRepository):
     def update(self, data: UpdateTransactionSchema) -> TransactionModel:
         """Mock update transaction"""
         for transaction in self.transactions:
-            if transaction.id == data.id:
+            if transaction.id == data.id and transaction.user_id == data.user_id:
                 transaction.user_id = data.user_id
                 transaction.date = data.date
                 transaction.amount = data.amount
@@ -56,12 +57,70 @@ class MockTransactionRepository(ITransactionRepository):
                 return self.transactions.pop(i)
         raise Exception("Transaction not found")
     
-    def findRaw(self, query: str) -> List:
-        """Mock raw query - returns all transactions for simplicity"""
+    def findRaw(self, query: str, params: Optional[dict] = None, user_id: Optional[str] = None) -> List:
+        """Mock raw query - returns all transactions (of the user when given) for simplicity"""
         return [(t.id, t.user_id, t.date, t.amount, t.description, t.category, t.type) 
-                for t in self.transactions]
+                for t in self.transactions if user_id is None or t.user_id == user_id]
+
+    def get_category_history(self, user_id: str, limit: int = 500) -> List[Tuple[str, str]]:
+        """Mock category history - (description, category) of the user's transactions, oldest first"""
+        history = [(t.description, t.category) for t in self.transactions if t.user_id == user_id and t.description and t.category]
+        return history[-limit:]
     
+    def query(self, query: TransactionQuerySchema) -> List[dict]:
+        """Mock structured query - evaluates the filters, grouping and aggregates in Python"""
+        matches = [
+            t for t in self.transactions
+            if t.user_id == query.user_id
+            and (query.start_date is None or t.date >= query.start_date)
+            and (query.end_date is None or t.date < query.end_date)
+            and (not query.categories or (t.category or "").lower() in [c.lower() for c in query.categories])
+            and (query.type is None or t.type == query.type)
+            and (not query.search or query.search.lower() in (t.description or "").lower())
+        ]
+        if not query.is_aggregate:
+            key = (lambda t: (t.amount, t.id)) if query.order_by == "amount" else (lambda t: (t.date, t.id))
+            matches.sort(key=key, reverse=query.order == "desc")
+            return [
+                {"id": t.id, "date": t.date.isoformat(), "amount": t.amount, "description": t.description, "category": t.category, "type": t.type}
+                for t in matches[: query.limit]
+            ]
+
+        formats = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+        groups = defaultdict(list)
+        for t in matches:
+            if query.group_by in formats:
+                groups[t.date.strftime(formats[query.group_by])].append(t)
+            else:
+                groups[getattr(t, query.group_by) if query.group_by else None].append(t)
+        aggregates = query.aggregates or ["sum", "count"]
+        rows = []
+        for value, items in groups.items():
+            row = {}
+            if query.group_by:
+                row["period" if query.group_by in formats else query.group_by] = value
+            if "sum" in aggregates:
+                row["total"] = sum(t.amount for t in items)
+            if "count" in aggregates:
+                row["count"] = len(items)
+            if "avg" in aggregates:
+                row["average"] = round(sum(t.amount for t in items) / len(items), 2)
+            rows.append(row)
+        if not query.group_by:
+            return rows or [{"total": 0, "count": 0}]
+        return rows[: query.limit]
+
+    def iter_export(self, user_id: str, start_date=None, end_date=None):
+        """Mock export - the user's transactions in the date range, oldest first"""
+        matches = [
+            t for t in self.transactions
+            if t.user_id == user_id
+            and (start_date is None or t.date >= start_date)
+            and (end_date is None or t.date < end_date)
+        ]
+        yield from sorted(matches, key=lambda t: (t.date, t.id))
+
     def clear(self):
         """Helper method to clear all transactions for test isolation"""
         self.transactions.clear()
-        self.next_id = 1
\ No newline at end of file
+        self.next_id = 1
@@ -0,0 +1,156 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.memory_message_model import MemoryMessageArchiveModel, MemoryMessageModel
+from src.core.models.memory_summary_model import MemorySummaryModel
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
+from src.database.async_connection import async_database_url, create_async_database_engine
+from src.database.pool_metrics import TimedAsyncQueuePool
+from src.repositories.async_memory_message_repository import AsyncMemoryMessageRepository
+from src.repositories.async_memory_summary_repository import AsyncMemorySummaryRepository
+from src.repositories.async_transaction_repository import AsyncTransactionRepository
+from src.repositories.raw_query_guard import UnsafeQueryError
+
+TABLES = [
+	TransactionModel.__table__,
+	TransactionRollupModel.__table__,
+	MemoryMessageModel.__table__,
+	MemoryMessageArchiveModel.__table__,
+	MemorySummaryModel.__table__,
+]
+
+
+@pytest.fixture
+async def session_factory():
+	# aiosqlite stands in for asyncpg, the repositories only use the AsyncSession API
+	engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+	async with engine.begin() as connection:
+		await connection.run_sync(TransactionModel.metadata.create_all, tables=TABLES)
+	yield async_sessionmaker(bind=engine, expire_on_commit=False)
+	await engine.dispose()
+
+
+def transaction(user_id, day, amount, category, type="expense", description=None):
+	return CreateTransactionSchema(user_id=user_id, date=day, amount=amount, description=description or category, category=category, type=type)
+
+
+def test_async_database_url_uses_the_async_driver():
+	assert async_database_url("postgresql://u:p@db:5432/app").drivername == "postgresql+asyncpg"
+	assert async_database_url("postgresql+psycopg2://u:p@db/app").drivername == "postgresql+asyncpg"
+	assert async_database_url("sqlite:///app.db").drivername == "sqlite+aiosqlite"
+	assert async_database_url("mysql+pymysql://u:p@db/app").drivername == "mysql+pymysql"
+
+
+def test_async_engine_uses_the_timed_pool():
+	engine = create_async_database_engine("postgresql://u:p@localhost/app")
+	assert isinstance(engine.sync_engine.pool, TimedAsyncQueuePool)
+	assert engine.sync_engine.dialect.driver == "asyncpg"
+
+
+@pytest.mark.anyio
+async def test_transaction_writes_keep_the_rollup_in_step(session_factory):
+	async with session_factory() as session:
+		repository = AsyncTransactionRepository(session)
+		lunch, fuel = await repository.create(
+			[transaction("user-1", datetime(2026, 10, 1, 12), 40000, "Food"), transaction("user-1", datetime(2026, 10, 2), 150000, "Transportation")]
+		)
+		await repository.create(transaction("user-2", datetime(2026, 10, 2), 99000, "Food"))
+		assert lunch.id is not None
+
+		updated = await repository.update(
+			UpdateTransactionSchema(id=fuel.id, user_id="user-1", date=datetime(2026, 9, 15), amount=120000, description="fuel", category="Transportation", type="expense")
+		)
+		assert updated.amount == 120000
+		await repository.delete(lunch.id, "user-1")
+		with pytest.raises(Exception, match="Transaction not found"):
+			await repository.delete(lunch.id, "user-1")
+
+		rollup = {(row.user_id, row.month, row.category): (row.total, row.count) for row in (await session.scalars(select(TransactionRollupModel))).all()}
+		assert rollup == {
+			("user-1", date(2026, 9, 1), "Transportation"): (120000, 1),
+			("user-1", date(2026, 10, 1), "Food"): (0, 0),
+			("user-1", date(2026, 10, 1), "Transportation"): (0, 0),
+			("user-2", date(2026, 10, 1), "Food"): (99000, 1),
+		}
+		assert len(await repository.get_all()) == 2
+
+
+@pytest.mark.anyio
+async def test_transaction_queries(session_factory):
+	async with session_factory() as session:
+		repository = AsyncTransactionRepository(session)
+		await repository.create(
+			[
+				transaction("user-1", datetime(2026, 10, 1), 25000, "Food", description="nasi goreng"),
+				transaction("user-1", datetime(2026, 10, 3), 15000, "Food", description="kopi"),
+				transaction("user-1", datetime(2026, 10, 5), 5000000, "Salary", type="income"),
+				transaction("user-2", datetime(2026, 10, 2), 99000, "Food"),
+			]
+		)
+		by_category = await repository.query(
+			TransactionQuerySchema(user_id="user-1", start_date=datetime(2026, 10, 1), end_date=datetime(2026, 11, 1), type="expense", group_by="category")
+		)
+		assert by_category == [{"category": "Food", "total": 40000, "count": 2}]
+		rows = await repository.query(TransactionQuerySchema(user_id="user-1", search="kopi"))
+		assert [row["amount"] for row in rows] == [15000]
+		assert await repository.get_category_history("user-1") == [("nasi goreng", "Food"), ("kopi", "Food"), ("Salary", "Salary")]
+
+
+@pytest.mark.anyio
+async def test_export_streams_the_users_rows(session_factory):
+	async with session_factory() as session:
+		repository = AsyncTransactionRepository(session)
+		await repository.create([transaction("user-1", datetime(2026, 10, day), 1000 * day, "Food") for day in (3, 1, 2)])
+		await repository.create(transaction("user-2", datetime(2026, 10, 1), 99000, "Food"))
+
+		rows = [row async for row in repository.iter_export("user-1", end_date=datetime(2026, 10, 3), batch_size=1)]
+		assert [(row.date.day, row.amount) for row in rows] == [(1, 1000), (2, 2000)]
+
+
+@pytest.mark.anyio
+async def test_guarded_raw_query_is_scoped_and_capped(session_factory):
+	async with session_factory() as session:
+		repository = AsyncTransactionRepository(session)
+		await repository.create([transaction("user-1", datetime(2026, 10, day), 1000 * day, "Food") for day in range(1, 6)])
+		await repository.create(transaction("user-2", datetime(2026, 10, 1), 99000, "Food"))
+
+		rows = await repository.find_raw_guarded('SELECT amount FROM "transaction" ORDER BY amount', "user-1", max_rows=3)
+		assert [row.amount for row in rows] == [1000, 2000, 3000]
+		assert rows.total_rows == 5
+		scoped = await repository.findRaw('SELECT sum(amount) AS total FROM "transaction" WHERE amount > :min', {"min": 0}, user_id="user-2")
+		assert scoped[0].total == 99000
+		assert scoped.truncated is False
+		with pytest.raises(UnsafeQueryError):
+			await repository.findRaw('DELETE FROM "transaction"', user_id="user-1")
+
+
+@pytest.mark.anyio
+async def test_memory_messages(session_factory):
+	async with session_factory() as session:
+		repository = AsyncMemoryMessageRepository(session)
+		await repository.create(CreateMemoryMessageSchema(user_id="user-1", role="user", message="halo"))
+		rows = [{"user_id": "user-1", "role": "assistant", "message": f"reply {index}", "client_id": f"client-{index}"} for index in range(3)]
+		assert await repository.create_many(rows) == 3
+		# a retried batch, the rows stored already are skipped
+		await repository.create_many(rows[2:])
+
+		unfolded = await repository.get_unfolded("user-1")
+		assert [message.message for message in unfolded] == ["halo", "reply 0", "reply 1", "reply 2"]
+		assert len(await repository.get_list("user-1", limit=2)) == 2
+
+		summaries = AsyncMemorySummaryRepository(session)
+		assert await summaries.save("user-1", "greeting", [unfolded[0].id, unfolded[1].id]) is not None
+		assert await summaries.save("user-1", "again", [unfolded[1].id]) is None
+		assert (await summaries.get("user-1")).summary == "greeting"
+		assert [message.message for message in await repository.get_unfolded("user-1")] == ["reply 1", "reply 2"]
+
+		assert await repository.archive_folded(datetime.now() + timedelta(days=1)) == 2
+		archived = (await session.scalars(select(MemoryMessageArchiveModel.message).order_by(MemoryMessageArchiveModel.id))).all()
+		assert archived == ["halo", "reply 0"]
@@ -0,0 +1,148 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.memory_message_model import MemoryMessageModel
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.repositories.raw_query_guard import UnsafeQueryError, validate_select
+from src.repositories.transaction_repository import TransactionRepository
+
+
+@pytest.fixture
+def repository():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, MemoryMessageModel.__table__, TransactionRollupModel.__table__])
+	session = sessionmaker(bind=engine)()
+	for index in range(5):
+		session.add(TransactionModel(user_id="user-1", date=datetime(2026, 10, index + 1), amount=1000 * (index + 1), description=f"item {index}", category="Food", type="expense"))
+	session.add(TransactionModel(user_id="user-2", date=datetime(2026, 10, 1), amount=99000, description="other user", category="Food", type="expense"))
+	session.add(TransactionRollupModel(user_id="victim", month=date(2026, 10, 1), category="Food", type="expense", total=999.0, count=1))
+	session.commit()
+	return TransactionRepository(session)
+
+
+def test_rows_are_scoped_to_the_user_even_without_filter(repository):
+	rows = repository.findRaw('SELECT description FROM "transaction" ORDER BY id;', user_id="user-1")
+
+	assert [row.description for row in rows] == [f"item {index}" for index in range(5)]
+	assert not rows.truncated
+
+
+def test_subqueries_and_unions_are_scoped_too(repository):
+	rows = repository.findRaw('SELECT sum(amount) FROM (SELECT amount FROM "transaction" UNION ALL SELECT amount FROM "transaction" t WHERE t.user_id = :other)', {"other": "user-2"}, "user-1")
+
+	assert rows[0][0] == 15000
+
+
+def test_row_cap_truncates_with_total(repository):
+	rows = repository.find_raw_guarded('SELECT id FROM "transaction" ORDER BY id', "user-1", max_rows=2)
+
+	assert [row.id for row in rows] == [1, 2]
+	assert rows.truncated
+	assert rows.total_rows == 5
+
+
+@pytest.mark.parametrize(
+	"sql",
+	[
+		"DELETE FROM transaction",
+		'SELECT 1; DELETE FROM "transaction"',
+		"SELECT * FROM memory_message",
+		'SELECT * FROM "memory_message"',
+		"SELECT * FROM main.transaction",
+		"SELECT * FROM pg_catalog.pg_user",
+		"SELECT * FROM sqlite_master",
+		"WITH t AS (SELECT 1) SELECT * FROM t",
+		"SELECT * INTO backup FROM transaction",
+		"SELECT * FROM transaction FOR UPDATE",
+		"SELECT E'\\'' ; DROP TABLE transaction; --'",
+		"SELECT $$x$$",
+		"SELECT 'unterminated",
+	],
+)
+def test_unsafe_statements_are_rejected(repository, sql):
+	with pytest.raises(UnsafeQueryError):
+		repository.findRaw(sql, user_id="user-1")
+
+
+def test_literals_and_comments_are_not_keywords():
+	sql = "SELECT * FROM transaction WHERE description = 'update; drop' -- delete\n"
+
+	assert validate_select(sql) == sql.strip()
+
+
+@pytest.mark.parametrize(
+	"sql",
+	[
+		"SELECT user_id, total FROM transaction_rollup",
+		"SELECT * FROM transaction t JOIN transaction_rollup r ON r.user_id = t.user_id",
+		'SELECT * FROM "transaction", transaction_rollup',
+		"SELECT * FROM (transaction_rollup)",
+		'SELECT (SELECT max(total) FROM transaction_rollup) FROM "transaction"',
+	],
+)
+def test_other_users_rollup_is_not_readable(repository, sql):
+	with pytest.raises(UnsafeQueryError):
+		repository.findRaw(sql, user_id="attacker")
+
+
+@pytest.mark.parametrize(
+	"sql",
+	[
+		"SELECT * FROM some_future_table",
+		"SELECT * FROM transaction LEFT JOIN some_future_table ON 1 = 1",
+		"SELECT * FROM transaction WHERE id IN (SELECT id FROM some_future_table)",
+		"SELECT * FROM (transaction JOIN some_future_table ON 1 = 1)",
+		"SELECT * FROM public.transaction",
+		"SELECT * FROM generate_series(1, 10)",
+	],
+)
+def test_any_table_but_transaction_is_rejected(sql):
+	with pytest.raises(UnsafeQueryError):
+		validate_select(sql)
+
+
+@pytest.mark.parametrize(
+	"sql",
+	[
+		"SELECT EXTRACT(YEAR FROM date), sum(amount) FROM transaction GROUP BY 1",
+		"SELECT * FROM transaction a JOIN transaction b ON a.id = b.id, transaction c WHERE a.category IS NOT DISTINCT FROM c.category",
+		"SELECT category FROM (SELECT category FROM transaction) t UNION SELECT category FROM transaction ORDER BY 1",
+	],
+)
+def test_function_from_and_aliases_are_allowed(sql):
+	assert validate_select(sql) == sql
+
+
+@pytest.mark.parametrize(
+	"sql",
+	[
+		"SELECT query_to_xml('select * from memory_message', true, true, '') FROM transaction",
+		"SELECT table_to_xml('memory_message', true, false, '') AS x FROM transaction LIMIT 1",
+		"SELECT set_config('statement_timeout','0',false) FROM transaction",
+		"SELECT current_setting('is_superuser') FROM transaction",
+		"SELECT nextval('transaction_id_seq') FROM transaction",
+		"SELECT setval('transaction_id_seq', 1) FROM transaction",
+		"SELECT lo_get(1) FROM transaction",
+		"SELECT dblink_exec('host=x', 'select 1') FROM transaction",
+		"SELECT pg_read_file('/etc/passwd') FROM transaction",
+		'SELECT "query_to_xml"(\'select 1\', true, true, \'\') FROM transaction',
+		"SELECT public.cursor_to_xml(c, 1, true, true, '') FROM transaction",
+	],
+)
+def test_functions_outside_the_allow_list_are_rejected(sql):
+	with pytest.raises(UnsafeQueryError):
+		validate_select(sql)
+
+
+def test_allowed_functions_and_keywords_before_parentheses():
+	sql = (
+		"SELECT strftime('%Y-%m', date) AS month, sum(amount), count(DISTINCT category), CAST(avg(amount) AS numeric(12, 2)) "
+		"FROM transaction WHERE lower(category) IN ('food') AND EXISTS (SELECT 1 FROM transaction) GROUP BY 1"
+	)
+
+	assert validate_select(sql) == sql
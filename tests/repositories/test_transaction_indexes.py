@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.schemas.transaction_schema import TransactionQuerySchema
+from src.repositories.transaction_queries import build_transaction_query
+
+CATEGORIES = ["Food", "Transportation", "Shopping", "Bills", "Entertainment"]
+
+
+@pytest.fixture(scope="module")
+def session():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__])
+	session = sessionmaker(bind=engine)()
+	start = datetime(2025, 1, 1)
+	session.execute(
+		TransactionModel.__table__.insert(),
+		[
+			{
+				"user_id": f"user-{index % 50}",
+				"date": start + timedelta(hours=7 * index),
+				"amount": 1000 + index,
+				"description": f"transaksi {index}",
+				"category": CATEGORIES[index % len(CATEGORIES)],
+				"type": "expense",
+			}
+			for index in range(5000)
+		],
+	)
+	session.commit()
+	session.execute(text("ANALYZE"))
+	return session
+
+
+def query_plan(session, statement) -> str:
+	compiled = statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+	plan = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+	return " ".join(str(row[-1]) for row in plan)
+
+
+def test_date_range_uses_user_date_index(session):
+	query = TransactionQuerySchema(user_id="user-7", start_date=datetime(2025, 3, 1), end_date=datetime(2025, 4, 1), order_by="date")
+
+	plan = query_plan(session, build_transaction_query(query))
+
+	assert "USING INDEX ix_transaction_user_id_date" in plan
+	assert "TEMP B-TREE" not in plan
+
+
+def test_category_filter_uses_user_lower_category_date_index(session):
+	query = TransactionQuerySchema(user_id="user-7", categories=["food"], start_date=datetime(2025, 3, 1), group_by="month")
+
+	plan = query_plan(session, build_transaction_query(query))
+
+	assert "ix_transaction_user_id_lower_category_date" in plan
+	assert "SCAN" not in plan
+
+
+def test_category_filter_matches_any_casing(session):
+	rows = session.execute(build_transaction_query(TransactionQuerySchema(user_id="user-0", categories=["FOOD"], aggregates=["count"]))).all()
+
+	assert rows[0].count == 100
+
+
+def test_category_filter_matches_stored_values_of_any_casing(session):
+	for category in ["Credit card", "credit Card", "personal Care"]:
+		session.add(TransactionModel(user_id="user-mixed", date=datetime(2025, 2, 1), amount=1000, description="x", category=category, type="expense"))
+	session.commit()
+
+	rows = session.execute(build_transaction_query(TransactionQuerySchema(user_id="user-mixed", categories=["Credit Card", "Personal Care"], aggregates=["count"]))).all()
+
+	assert rows[0].count == 3
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import TransactionQuerySchema
+from src.repositories.transaction_queries import build_transaction_query
+from src.repositories.transaction_repository import TransactionRepository
+from src.repositories.transaction_rollup_repository import TransactionRollupRepository
+
+
+@pytest.fixture
+def repository():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	session = sessionmaker(bind=engine)()
+	rows = [
+		("user-1", datetime(2026, 9, 3, 8), 25000, "Nasi goreng", "Food", "expense"),
+		("user-1", datetime(2026, 9, 20, 12), 40000, "Kopi 100%_arabica", "Food", "expense"),
+		("user-1", datetime(2026, 10, 1, 9), 150000, "Bensin", "Transportation", "expense"),
+		("user-1", datetime(2026, 10, 1, 17), 5000000, "Gaji", "Salary", "income"),
+		("user-2", datetime(2026, 10, 2, 10), 99000, "Nasi goreng", "Food", "expense"),
+	]
+	for user_id, date, amount, description, category, type in rows:
+		session.add(TransactionModel(user_id=user_id, date=date, amount=amount, description=description, category=category, type=type))
+	session.commit()
+	TransactionRollupRepository(session).rebuild()
+	return TransactionRepository(session)
+
+
+def test_rows_are_scoped_to_user_and_filtered(repository):
+	rows = repository.query(TransactionQuerySchema(user_id="user-1", categories=["food"], type="expense"))
+
+	assert [row["description"] for row in rows] == ["Kopi 100%_arabica", "Nasi goreng"]
+	assert rows[0]["date"] == "2026-09-20T12:00:00"
+
+
+def test_date_range_end_is_exclusive(repository):
+	rows = repository.query(TransactionQuerySchema(user_id="user-1", start_date=datetime(2026, 9, 1), end_date=datetime(2026, 10, 1)))
+
+	assert {row["description"] for row in rows} == {"Nasi goreng", "Kopi 100%_arabica"}
+
+
+def test_search_escapes_like_wildcards(repository):
+	assert [row["description"] for row in repository.query(TransactionQuerySchema(user_id="user-1", search="100%_"))] == ["Kopi 100%_arabica"]
+	assert repository.query(TransactionQuerySchema(user_id="user-1", search="g%")) == []
+
+
+def test_group_by_month(repository):
+	rows = repository.query(TransactionQuerySchema(user_id="user-1", type="expense", group_by="month"))
+
+	assert rows == [{"period": "2026-09", "total": 65000, "count": 2}, {"period": "2026-10", "total": 150000, "count": 1}]
+
+
+def test_group_by_category_orders_by_total(repository):
+	rows = repository.query(TransactionQuerySchema(user_id="user-1", type="expense", group_by="category", aggregates=["sum", "avg"]))
+
+	assert rows == [{"category": "Transportation", "total": 150000, "average": 150000.0}, {"category": "Food", "total": 65000, "average": 32500.0}]
+
+
+def test_total_without_group(repository):
+	assert repository.query(TransactionQuerySchema(user_id="user-1", type="income", aggregates=["sum"])) == [{"total": 5000000}]
+
+
+def test_user_input_is_bound_not_inlined():
+	statement = build_transaction_query(TransactionQuerySchema(user_id="user-1' OR '1'='1", search="x'; DROP TABLE transaction; --", group_by="day"))
+	sql = str(statement.compile(dialect=postgresql.dialect()))
+
+	assert "DROP TABLE" not in sql
+	assert "OR '1'='1" not in sql
+	assert "date_trunc('day', transaction.date)" in sql
+
+
+@pytest.mark.parametrize(
+	"kwargs",
+	[
+		{"user_id": ""},
+		{"user_id": "user-1", "group_by": "user_id"},
+		{"user_id": "user-1", "aggregates": ["max"]},
+		{"user_id": "user-1", "order_by": "id; DROP TABLE transaction"},
+		{"user_id": "user-1", "limit": 1000},
+		{"user_id": "user-1", "start_date": datetime(2026, 10, 2), "end_date": datetime(2026, 10, 1)},
+	],
+)
+def test_invalid_query_raises(kwargs):
+	with pytest.raises(ValueError):
+		TransactionQuerySchema(**kwargs)
@@ -0,0 +1,121 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema, TransactionQuerySchema, UpdateTransactionSchema
+from src.jobs.rebuild_rollup import rebuild_rollup
+from src.repositories.transaction_queries import build_transaction_query, can_use_rollup, format_row
+from src.repositories.transaction_repository import TransactionRepository
+from src.repositories.transaction_rollup_repository import TransactionRollupRepository, lock_statement
+
+
+@pytest.fixture
+def session_factory():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	return sessionmaker(bind=engine)
+
+
+def rollup_rows(session) -> dict:
+	return {(row.user_id, row.month, row.category, row.type): (row.total, row.count) for row in session.query(TransactionRollupModel).all()}
+
+
+def create(repository, user_id, day, amount, category, type="expense"):
+	return repository.create(CreateTransactionSchema(user_id=user_id, date=day, amount=amount, description=category, category=category, type=type))[0]
+
+
+def test_writes_keep_the_rollup_in_step(session_factory):
+	session = session_factory()
+	repository = TransactionRepository(session)
+	create(repository, "user-1", datetime(2026, 9, 30, 23), 25000, "Food")
+	lunch = create(repository, "user-1", datetime(2026, 10, 1, 12), 40000, "Food")
+	fuel = create(repository, "user-1", datetime(2026, 10, 2), 150000, "Transportation")
+	create(repository, "user-2", datetime(2026, 10, 2), 99000, "Food")
+
+	repository.update(UpdateTransactionSchema(id=lunch.id, user_id="user-1", date=datetime(2026, 10, 1, 12), amount=45000, description="lunch", category="Food", type="expense"))
+	repository.update(UpdateTransactionSchema(id=fuel.id, user_id="user-1", date=datetime(2026, 9, 15), amount=150000, description="fuel", category="Transportation", type="expense"))
+	repository.delete(lunch.id, "user-1")
+
+	maintained = rollup_rows(session)
+	assert maintained == {
+		("user-1", date(2026, 9, 1), "Food", "expense"): (25000, 1),
+		("user-1", date(2026, 9, 1), "Transportation", "expense"): (150000, 1),
+		("user-1", date(2026, 10, 1), "Food", "expense"): (0, 0),
+		("user-1", date(2026, 10, 1), "Transportation", "expense"): (0, 0),
+		("user-2", date(2026, 10, 1), "Food", "expense"): (99000, 1),
+	}
+	rebuild_rollup(session_factory)
+	session.expire_all()
+	assert {key: value for key, value in maintained.items() if value[1]} == rollup_rows(session)
+
+
+def test_rebuild_runs_per_user_and_clears_users_without_transactions(session_factory):
+	session = session_factory()
+	repository = TransactionRepository(session)
+	create(repository, "user-1", datetime(2026, 10, 1), 40000, "Food")
+	gone = create(repository, "user-2", datetime(2026, 10, 2), 99000, "Food")
+	session.query(TransactionModel).filter_by(id=gone.id).delete()
+	session.add(TransactionRollupModel(user_id="user-1", month=date(2026, 1, 1), category="Drift", type="expense", total=1, count=1))
+	session.commit()
+
+	assert TransactionRollupRepository(session).rebuild("user-2") == 0
+	assert ("user-1", date(2026, 1, 1), "Drift", "expense") in rollup_rows(session)
+	assert rebuild_rollup(session_factory) == 1
+	session.expire_all()
+	assert rollup_rows(session) == {("user-1", date(2026, 10, 1), "Food", "expense"): (40000, 1)}
+
+
+def test_rollup_writes_and_rebuild_share_a_per_user_lock_on_postgres():
+	statement = str(lock_statement("postgresql", "user-1").compile(dialect=postgresql.dialect()))
+
+	assert "pg_advisory_xact_lock" in statement and "hashtext" in statement
+	assert lock_statement("sqlite", "user-1") is None
+
+
+def test_rollup_is_rolled_back_with_a_failed_write(session_factory):
+	session = session_factory()
+	repository = TransactionRepository(session)
+	with pytest.raises(Exception):
+		repository.create(CreateTransactionSchema(user_id="user-1", date=datetime(2026, 10, 1), amount=None, description="broken", category="Food", type="expense"))
+	session.rollback()
+
+	assert rollup_rows(session) == {}
+
+
+@pytest.mark.parametrize(
+	"kwargs",
+	[
+		{"group_by": "month"},
+		{"group_by": "category", "aggregates": ["sum", "count", "avg"]},
+		{"group_by": "type", "start_date": datetime(2026, 9, 1), "end_date": datetime(2026, 10, 1)},
+		{"aggregates": ["sum"], "categories": ["food"], "type": "expense"},
+	],
+)
+def test_aggregates_from_rollup_match_the_transaction_table(session_factory, kwargs):
+	session = session_factory()
+	repository = TransactionRepository(session)
+	for day, amount, category, type in [(1, 25000, "Food", "expense"), (20, 40000, "Food", "expense"), (35, 150000, "Transportation", "expense"), (40, 5000000, None, "income")]:
+		create(repository, "user-1", datetime(2026, 8, 31) + timedelta(days=day), amount, category, type)
+	query = TransactionQuerySchema(user_id="user-1", **kwargs)
+	statements = []
+	event.listen(session.get_bind(), "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+	from_rollup = repository.query(query)
+	from_transactions = [format_row(dict(row), query) for row in session.execute(build_transaction_query(query)).mappings().all()]
+
+	assert can_use_rollup(query)
+	assert "transaction_rollup" in statements[0]
+	assert from_rollup == from_transactions
+
+
+def test_partial_months_and_search_read_the_transaction_table():
+	assert not can_use_rollup(TransactionQuerySchema(user_id="user-1", group_by="category", start_date=datetime(2026, 10, 5)))
+	assert not can_use_rollup(TransactionQuerySchema(user_id="user-1", group_by="category", search="kopi"))
+	assert not can_use_rollup(TransactionQuerySchema(user_id="user-1", group_by="day"))
+	assert not can_use_rollup(TransactionQuerySchema(user_id="user-1"))
@@ -0,0 +1,107 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema, UpdateTransactionSchema
+from src.repositories.transaction_repository import TransactionRepository
+
+
+@pytest.fixture
+def engine():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	return engine
+
+
+@pytest.fixture
+def statements(engine):
+	sent = []
+	event.listen(engine, "before_cursor_execute", lambda connection, cursor, statement, *args: sent.append(statement.split()[0]))
+	return sent
+
+
+def receipt(user_id: str = "user-1", lines: int = 5) -> list[CreateTransactionSchema]:
+	return [
+		CreateTransactionSchema(user_id=user_id, date=datetime(2026, 10, 1, 12), amount=1000 * (line + 1), description=f"line {line}", category="Food", type="expense")
+		for line in range(lines)
+	]
+
+
+def correction(id: int, user_id: str = "user-1", amount: int = 9000) -> UpdateTransactionSchema:
+	return UpdateTransactionSchema(id=id, user_id=user_id, date=datetime(2026, 9, 15), amount=amount, description="fixed", category="Transportation", type="expense")
+
+
+def rollup_rows(session) -> dict:
+	return {(row.user_id, row.month, row.category): (row.total, row.count) for row in session.query(TransactionRollupModel).all()}
+
+
+def test_create_sends_one_insert_for_the_whole_receipt(engine, statements):
+	repository = TransactionRepository(sessionmaker(bind=engine)())
+
+	transactions = repository.create(receipt(lines=5))
+	assert [transaction.amount for transaction in transactions] == [1000, 2000, 3000, 4000, 5000]
+	assert len({transaction.id for transaction in transactions}) == 5
+	# INSERT ... RETURNING and the rollup upsert, reading the returned rows after the commit needs no SELECT
+	assert statements == ["INSERT", "INSERT"]
+
+
+def test_update_and_delete_return_the_row_without_reloading_it(engine, statements):
+	session = sessionmaker(bind=engine)()
+	repository = TransactionRepository(session)
+	first, second = repository.create(receipt(lines=2))
+	statements.clear()
+
+	updated = repository.update(correction(first.id))
+	assert (updated.id, updated.amount, updated.category, updated.date) == (first.id, 9000, "Transportation", datetime(2026, 9, 15))
+	# SQLite can't return the previous row from the UPDATE, it is read (and locked on Postgres) first
+	assert statements == ["SELECT", "UPDATE", "INSERT"]
+
+	statements.clear()
+	deleted = repository.delete(second.id, "user-1")
+	assert (deleted.id, deleted.amount) == (second.id, 2000)
+	assert statements == ["DELETE", "INSERT"]
+	assert rollup_rows(session) == {("user-1", date(2026, 10, 1), "Food"): (0, 0), ("user-1", date(2026, 9, 1), "Transportation"): (9000, 1)}
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_writes_are_scoped_to_the_user(engine, returning):
+	session = sessionmaker(bind=engine)()
+	repository = TransactionRepository(session, returning=returning)
+	(transaction,) = repository.create(receipt(lines=1))
+
+	with pytest.raises(Exception, match="Transaction not found"):
+		repository.update(correction(transaction.id, user_id="user-2"))
+	with pytest.raises(Exception, match="Transaction not found"):
+		repository.delete(transaction.id, "user-2")
+
+	session.expire_all()
+	stored = session.get(TransactionModel, transaction.id)
+	assert (stored.user_id, stored.amount) == ("user-1", 1000)
+	assert rollup_rows(session) == {("user-1", date(2026, 10, 1), "Food"): (1000, 1)}
+
+
+def test_returning_and_orm_paths_write_the_same_rows(engine):
+	results = []
+	for returning in (True, False):
+		session = sessionmaker(bind=engine)()
+		user_id = f"user-{returning}"
+		repository = TransactionRepository(session, returning=returning)
+		first, second, third = repository.create(receipt(user_id=user_id, lines=3))
+		repository.update(correction(first.id, user_id=user_id))
+		repository.delete(third.id, user_id)
+		session.expire_all()
+		rows = session.query(TransactionModel).filter_by(user_id=user_id).order_by(TransactionModel.id).all()
+		results.append(
+			(
+				[(row.date, row.amount, row.description, row.category) for row in rows],
+				{key[1:]: value for key, value in rollup_rows(session).items() if key[0] == user_id},
+			)
+		)
+		session.close()
+
+	assert results[0] == results[1]
@@ -0,0 +1,156 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.models.memory_message_model import MemoryMessageModel
+from src.core.schemas.memory_message_schema import CreateMemoryMessageSchema
+from src.database.async_connection import async_database_url
+from src.services.memory_write_buffer import MemoryWriteBuffer
+
+
+@pytest.fixture
+def engine(tmp_path):
+	# a database file, the buffer writes through aiosqlite and the assertions read it back synchronously
+	engine = create_engine(f"sqlite:///{tmp_path / 'memory.db'}")
+	MemoryMessageModel.metadata.create_all(engine, tables=[MemoryMessageModel.__table__])
+	return engine
+
+
+@pytest.fixture
+async def async_engine(engine):
+	async_engine = create_async_engine(async_database_url(str(engine.url)))
+	yield async_engine
+	await async_engine.dispose()
+
+
+def count_inserts(engine):
+	statements = []
+
+	@event.listens_for(engine, "before_cursor_execute")
+	def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+		if statement.startswith("INSERT"):
+			statements.append(statement)
+
+	return statements
+
+
+def stored_messages(engine):
+	session = sessionmaker(bind=engine)()
+	try:
+		return [(row.user_id, row.message) for row in session.query(MemoryMessageModel).order_by(MemoryMessageModel.id)]
+	finally:
+		session.close()
+
+
+def message(user_id, text):
+	return CreateMemoryMessageSchema(user_id=user_id, role="user", message=text)
+
+
+@pytest.mark.anyio
+async def test_flush_writes_batch_with_one_insert(engine, async_engine):
+	inserts = count_inserts(async_engine.sync_engine)
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60)
+	for index in range(5):
+		await buffer.add(message("user-1", f"message {index}"))
+
+	assert stored_messages(engine) == []
+	assert await buffer.flush() == 5
+
+	assert len(inserts) == 1
+	assert stored_messages(engine) == [("user-1", f"message {index}") for index in range(5)]
+	await buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_pending_for_returns_only_users_unflushed_rows(async_engine):
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60)
+	await buffer.add(message("user-1", "a"))
+	await buffer.add(message("user-2", "b"))
+	await buffer.add(message("user-1", "c"))
+
+	assert [row["message"] for row in buffer.pending_for("user-1")] == ["a", "c"]
+	await buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_stop_flushes_pending_rows(engine, async_engine):
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60)
+	await buffer.add(message("user-1", "a"))
+
+	await buffer.stop()
+
+	assert stored_messages(engine) == [("user-1", "a")]
+	assert buffer.pending == []
+
+
+@pytest.mark.anyio
+async def test_add_waits_for_flush_when_queue_is_full(engine, async_engine):
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60, max_pending=2)
+	await buffer.add(message("user-1", "a"))
+	await buffer.add(message("user-1", "b"))
+	await buffer.add(message("user-1", "c"))
+
+	assert [row["message"] for row in buffer.pending] == ["c"]
+	assert stored_messages(engine) == [("user-1", "a"), ("user-1", "b")]
+	await buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_queue_stays_bounded_and_add_succeeds_while_database_is_down(engine, async_engine):
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60, max_pending=3)
+
+	async def broken_write(rows):
+		raise RuntimeError("database is down")
+
+	write = buffer.write
+	buffer.write = broken_write
+	for index in range(10):
+		await buffer.add(message("user-1", f"message {index}"))
+
+	assert [row["message"] for row in buffer.pending] == ["message 7", "message 8", "message 9"]
+	assert buffer.dropped == 7
+
+	buffer.write = write
+	await buffer.stop()
+	assert stored_messages(engine) == [("user-1", f"message {index}") for index in range(7, 10)]
+
+
+@pytest.mark.anyio
+async def test_failed_flush_keeps_rows_for_retry(engine, async_engine):
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60)
+	await buffer.add(message("user-1", "a"))
+
+	async def broken_write(rows):
+		raise RuntimeError("database is down")
+
+	write = buffer.write
+	buffer.write = broken_write
+	with pytest.raises(RuntimeError):
+		await buffer.flush()
+	assert len(buffer.pending) == 1
+
+	buffer.write = write
+	await buffer.stop()
+	assert stored_messages(engine) == [("user-1", "a")]
+
+
+@pytest.mark.anyio
+async def test_retried_batch_that_was_committed_is_not_duplicated(engine, async_engine):
+	buffer = MemoryWriteBuffer(async_sessionmaker(bind=async_engine), batch_size=10, flush_interval=60)
+	await buffer.add(message("user-1", "a"))
+	await buffer.add(message("user-1", "a"))
+	write = buffer.write
+
+	async def write_then_fail(rows):
+		# the commit went through, the error came after it (e.g. the connection dropped)
+		await write(rows)
+		raise RuntimeError("connection reset")
+
+	buffer.write = write_then_fail
+	with pytest.raises(RuntimeError):
+		await buffer.flush()
+
+	buffer.write = write
+	await buffer.stop()
+	assert stored_messages(engine) == [("user-1", "a"), ("user-1", "a")]
@@ -0,0 +1,285 @@
+import asyncio
+
+import pytest
+
+from src.services.llm_service import LLMError, LLMService
+from src.services.model_router import ModelRouter
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 100.0
+
+	def __call__(self):
+		return self.now
+
+
+class FakeMessage:
+	def __init__(self, content):
+		self.content = content
+
+
+class FakeChoice:
+	def __init__(self, content):
+		self.message = FakeMessage(content)
+		self.delta = FakeMessage(content)
+
+
+class FakeCompletion:
+	def __init__(self, content):
+		self.choices = [FakeChoice(content)]
+
+
+class FakeStream:
+	def __init__(self, chunks, delay):
+		self.chunks = chunks
+		self.delay = delay
+		self.closed = False
+
+	def __aiter__(self):
+		return self.iterate()
+
+	async def iterate(self):
+		for chunk in self.chunks:
+			await asyncio.sleep(self.delay)
+			yield FakeCompletion(chunk)
+
+	async def close(self):
+		self.closed = True
+
+
+class FakeCompletions:
+	"""Answers with the model name after the delay configured for the model, or raises when the model is set to fail"""
+
+	def __init__(self, delays, failing=()):
+		self.delays = delays
+		self.failing = set(failing)
+		self.calls = []
+		self.cancelled = []
+		self.streams = {}
+
+	async def create(self, model, stream=False, **kwargs):
+		self.calls.append(model)
+		if model in self.failing:
+			raise RuntimeError(f"{model} is down")
+		if stream:
+			self.streams[model] = FakeStream([model, "!"], self.delays[model])
+			return self.streams[model]
+		try:
+			await asyncio.sleep(self.delays[model])
+		except asyncio.CancelledError:
+			self.cancelled.append(model)
+			raise
+		return FakeCompletion(model)
+
+
+class FakeClient:
+	def __init__(self, completions):
+		self.chat = type("Chat", (), {"completions": completions})()
+
+
+def create_service(delays, failing=(), hedge_delay=0.05):
+	completions = FakeCompletions(delays, failing)
+	service = LLMService(client=FakeClient(completions), model_pools={"agent": list(delays)})
+	service.routers["agent"] = ModelRouter(list(delays), min_hedge_delay=hedge_delay)
+	service.hedge_enabled = True
+	service.max_attempts = 3
+	return service, completions
+
+
+def test_router_prefers_untried_then_fastest_model():
+	router = ModelRouter(["slow", "fast", "new"])
+	router.record_success("slow", 2.0)
+	router.record_success("fast", 0.5)
+
+	assert router.ranked() == ["new", "fast", "slow"]
+
+
+def test_router_penalizes_errors():
+	router = ModelRouter(["flaky", "steady"])
+	router.record_success("flaky", 0.5)
+	router.record_success("steady", 0.8)
+	router.record_failure("flaky")
+
+	assert router.select() == "steady"
+
+
+def test_circuit_opens_after_consecutive_failures_and_closes_after_cooldown():
+	clock = FakeClock()
+	router = ModelRouter(["a", "b"], failure_threshold=2, cooldown=30, clock=clock)
+	router.record_success("b", 5.0)
+	router.record_failure("a")
+	assert router.is_available("a")
+
+	router.record_failure("a")
+	assert not router.is_available("a")
+	assert router.ranked() == ["b"]
+
+	clock.now += 30
+	assert router.is_available("a")
+
+
+def test_half_open_circuit_lets_one_trial_request_through():
+	clock = FakeClock()
+	router = ModelRouter(["a", "b"], failure_threshold=2, cooldown=30, clock=clock)
+	router.record_success("b", 5.0)
+	router.record_failure("a")
+	router.record_failure("a")
+	clock.now += 30
+
+	assert router.state("a") == "half_open"
+	router.start("a")
+	assert not router.is_available("a")
+	assert router.ranked() == ["b"]
+
+	# the trial fails, open for another cooldown
+	router.record_failure("a")
+	assert router.state("a") == "open"
+	clock.now += 30
+	router.start("a")
+	router.cancel("a")
+	assert router.is_available("a")
+
+	router.start("a")
+	router.record_success("a", 0.5)
+	assert router.state("a") == "closed"
+	router.start("a")
+	assert router.is_available("a")
+
+
+@pytest.mark.anyio
+async def test_cancelled_trial_request_reopens_the_trial():
+	service, _ = create_service({"a": 0.0, "b": 0.0})
+	router = service.routers["agent"]
+	router.stats["a"].open_until = 1.0
+
+	async def request(model):
+		await asyncio.sleep(1)
+
+	task = service.send(router, "a", request)
+	assert not router.is_available("a")
+	# cancelled before the request ran
+	task.cancel()
+	with pytest.raises(asyncio.CancelledError):
+		await task
+	assert router.is_available("a")
+
+
+def test_router_falls_back_to_circuit_closest_to_closing():
+	clock = FakeClock()
+	router = ModelRouter(["a", "b"], failure_threshold=1, cooldown=30, clock=clock)
+	router.record_failure("a")
+	clock.now += 10
+	router.record_failure("b")
+
+	assert router.select() == "a"
+	assert router.select(available_only=True) is None
+
+
+def test_hedge_delay_uses_p95_latency_with_minimum():
+	router = ModelRouter(["a"], min_hedge_delay=1.0)
+	assert router.hedge_delay("a") == 1.0
+
+	for latency in [0.5] * 18 + [4.0, 5.0]:
+		router.record_success("a", latency)
+	assert router.hedge_delay("a") == 4.0
+
+
+@pytest.mark.anyio
+async def test_query_execute_fails_over_to_next_model():
+	service, completions = create_service({"broken": 0.0, "healthy": 0.0}, failing=["broken"])
+	service.routers["agent"].record_success("broken", 0.1)
+	service.routers["agent"].record_success("healthy", 0.2)
+
+	result = await service.query_execute([{"role": "user", "content": "hi"}])
+
+	assert result == "healthy"
+	assert completions.calls == ["broken", "healthy"]
+	assert service.routers["agent"].stats["broken"].consecutive_failures == 1
+
+
+@pytest.mark.anyio
+async def test_query_execute_raises_when_every_model_fails():
+	service, _ = create_service({"a": 0.0, "b": 0.0}, failing=["a", "b"])
+
+	with pytest.raises(RuntimeError):
+		await service.query_execute([{"role": "user", "content": "hi"}])
+
+
+@pytest.mark.anyio
+async def test_slow_model_is_hedged_and_cancelled():
+	service, completions = create_service({"slow": 1.0, "fast": 0.01})
+	service.routers["agent"].record_success("slow", 0.01)
+	service.routers["agent"].record_success("fast", 0.02)
+
+	result = await service.query_execute([{"role": "user", "content": "hi"}])
+
+	assert result == "fast"
+	assert completions.calls == ["slow", "fast"]
+	await asyncio.sleep(0)
+	assert completions.cancelled == ["slow"]
+	assert service.routers["agent"].stats["slow"].consecutive_failures == 0
+
+
+@pytest.mark.anyio
+async def test_explicit_model_bypasses_router():
+	service, completions = create_service({"a": 0.0, "b": 0.0})
+
+	assert await service.query_execute([{"role": "user", "content": "hi"}], model="b") == "b"
+	assert completions.calls == ["b"]
+	assert service.routers["agent"].stats["b"].requests == 0
+
+
+@pytest.mark.anyio
+async def test_query_stream_hedges_on_time_to_first_token():
+	service, completions = create_service({"slow": 1.0, "fast": 0.01})
+	service.routers["agent"].record_success("slow", 0.01)
+	service.routers["agent"].record_success("fast", 0.02)
+
+	chunks = [chunk async for chunk in service.query_stream([{"role": "user", "content": "hi"}])]
+
+	assert chunks == ["fast", "!"]
+	assert completions.streams["slow"].closed
+	assert completions.streams["fast"].closed
+
+
+@pytest.mark.anyio
+async def test_llm_error_when_completion_has_no_choices():
+	service, completions = create_service({"a": 0.0})
+
+	async def no_choices(model, **kwargs):
+		completion = FakeCompletion("")
+		completion.choices = None
+		return completion
+
+	completions.create = no_choices
+	with pytest.raises(LLMError):
+		await service.query_execute([{"role": "user", "content": "hi"}])
+
+
+
+@pytest.mark.anyio
+async def test_hedged_discards_every_response_that_is_not_returned():
+	service, _ = create_service({"a": 0.0, "b": 0.0}, hedge_delay=0.01)
+	both_sent = asyncio.Event()
+	sent = []
+	discarded = []
+
+	async def request(model):
+		sent.append(model)
+		await both_sent.wait()
+		return f"stream of {model}"
+
+	async def discard(result):
+		discarded.append(result)
+
+	hedged = asyncio.create_task(service.hedged(service.routers["agent"], "a", [], request, discard))
+	while len(sent) < 2:
+		await asyncio.sleep(0.01)
+	# both requests complete in the same loop iteration as the caller is cancelled, neither is returned
+	both_sent.set()
+	hedged.cancel()
+
+	with pytest.raises(asyncio.CancelledError):
+		await hedged
+	assert sorted(discarded) == ["stream of a", "stream of b"]
@@ -0,0 +1,179 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.agent.category_classifier import CategoryClassifier
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.jobs.rebuild_rollup import rebuild_rollup
+from src.services.statement_import import (
+	StatementFormatError,
+	detect_format,
+	import_statement,
+	normalize_row,
+	parse_statement_amount,
+	parse_statement_date,
+	read_csv_statement,
+	read_ofx_statement,
+)
+
+BANK_CSV = """Tanggal;Keterangan;Debet;Kredit
+01/10/2026;GOFOOD Nasi Goreng;25.000;
+01/10/2026;Kopi susu;15.000;
+01/10/2026;Kopi susu;15.000;
+02/10/2026;Gaji Oktober;;5.000.000
+bukan tanggal;rusak;1;
+"""
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261003120000.000[+7:WIB]<TRNAMT>-150000.00<NAME>SHELL &amp; CO<MEMO>Bensin</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20261004
+<TRNAMT>200000
+<NAME>Refund
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+@pytest.fixture
+def session_factory():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	return sessionmaker(bind=engine)
+
+
+def run_import(session_factory, text: str, **kwargs) -> list[dict]:
+	return [progress.to_dict() for progress in import_statement(text.splitlines(True), "user-1", session_factory=session_factory, classifier=CategoryClassifier(), **kwargs)]
+
+
+def stored(session_factory) -> list[tuple]:
+	session = session_factory()
+	try:
+		return [(t.date, t.amount, t.description, t.category, t.type) for t in session.query(TransactionModel).order_by(TransactionModel.id)]
+	finally:
+		session.close()
+
+
+@pytest.mark.parametrize(
+	"value, expected",
+	[
+		("Rp 1.250.000,00", (1250000, None)),
+		("-50,000.50", (-50000.5, None)),
+		("(75.000)", (-75000, None)),
+		("150.000 DB", (150000, "expense")),
+		("2.500.000 CR", (2500000, "income")),
+		("12.50", (12.5, None)),
+		("1,5", (1.5, None)),
+	],
+)
+def test_parse_statement_amount(value, expected):
+	assert parse_statement_amount(value) == expected
+
+
+@pytest.mark.parametrize(
+	"value, expected",
+	[
+		("2026-10-01", datetime(2026, 10, 1)),
+		("2026-10-01 12:30:00", datetime(2026, 10, 1, 12, 30)),
+		("01/10/2026", datetime(2026, 10, 1)),
+		("1-10-26 08.15", datetime(2026, 10, 1, 8, 15)),
+		("01 Okt 2026", datetime(2026, 10, 1)),
+		("20261001120000.000[+7:WIB]", datetime(2026, 10, 1, 12)),
+	],
+)
+def test_parse_statement_date(value, expected):
+	assert parse_statement_date(value) == expected
+
+
+def test_invalid_values_are_rejected():
+	with pytest.raises(ValueError):
+		parse_statement_amount("lima ribu")
+	with pytest.raises(ValueError):
+		parse_statement_date("31/02/2026")
+
+
+def test_readers_map_bank_columns_and_ofx_transactions():
+	rows = list(read_csv_statement(BANK_CSV.splitlines(True)))
+	assert rows[0] == (2, {"date": "01/10/2026", "description": "GOFOOD Nasi Goreng", "debit": "25.000", "credit": ""})
+	assert len(rows) == 5
+
+	transactions = list(read_ofx_statement(OFX.splitlines(True)))
+	assert transactions == [
+		(5, {"date": "20261003120000.000[+7:WIB]", "amount": "-150000.00", "description": "SHELL & CO - Bensin"}),
+		(6, {"date": "20261004", "amount": "200000", "description": "Refund"}),
+	]
+	assert (detect_format(OFX.splitlines()[0]), detect_format("\ufeffdate,amount")) == ("ofx", "csv")
+
+
+def test_csv_without_required_columns_is_rejected():
+	with pytest.raises(StatementFormatError):
+		list(read_csv_statement(["foo,bar\n", "1,2\n"]))
+
+
+def test_normalize_row_types_and_categories():
+	classifier = CategoryClassifier()
+	expense = normalize_row({"date": "2026-10-01", "amount": "-25.000", "description": "  nasi   goreng "}, "user-1", classifier)
+	assert (expense.amount, expense.type, expense.description, expense.category) == (25000, "expense", "nasi goreng", "Food")
+
+	declared = normalize_row({"date": "2026-10-01", "amount": "25000", "type": "Pengeluaran", "category": "transportation", "description": "ojek"}, "user-1", classifier)
+	assert (declared.type, declared.category) == ("expense", "Transportation")
+	with pytest.raises(ValueError):
+		normalize_row({"date": "2026-10-01", "amount": "0"}, "user-1", classifier)
+
+
+def test_import_reports_progress_per_chunk_and_skips_duplicates(session_factory):
+	reports = run_import(session_factory, BANK_CSV, chunk_rows=2)
+
+	assert [(report["rows_staged"], report["done"]) for report in reports] == [(2, False), (4, False), (4, True)]
+	final = reports[-1]
+	assert (final["rows_read"], final["rows_invalid"], final["imported"], final["duplicates"]) == (5, 1, 4, 0)
+	assert final["errors"] == ["line 6: invalid date 'bukan tanggal'"]
+	# two identical coffees on the same day are both kept, in the order of the file
+	assert stored(session_factory) == [
+		(datetime(2026, 10, 1), 25000, "GOFOOD Nasi Goreng", "Food", "expense"),
+		(datetime(2026, 10, 1), 15000, "Kopi susu", "Food", "expense"),
+		(datetime(2026, 10, 1), 15000, "Kopi susu", "Food", "expense"),
+		(datetime(2026, 10, 2), 5000000, "Gaji Oktober", "Salary", "income"),
+	]
+
+	# importing an overlapping statement again only adds the new rows
+	overlapping = BANK_CSV + "03/10/2026;Kopi susu;15.000;\n"
+	final = run_import(session_factory, overlapping)[-1]
+	assert (final["imported"], final["duplicates"]) == (1, 4)
+	assert len(stored(session_factory)) == 5
+
+
+def test_import_keeps_the_rollup_in_step(session_factory):
+	run_import(session_factory, BANK_CSV)
+	run_import(session_factory, OFX)
+	session = session_factory()
+	maintained = {(row.month, row.category, row.type): (row.total, row.count) for row in session.query(TransactionRollupModel)}
+	assert maintained[(date(2026, 10, 1), "Food", "expense")] == (55000, 3)
+	assert maintained[(date(2026, 10, 1), "", "income")] == (200000, 1)
+
+	rebuild_rollup(session_factory)
+	session.expire_all()
+	assert {(row.month, row.category, row.type): (row.total, row.count) for row in session.query(TransactionRollupModel)} == maintained
+
+
+def test_failed_import_writes_nothing(session_factory):
+	engine = session_factory.kw["bind"]
+	event.listen(engine, "before_cursor_execute", fail_on_transaction_insert)
+	try:
+		with pytest.raises(RuntimeError):
+			run_import(session_factory, BANK_CSV)
+	finally:
+		event.remove(engine, "before_cursor_execute", fail_on_transaction_insert)
+	assert stored(session_factory) == []
+
+
+def fail_on_transaction_insert(connection, cursor, statement, *args):
+	if statement.startswith('INSERT INTO "transaction"'):
+		raise RuntimeError("connection lost")
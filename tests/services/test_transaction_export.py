@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.config.environtment import EXPORT_BATCH_ROWS
+from src.core.models.transaction_model import TransactionModel
+from src.core.models.transaction_rollup_model import TransactionRollupModel
+from src.core.schemas.transaction_schema import CreateTransactionSchema
+from src.repositories.transaction_repository import TransactionRepository
+from src.services import transaction_export
+from src.services.transaction_export import export_transactions, gzip_chunks
+
+
+@pytest.fixture
+def session_factory():
+	engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+	TransactionModel.metadata.create_all(engine, tables=[TransactionModel.__table__, TransactionRollupModel.__table__])
+	factory = sessionmaker(bind=engine)
+	session = factory()
+	TransactionRepository(session).create(
+		[
+			CreateTransactionSchema(user_id="user-1", date=datetime(2026, 10, 2), amount=15000, description='Kopi "susu", gula aren', category="Food", type="expense"),
+			CreateTransactionSchema(user_id="user-1", date=datetime(2026, 9, 30, 8), amount=25000, description="Nasi goreng", category="Food", type="expense"),
+			CreateTransactionSchema(user_id="user-1", date=datetime(2026, 11, 1), amount=5000000, description=None, category=None, type="income"),
+			CreateTransactionSchema(user_id="user-2", date=datetime(2026, 10, 1), amount=99000, description="Other user", category="Food", type="expense"),
+		]
+	)
+	session.close()
+	return factory
+
+
+def test_csv_export_is_scoped_ordered_and_date_bounded(session_factory):
+	exported = b"".join(export_transactions("user-1", "csv", end_date=datetime(2026, 11, 1), session_factory=session_factory)).decode()
+
+	rows = list(csv.reader(io.StringIO(exported)))
+	assert rows[0] == ["id", "date", "amount", "description", "category", "type"]
+	assert [row[1:] for row in rows[1:]] == [
+		["2026-09-30T08:00:00", "25000", "Nasi goreng", "Food", "expense"],
+		["2026-10-02T00:00:00", "15000", 'Kopi "susu", gula aren', "Food", "expense"],
+	]
+
+
+def test_jsonl_export_with_gzip(session_factory):
+	exported = gzip.decompress(b"".join(export_transactions("user-1", "jsonl", start_date=datetime(2026, 10, 1), compress=True, session_factory=session_factory)))
+
+	records = [json.loads(line) for line in exported.decode().splitlines()]
+	assert [(record["date"], record["amount"], record["description"]) for record in records] == [
+		("2026-10-02T00:00:00", 15000, 'Kopi "susu", gula aren'),
+		("2026-11-01T00:00:00", 5000000, None),
+	]
+
+
+def test_export_reads_the_rows_in_batches_and_writes_them_as_they_arrive(session_factory, monkeypatch):
+	monkeypatch.setattr(transaction_export, "FLUSH_BYTES", 1)
+	statements = []
+	event.listen(session_factory.kw["bind"], "before_cursor_execute", lambda connection, cursor, statement, parameters, context, executemany: statements.append(context.execution_options.get("yield_per")))
+
+	chunks = export_transactions("user-1", "jsonl", session_factory=session_factory)
+	first = next(chunks)
+	assert json.loads(first)["amount"] == 25000
+	assert statements == [EXPORT_BATCH_ROWS]
+	assert len(list(chunks)) == 2
+
+
+def test_gzip_chunks_stream_one_member():
+	compressed = list(gzip_chunks(iter([b"a" * 10, b"b" * 10])))
+	assert gzip.decompress(b"".join(compressed)) == b"a" * 10 + b"b" * 10
+
+
+def test_unknown_format_is_rejected(session_factory):
+	with pytest.raises(ValueError):
+		next(export_transactions("user-1", "xml", session_factory=session_factory))
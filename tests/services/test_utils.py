@@ -1,6 +1,6 @@
 import json
 import pytest
-from src.services.utils import extract_json_from_string
+from src.services.utils import extract_json_from_string, extract_json_list_from_string
 
 
 def test_extract_json_from_string_simple():
@@ -30,3 +30,26 @@ def test_extract_json_from_string_complex():
 def test_extract_json_from_string_invalid():
 	with pytest.raises(json.JSONDecodeError):
 		extract_json_from_string('{"invalid": "json"')
+
+
+def test_extract_json_list_from_string():
+	input_str = 'Action: [{"name": "a", "args": {}}, {"name": "b", "args": {"x": [1, 2]}}] <STOP>'
+	expected = [{"name": "a", "args": {}}, {"name": "b", "args": {"x": [1, 2]}}]
+	assert extract_json_list_from_string(input_str) == expected
+
+
+def test_extract_json_list_from_string_with_json_literals():
+	input_str = '[{"name": "a", "args": {"category": null, "recurring": true, "refund": false}}]'
+	expected = [{"name": "a", "args": {"category": None, "recurring": True, "refund": False}}]
+	assert extract_json_list_from_string(input_str) == expected
+
+
+def test_extract_json_list_from_string_with_python_literals():
+	input_str = "[{'name': 'a', 'args': {'category': None}}]"
+	expected = [{"name": "a", "args": {"category": None}}]
+	assert extract_json_list_from_string(input_str) == expected
+
+
+def test_extract_json_list_from_string_invalid():
+	with pytest.raises(ValueError):
+		extract_json_list_from_string('{"name": "a"}')